@@ -38,6 +38,7 @@ from weakref import WeakValueDictionary
 from traceback import format_exc
 from itertools import chain
 from copy import copy
+import time
 import types
 from twisted.internet import reactor
 from twisted.internet.task import deferLater
@@ -45,6 +46,8 @@ from twisted.internet.defer import inlineCallbacks, returnValue
 from django.conf import settings
 from evennia.commands.command import InterruptCommand
 from evennia.comms.channelhandler import CHANNELHANDLER
+from evennia.server.profiling import tracing
+from evennia.server.profiling.cmdprofiler import COMMAND_PROFILER
 from evennia.utils import logger, utils
 from evennia.utils.utils import string_suggestions
 
@@ -580,6 +583,7 @@ def cmdhandler(
 
         """
         global _COMMAND_NESTING
+        tstart = None
         try:
             # Assign useful variables to the instance
             cmd.caller = caller
@@ -617,6 +621,9 @@ def cmdhandler(
                 )
                 raise RuntimeError(err)
 
+            if profiling:
+                tstart, nqueries = time.time(), COMMAND_PROFILER.query_count
+
             # pre-command hook
             abort = yield cmd.at_pre_cmd()
             if abort:
@@ -625,6 +632,8 @@ def cmdhandler(
 
             # Parse and execute
             yield cmd.parse()
+            if trace_id:
+                tracing.stamp(trace_id, "server.cmd_parse")
 
             # main command code
             # (return value is normally None)
@@ -635,6 +644,8 @@ def cmdhandler(
                 yield None
             else:
                 ret = yield ret
+            if trace_id:
+                tracing.stamp(trace_id, "server.cmd_func")
 
             # post-command hook
             yield cmd.at_post_cmd()
@@ -657,6 +668,10 @@ def cmdhandler(
             raise ErrorReported(raw_string)
         finally:
             _COMMAND_NESTING[called_by] -= 1
+            if tstart is not None:
+                COMMAND_PROFILER.record(
+                    cmd, time.time() - tstart, merge_time, COMMAND_PROFILER.query_count - nqueries
+                )
 
     session, account, obj = session, None, None
     if callertype == "session":
@@ -677,6 +692,11 @@ def cmdhandler(
     # The error_to is the default recipient for errors. Tries to make sure an account
     # does not get spammed for errors while preserving character mirroring.
     error_to = obj or session or account
+    # set if the input that triggered this command is being traced
+    trace_id = tracing.get_active(session)
+    if trace_id:
+        tracing.stamp(trace_id, "server.cmdhandler")
+    profiling, merge_time = COMMAND_PROFILER.enabled, 0.0
 
     try:  # catch bugs in cmdhandler itself
         try:  # catch special-type commands
@@ -693,12 +713,18 @@ def cmdhandler(
 
             else:
                 # no explicit cmdobject given, figure it out
+                if profiling:
+                    merge_time = time.time()
                 cmdset = yield get_and_merge_cmdsets(
                     caller, session, account, obj, callertype, raw_string
                 )
+                if profiling:
+                    merge_time = time.time() - merge_time
                 if not cmdset:
                     # this is bad and shouldn't happen.
                     raise NoCmdSets
+                if trace_id:
+                    tracing.stamp(trace_id, "server.cmdset_merge")
                 # store the completely unmodified raw string - including
                 # whitespace and eventual prefixes-to-be-stripped.
                 unformatted_raw_string = raw_string
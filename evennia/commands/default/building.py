@@ -2829,29 +2829,36 @@ class CmdFind(COMMAND_DEFAULT_CLASS):
                         obj_ids.add(obj.id)
 
                 # Filter previous queryset instead of requesting another
-                filtered_qs = result_qs.filter(id__in=obj_ids).distinct()
-                nresults = filtered_qs.count()
+                result_qs = result_qs.filter(id__in=obj_ids).distinct()
+                nresults = result_qs.count()
 
                 # Use iterator again to minimize memory ballooning
-                results = filtered_qs.iterator()
+                results = result_qs.iterator()
 
             # still results after type filtering?
-            if nresults:
-                if nresults > 1:
-                    header = f"{nresults} Matches"
-                else:
-                    header = "One Match"
+            if nresults > 1:
+                # page the matches, only fetching those on the page being viewed
+                header = f"|w{nresults} Matches|n(#{low}-#{high}{restrictions}):"
+
+                def _format_page(objs):
+                    return header + "".join(
+                        f"\n   |g{obj.get_display_name(caller)} - {obj.path}|n" for obj in objs
+                    )
 
-                string = f"|w{header}|n(#{low}-#{high}{restrictions}):"
+                EvMore(
+                    caller,
+                    result_qs,
+                    page_formatter=_format_page,
+                    page_overhead=1,
+                    exit_on_lastpage=True,
+                )
+                return
+            elif nresults:
+                string = f"|wOne Match|n(#{low}-#{high}{restrictions}):"
                 res = None
                 for res in results:
                     string += f"\n   |g{res.get_display_name(caller)} - {res.path}|n"
-                if (
-                    "loc" in self.switches
-                    and nresults == 1
-                    and res
-                    and getattr(res, "location", None)
-                ):
+                if "loc" in self.switches and res and getattr(res, "location", None):
                     string += f" (|wlocation|n: |g{res.location.get_display_name(caller)}|n)"
             else:
                 string = f"|wNo Matches|n(#{low}-#{high}{restrictions}):"
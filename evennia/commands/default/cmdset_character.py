@@ -48,6 +48,8 @@ class CharacterCmdSet(CmdSet):
         self.add(system.CmdAbout())
         self.add(system.CmdTime())
         self.add(system.CmdServerLoad())
+        self.add(system.CmdCommandStats())
+        self.add(system.CmdTraces())
         # self.add(system.CmdPs())
         self.add(system.CmdTickers())
 
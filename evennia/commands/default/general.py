@@ -5,6 +5,7 @@ import re
 from django.conf import settings
 from evennia.utils import utils, evtable
 from evennia.typeclasses.attributes import NickTemplateInvalid
+from evennia.typeclasses.models import prefetch_handlers
 
 COMMAND_DEFAULT_CLASS = utils.class_from_module(settings.COMMAND_DEFAULT_CLASS)
 
@@ -379,6 +380,7 @@ class CmdInventory(COMMAND_DEFAULT_CLASS):
             string = "You are not carrying anything."
         else:
             table = self.styled_table(border="header")
+            prefetch_handlers(items, tags=False)
             for item in items:
                 table.add_row("|C%s|n" % item.name, item.db.desc or "")
             string = "|wYou are carrying:\n%s" % table
@@ -11,9 +11,10 @@ from collections import defaultdict
 from evennia.utils.utils import fill, dedent
 from evennia.commands.command import Command
 from evennia.help.models import HelpEntry
+from evennia.help.index import HELP_INDEX
 from evennia.utils import create, evmore
 from evennia.utils.eveditor import EvEditor
-from evennia.utils.utils import string_suggestions, class_from_module
+from evennia.utils.utils import class_from_module
 
 COMMAND_DEFAULT_CLASS = class_from_module(settings.COMMAND_DEFAULT_CLASS)
 HELP_MORE = settings.HELP_MORE
@@ -203,9 +204,7 @@ class CmdHelp(Command):
 
         # retrieve all available commands and database topics
         all_cmds = [cmd for cmd in cmdset if self.check_show_help(cmd, caller)]
-        all_topics = [
-            topic for topic in HelpEntry.objects.all() if topic.access(caller, "view", default=True)
-        ]
+        all_topics = HELP_INDEX.get_entries(caller)
         all_categories = list(
             set(
                 [cmd.help_category.lower() for cmd in all_cmds]
@@ -230,26 +229,19 @@ class CmdHelp(Command):
 
         # Try to access a particular command
 
-        # build vocabulary of suggestions and rate them by string similarity.
+        # build vocabulary of suggestions and look them up in the help index.
         suggestions = None
         if suggestion_maxnum > 0:
-            vocabulary = (
+            HELP_INDEX.index_commands(all_cmds)
+            vocabulary = set(
                 [cmd.key for cmd in all_cmds if cmd]
                 + [topic.key for topic in all_topics]
                 + all_categories
             )
-            [vocabulary.extend(cmd.aliases) for cmd in all_cmds]
-            suggestions = [
-                sugg
-                for sugg in string_suggestions(
-                    query, set(vocabulary), cutoff=suggestion_cutoff, maxnum=suggestion_maxnum
-                )
-                if sugg != query
-            ]
-            if not suggestions:
-                suggestions = [
-                    sugg for sugg in vocabulary if sugg != query and sugg.startswith(query)
-                ]
+            [vocabulary.update(cmd.aliases) for cmd in all_cmds]
+            suggestions = HELP_INDEX.suggest(
+                query, vocabulary, cutoff=suggestion_cutoff, maxnum=suggestion_maxnum
+            )
 
         # try an exact command auto-help match
         match = [cmd for cmd in all_cmds if cmd == query]
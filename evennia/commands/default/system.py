@@ -16,7 +16,10 @@ import twisted
 import time
 
 from django.conf import settings
+from django.db.models.query import QuerySet
 from evennia.server.sessionhandler import SESSIONS
+from evennia.server.profiling import tracing
+from evennia.server.profiling.cmdprofiler import COMMAND_PROFILER, SORT_KEYS
 from evennia.scripts.models import ScriptDB
 from evennia.objects.models import ObjectDB
 from evennia.accounts.models import AccountDB
@@ -44,6 +47,8 @@ __all__ = (
     "CmdAbout",
     "CmdTime",
     "CmdServerLoad",
+    "CmdCommandStats",
+    "CmdTraces",
 )
 
 
@@ -503,28 +508,27 @@ class CmdScripts(COMMAND_DEFAULT_CLASS):
                     caller.msg("Global script %s could not start correctly. See logs." % args)
                 return
 
-            # test first if this is a script match
+            # test first if this is a script match (a list for a dbref match)
             scripts = ScriptDB.objects.get_all_scripts(key=args)
-            if not scripts:
+            if not (scripts.exists() if isinstance(scripts, QuerySet) else scripts):
                 # try to find an object instead.
-                objects = ObjectDB.objects.object_search(args)
-                if objects:
-                    scripts = []
-                    for obj in objects:
-                        # get all scripts on the object(s)
-                        scripts.extend(ScriptDB.objects.get_all_scripts_on_obj(obj))
+                scripts = []
+                for obj in ObjectDB.objects.object_search(args):
+                    # get all scripts on the object(s)
+                    scripts.extend(ScriptDB.objects.get_all_scripts_on_obj(obj))
+                if not scripts:
+                    caller.msg(
+                        "No scripts found with a key '%s', or on an object named '%s'."
+                        % (args, args)
+                    )
+                    return
         else:
             # we want all scripts.
             scripts = ScriptDB.objects.get_all_scripts()
-            if not scripts:
+            if not scripts.exists():
                 caller.msg("No scripts are running.")
                 return
 
-        if not scripts:
-            string = "No scripts found with a key '%s', or on an object named '%s'." % (args, args)
-            caller.msg(string)
-            return
-
         if self.switches and self.switches[0] in ("stop", "del", "delete", "kill"):
             # we want to delete something
             if len(scripts) == 1:
@@ -549,6 +553,11 @@ class CmdScripts(COMMAND_DEFAULT_CLASS):
             string += "Started %s and stopped %s scripts." % (nr_started, nr_stopped)
         else:
             # No stopping or validation. We just want to view things.
+            if isinstance(scripts, QuerySet):
+                # only fetch and list the scripts on the page being viewed
+                # the table's header and borders take 4 lines of each page
+                EvMore(caller, scripts, page_formatter=format_script_list, page_overhead=4)
+                return
             string = format_script_list(scripts)
         EvMore(caller, string)
 
@@ -1105,6 +1114,166 @@ class CmdServerLoad(COMMAND_DEFAULT_CLASS):
         self.caller.msg(string)
 
 
+class CmdCommandStats(COMMAND_DEFAULT_CLASS):
+    """
+    show command execution statistics
+
+    Usage:
+      cmdstats[/switch] [calls||total||mean||max||queries||merge]
+
+    Switches:
+      start - start collecting statistics
+      stop - stop collecting statistics
+      reset - clear all statistics collected so far
+
+    When active, the command handler records how many times each
+    Command class was called, the wall time spent running it, how many
+    database queries it made and how long the cmdsets took to merge
+    before it could run. This shows the 20 most expensive commands,
+    sorted on total time unless another column is given.
+
+    Collection can also be started at server start by setting
+    |wCOMMAND_PROFILING|n to True in your settings file.
+
+    """
+
+    key = "cmdstats"
+    switch_options = ("start", "stop", "reset")
+    locks = "cmd:perm(list) or perm(Developer)"
+    help_category = "System"
+
+    def func(self):
+        """Show or manage command statistics."""
+        caller = self.caller
+
+        if "start" in self.switches:
+            COMMAND_PROFILER.start()
+            caller.msg("Started collecting command statistics.")
+            return
+        if "stop" in self.switches:
+            COMMAND_PROFILER.stop()
+            caller.msg("Stopped collecting command statistics.")
+            return
+        if "reset" in self.switches:
+            COMMAND_PROFILER.reset()
+            caller.msg("Cleared command statistics.")
+            return
+
+        sortby = self.args.strip().lower() or "total"
+        if sortby not in SORT_KEYS:
+            caller.msg("Can only sort by one of %s." % ", ".join(SORT_KEYS))
+            return
+
+        stats = COMMAND_PROFILER.get_stats(sortby=sortby)
+        status = "active" if COMMAND_PROFILER.enabled else "stopped (use cmdstats/start)"
+        if not stats:
+            caller.msg("No command statistics collected. Profiling is %s." % status)
+            return
+
+        table = self.styled_table(
+            "command", "calls", "total (s)", "mean (ms)", "max (ms)", "queries", "merge (ms)"
+        )
+        for stat in stats[:20]:
+            table.add_row(
+                stat["command"].rsplit(".", 1)[-1],
+                stat["calls"],
+                "%.3f" % stat["total"],
+                "%.2f" % (stat["mean"] * 1000),
+                "%.2f" % (stat["max"] * 1000),
+                "%.1f" % (stat["queries"] / stat["calls"]),
+                "%.2f" % (stat["merge"] / stat["calls"] * 1000),
+            )
+        caller.msg(
+            "|wCommand statistics|n (profiling is %s, sorted by %s; queries and merge are "
+            "per call):\n%s" % (status, sortby, table)
+        )
+
+
+class CmdTraces(COMMAND_DEFAULT_CLASS):
+    """
+    show traced messages
+
+    Usage:
+      traces [<number>]
+      traces/dump [<filename>]
+      traces/clear
+
+    Switches:
+      dump - write all traces to a Chrome trace-event JSON file
+      clear - empty the trace buffers of Server and Portal
+
+    Evennia can time-stamp a sample of all incoming messages as they
+    travel from the Portal to the Server, through the command handler
+    and back out again. This shows the |wnumber|n (default 5) latest
+    traces, with the time spent between each step of the way.
+
+    Tracing is off by default. Set |wMESSAGE_TRACE_SAMPLE_RATE|n in
+    your settings file to the fraction (0..1) of messages to trace and
+    reload.
+
+    The dump is written to |wmessage_traces.json|n in the log directory
+    unless another file name (without a directory) is given. Load it in chrome://tracing or
+    https://ui.perfetto.dev to view it as a timeline.
+
+    """
+
+    key = "traces"
+    switch_options = ("dump", "clear")
+    locks = "cmd:perm(Developer)"
+    help_category = "System"
+
+    def func(self):
+        """Show or dump the traces."""
+        caller = self.caller
+
+        if "clear" in self.switches:
+            nclear = tracing.clear_all_traces()
+            caller.msg("Cleared |w%i|n message trace(s)." % nclear)
+            return
+
+        if "dump" in self.switches:
+            filename = self.args.strip() or "message_traces.json"
+            if os.path.basename(filename) != filename or filename in (".", ".."):
+                # only allow writing to the log directory
+                caller.msg("Give a file name without a directory.")
+                return
+            filename = os.path.join(settings.LOG_DIR, filename)
+
+            def _dump(traces):
+                try:
+                    tracing.dump_chrome_trace(traces, filename)
+                except IOError as err:
+                    caller.msg("Could not write traces to %s: %s" % (filename, err))
+                else:
+                    caller.msg("Wrote |w%i|n message trace(s) to %s." % (len(traces), filename))
+
+            tracing.fetch_traces().addCallback(_dump)
+            return
+
+        num = int(self.args) if self.args.strip().isdigit() else 5
+
+        def _show(traces):
+            if not traces:
+                caller.msg(
+                    "No messages have been traced (see MESSAGE_TRACE_SAMPLE_RATE in settings)."
+                )
+                return
+            table = self.styled_table("trace", "hop", "step (ms)", "total (ms)", align="l")
+            for trace_id, hops in traces:
+                tstart = tlast = hops[0][1]
+                for ihop, (hop, timestamp) in enumerate(hops):
+                    table.add_row(
+                        "" if ihop else trace_id,
+                        hop,
+                        "%.3f" % ((timestamp - tlast) * 1000),
+                        "%.3f" % ((timestamp - tstart) * 1000),
+                    )
+                    tlast = timestamp
+            caller.msg("|wMessage traces|n (latest %i):\n%s" % (len(traces), table))
+
+        tracing.fetch_traces(num).addCallback(_show)
+
+
 class CmdTickers(COMMAND_DEFAULT_CLASS):
     """
     View running tickers
@@ -21,7 +21,7 @@ from mock import Mock, mock
 
 from evennia import DefaultRoom, DefaultExit, ObjectDB
 from evennia.commands.default.cmdset_character import CharacterCmdSet
-from evennia.utils.test_resources import EvenniaTest
+from evennia.utils.test_resources import EvenniaTest, connect_amp
 from evennia.commands.default import (
     help,
     general,
@@ -286,6 +286,9 @@ class TestSystem(CommandTest):
 
     def test_scripts(self):
         self.call(system.CmdScripts(), "", "dbref ")
+        self.call(system.CmdScripts(), "Script", "dbref ")
+        self.call(system.CmdScripts(), "Obj", "No scripts found with a key 'Obj'")
+        self.call(system.CmdScripts(), "nosuchthing", "No scripts found with a key")
 
     def test_objects(self):
         self.call(system.CmdObjects(), "", "Object subtype totals")
@@ -296,6 +299,45 @@ class TestSystem(CommandTest):
     def test_server_load(self):
         self.call(system.CmdServerLoad(), "", "Server CPU and Memory load:")
 
+    def test_cmdstats(self):
+        from evennia.server.profiling.cmdprofiler import COMMAND_PROFILER
+
+        self.call(system.CmdCommandStats(), "/start", "Started collecting command statistics.")
+        COMMAND_PROFILER.record(system.CmdServerLoad(), 0.1, merge_time=0.01, nqueries=3)
+        self.call(
+            system.CmdCommandStats(), "calls", "Command statistics (profiling is active, sorted by"
+        )
+        self.call(system.CmdCommandStats(), "foo", "Can only sort by one of")
+        self.call(system.CmdCommandStats(), "/stop", "Stopped collecting command statistics.")
+        self.call(system.CmdCommandStats(), "/reset", "Cleared command statistics.")
+        self.call(system.CmdCommandStats(), "", "No command statistics collected.")
+
+    def test_traces(self):
+        from evennia.server.profiling import tracing
+
+        tracing.clear_traces()
+        server, portal, pump = connect_amp()
+
+        def _call_over_amp(args):
+            # the answer arrives when the AMP box has been delivered
+            self.call(system.CmdTraces(), args)
+            with mock.patch.object(self.char1, "msg") as mock_msg:
+                pump.flush()
+            return ansi.strip_ansi(mock_msg.call_args[0][0]) if mock_msg.called else ""
+
+        with mock.patch("evennia.server.sessionhandler.SESSIONS.server", Mock(amp_protocol=server)):
+            self.assertIn("No messages have been traced", _call_over_amp(""))
+            tracing.stamp("abc", "portal.data_in")
+            tracing.stamp("abc", "server.cmdhandler")
+            self.assertIn("Message traces (latest 1):", _call_over_amp("3"))
+            self.call(system.CmdTraces(), "/clear", "Cleared 1 message trace(s).")
+            # stamped before the Portal got to clear its traces
+            tracing.stamp("def", "portal.data_in")
+            pump.flush()
+            self.assertEqual(tracing.get_traces(), [])
+        for filename in ("../settings.py", "/tmp/traces.json", ".."):
+            self.call(system.CmdTraces(), "/dump " + filename, "Give a file name without a")
+
 
 class TestAdmin(CommandTest):
     def test_emit(self):
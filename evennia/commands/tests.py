@@ -402,6 +402,42 @@ class TestGetAndMergeCmdSets(TwistedTestCase, EvenniaTest):
         return deferred
 
 
+class TestCmdHandlerProfiling(TwistedTestCase, EvenniaTest):
+    "Test the cmdhandler's command profiling."
+
+    def setUp(self):
+        super().setUp()
+        self.profiler = cmdhandler.COMMAND_PROFILER
+        self.profiler.reset()
+
+    def tearDown(self):
+        self.profiler.stop()
+        self.profiler.reset()
+        super().tearDown()
+
+    def test_profiling(self):
+        self.obj1.cmdset.add(_CmdSetA())
+        self.obj1.msg = lambda *args, **kwargs: None
+        deferred = cmdhandler.cmdhandler(self.obj1, "A", callertype="object")
+
+        def _callback(_):
+            # disabled
+            self.assertEqual(self.profiler.get_stats(), [])
+            self.profiler.start()
+            return cmdhandler.cmdhandler(self.obj1, "A", callertype="object")
+
+        def _callback2(_):
+            stats = self.profiler.get_stats()
+            self.assertEqual(len(stats), 1)
+            self.assertEqual(stats[0]["command"], "evennia.commands.tests._CmdA")
+            self.assertEqual(stats[0]["calls"], 1)
+            self.assertTrue(stats[0]["merge"] > 0)
+
+        deferred.addCallback(_callback)
+        deferred.addCallback(_callback2)
+        return deferred
+
+
 class AccessableCommand(Command):
     def access(*args, **kwargs):
         return True
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from queue import Queue
 import re
 import sys
+import time
 import traceback
 
 from django.conf import settings
@@ -20,6 +21,11 @@ from evennia.contrib.ingame_python.utils import get_next_wait, EVENTS, Interrupt
 
 # Constants
 RE_LINE_ERROR = re.compile(r'^  File "\<string\>", line (\d+)')
+# the Attribute holding the callbacks of an object
+CALLBACKS_KEY = "callbacks"
+CALLBACKS_CATEGORY = "ingame_python"
+# seconds a callback may take to run before it's disconnected
+TIME_BUDGET = getattr(settings, "EVENTS_TIME_BUDGET", None)
 
 
 class EventHandler(DefaultScript):
@@ -28,9 +34,10 @@ class EventHandler(DefaultScript):
     The event handler that contains all events in a global script.
 
     This script shouldn't be created more than once.  It contains
-    event (in a non-persistent attribute) and callbacks (in a
-    persistent attribute).  The script method would help adding,
-    editing and deleting these events and callbacks.
+    events (in a non-persistent attribute), while the callbacks are
+    stored in a persistent attribute on each object.  The script
+    method would help adding, editing and deleting these events and
+    callbacks.
 
     """
 
@@ -56,6 +63,7 @@ class EventHandler(DefaultScript):
         tasks:
 
         -   Create temporarily stored events.
+        -   Move callbacks from the old global storage to their objects.
         -   Generate locals (individual events' namespace).
         -   Load eventfuncs, including user-defined ones.
         -   Re-schedule tasks that aren't set to fire anymore.
@@ -66,6 +74,18 @@ class EventHandler(DefaultScript):
         for typeclass, name, variables, help_text, custom_call, custom_add in EVENTS:
             self.add_event(typeclass, name, variables, help_text, custom_call, custom_add)
 
+        # Callbacks of objects, compiled code and execution times
+        self.ndb.obj_callbacks = {}
+        self.ndb.compiled = {}
+        self.ndb.stats = {}
+
+        # Callbacks used to be stored all together on this script
+        if self.db.callbacks:
+            for obj, obj_callbacks in self.db.callbacks.items():
+                if obj:
+                    obj.attributes.add(CALLBACKS_KEY, obj_callbacks, category=CALLBACKS_CATEGORY)
+            self.db.callbacks = {}
+
         # Generate locals
         self.ndb.current_locals = {}
         self.ndb.fresh_locals = {}
@@ -173,6 +193,37 @@ class EventHandler(DefaultScript):
         """
         return self.ndb.current_locals.get(variable_name)
 
+    def get_obj_callbacks(self, obj, create=False):
+        """
+        Return the stored callbacks of an object.
+
+        Args:
+            obj (Object): the connected object.
+            create (bool, optional): create the storage if the object
+                has no callbacks yet.
+
+        Returns:
+            A dictionary {callback_name: [callback, ...]}, saved to the
+            object when changed.  The callbacks are dictionaries without
+            the "obj", "name" and "number" keys of `get_callbacks`.
+
+        Notes:
+            The dictionary is kept in memory, so the object's Attribute
+            is not read (and unpickled) every time a callback is called.
+
+        """
+        cache = self.ndb.obj_callbacks
+        obj_callbacks = cache.get(obj)
+        if obj_callbacks is None:
+            obj_callbacks = obj.attributes.get(CALLBACKS_KEY, category=CALLBACKS_CATEGORY)
+            if obj_callbacks is None:
+                if not create:
+                    return {}
+                obj.attributes.add(CALLBACKS_KEY, {}, category=CALLBACKS_CATEGORY)
+                obj_callbacks = obj.attributes.get(CALLBACKS_KEY, category=CALLBACKS_CATEGORY)
+            cache[obj] = obj_callbacks
+        return obj_callbacks
+
     def get_callbacks(self, obj):
         """
         Return a dictionary of the object's callbacks.
@@ -188,7 +239,7 @@ class EventHandler(DefaultScript):
             when several objects would share callbacks.
 
         """
-        obj_callbacks = self.db.callbacks.get(obj, {})
+        obj_callbacks = self.get_obj_callbacks(obj)
         callbacks = {}
         for callback_name, callback_list in obj_callbacks.items():
             new_list = []
@@ -220,11 +271,7 @@ class EventHandler(DefaultScript):
             This method doesn't check that the callback type exists.
 
         """
-        obj_callbacks = self.db.callbacks.get(obj, {})
-        if not obj_callbacks:
-            self.db.callbacks[obj] = {}
-            obj_callbacks = self.db.callbacks[obj]
-
+        obj_callbacks = self.get_obj_callbacks(obj, create=True)
         callbacks = obj_callbacks.get(callback_name, [])
         if not callbacks:
             obj_callbacks[callback_name] = []
@@ -276,11 +323,7 @@ class EventHandler(DefaultScript):
             This method doesn't check that the callback type exists.
 
         """
-        obj_callbacks = self.db.callbacks.get(obj, {})
-        if not obj_callbacks:
-            self.db.callbacks[obj] = {}
-            obj_callbacks = self.db.callbacks[obj]
-
+        obj_callbacks = self.get_obj_callbacks(obj, create=True)
         callbacks = obj_callbacks.get(callback_name, [])
         if not callbacks:
             obj_callbacks[callback_name] = []
@@ -294,6 +337,7 @@ class EventHandler(DefaultScript):
         callbacks[number].update(
             {"updated_on": datetime.now(), "updated_by": author, "valid": valid, "code": code}
         )
+        self.ndb.stats.pop((obj, callback_name, number), None)
 
         # If not valid, set it in 'to_valid'
         if not valid and (obj, callback_name, number) not in self.db.to_valid:
@@ -321,7 +365,7 @@ class EventHandler(DefaultScript):
             RuntimeError if the callback is locked.
 
         """
-        obj_callbacks = self.db.callbacks.get(obj, {})
+        obj_callbacks = self.get_obj_callbacks(obj)
         callbacks = obj_callbacks.get(callback_name, [])
 
         # If locked, don't edit it
@@ -339,6 +383,11 @@ class EventHandler(DefaultScript):
             )
             del callbacks[number]
 
+        # Numbers of the following callbacks change
+        for key in list(self.ndb.stats):
+            if key[0] == obj and key[1] == callback_name and key[2] >= number:
+                del self.ndb.stats[key]
+
         # Change IDs of callbacks to be validated
         i = 0
         while i < len(self.db.to_valid):
@@ -380,7 +429,7 @@ class EventHandler(DefaultScript):
             number (int): the number of the callback.
 
         """
-        obj_callbacks = self.db.callbacks.get(obj, {})
+        obj_callbacks = self.get_obj_callbacks(obj)
         callbacks = obj_callbacks.get(callback_name, [])
 
         # Accept and connect the callback
@@ -442,11 +491,18 @@ class EventHandler(DefaultScript):
         else:
             locals = {key: value for key, value in locals.items()}
 
-        callbacks = self.get_callbacks(obj).get(callback_name, [])
-        if event:
-            custom_call = event[2]
-            if custom_call:
-                callbacks = custom_call(callbacks, parameters)
+        custom_call = event[2] if event else None
+        if custom_call:
+            callbacks = self.get_callbacks(obj).get(callback_name, [])
+            callbacks = custom_call(callbacks, parameters)
+        else:
+            # avoid copying the callbacks when not needed
+            callbacks = self.get_obj_callbacks(obj).get(callback_name, [])
+            if callbacks and number is not None:
+                callbacks = callbacks[number : number + 1]
+                i_offset = number
+            else:
+                i_offset = 0
 
         # Now execute all the valid callbacks linked at this address
         self.ndb.current_locals = locals
@@ -454,20 +510,115 @@ class EventHandler(DefaultScript):
             if not callback["valid"]:
                 continue
 
-            if number is not None and callback["number"] != number:
+            callback_number = callback["number"] if custom_call else i + i_offset
+            if number is not None and callback_number != number:
                 continue
 
+            start = time.time()
             try:
-                exec(callback["code"], locals, locals)
+                exec(
+                    self.get_compiled(obj, callback_name, callback_number, callback["code"]),
+                    locals,
+                    locals,
+                )
             except InterruptEvent:
                 return False
             except Exception:
                 etype, evalue, tb = sys.exc_info()
                 trace = traceback.format_exception(etype, evalue, tb)
+                if not custom_call:
+                    callback = dict(callback)
+                    callback.update({"obj": obj, "name": callback_name, "number": callback_number})
                 self.handle_error(callback, trace)
+            finally:
+                self.record_time(obj, callback_name, callback_number, time.time() - start)
 
         return True
 
+    def get_compiled(self, obj, callback_name, number, code):
+        """
+        Return the compiled code of a callback.
+
+        Args:
+            obj (Object): the object containing the callback.
+            callback_name (str): the name of the callback.
+            number (int): the number of the callback.
+            code (str): the Python code of the callback.
+
+        Returns:
+            The code object, compiled only when the code changed.
+
+        """
+        compiled = self.ndb.compiled
+        key = (obj, callback_name, number)
+        code_hash = hash(code)
+        cached = compiled.get(key)
+        if cached and cached[0] == code_hash:
+            return cached[1]
+
+        code_obj = compile(code, "<string>", "exec")
+        compiled[key] = (code_hash, code_obj)
+        return code_obj
+
+    def record_time(self, obj, callback_name, number, duration):
+        """
+        Record the time a callback took to run.
+
+        Args:
+            obj (Object): the object containing the callback.
+            callback_name (str): the name of the callback.
+            number (int): the number of the callback.
+            duration (float): the time in seconds.
+
+        Notes:
+            If the `EVENTS_TIME_BUDGET` setting is set and the callback
+            took longer than that many seconds, it's disconnected and
+            will need validation again.
+
+        """
+        key = (obj, callback_name, number)
+        stats = self.ndb.stats.get(key)
+        if stats is None:
+            stats = self.ndb.stats[key] = {"calls": 0, "time": 0.0, "max": 0.0}
+        stats["calls"] += 1
+        stats["time"] += duration
+        stats["max"] = max(stats["max"], duration)
+
+        if TIME_BUDGET and duration > TIME_BUDGET:
+            callbacks = self.get_obj_callbacks(obj).get(callback_name, [])
+            if number < len(callbacks) and callbacks[number]["valid"]:
+                callbacks[number].update({"valid": False})
+                if key not in self.db.to_valid:
+                    self.db.to_valid.append(key)
+                err_msg = (
+                    "Callback {} of {} (#{})[{}] took {:.3f}s (budget {}s) and was "
+                    "disconnected until validated again.".format(
+                        callback_name, obj, obj.id, number + 1, duration, TIME_BUDGET
+                    )
+                )
+                logger.log_warn(err_msg)
+                if self.ndb.channel:
+                    self.ndb.channel.msg(err_msg)
+
+    def get_stats(self, obj=None):
+        """
+        Return the execution times of callbacks since the last reload.
+
+        Args:
+            obj (Object, optional): only return the callbacks of this object.
+
+        Returns:
+            A dictionary {(obj, callback_name, number): stats}, where stats
+            is a dictionary with the number of "calls", the total "time"
+            and the "max" time of a call, in seconds.
+
+        """
+        return {
+            key: dict(stats)
+            for key, stats in self.ndb.stats.items()
+            if obj is None or key[0] == obj
+        }
+
     def handle_error(self, callback, trace):
         """
         Handle an error in a callback.
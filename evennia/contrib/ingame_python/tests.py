@@ -2,7 +2,7 @@
 Module containing the test cases for the in-game Python system.
 """
 
-from mock import Mock
+from mock import Mock, patch
 from textwrap import dedent
 
 from django.conf import settings
@@ -245,6 +245,59 @@ class TestEventHandler(EvenniaTest):
         self.room1.callbacks.remove("dummy", 0)
         self.assertEqual(self.room1.callbacks.all(), {})
 
+    def test_storage(self):
+        """Callbacks are stored on their object."""
+        self.handler.add_callback(self.room1, "dummy", "pass", author=self.char1, valid=True)
+        stored = self.room1.attributes.get("callbacks", category="ingame_python")
+        self.assertEqual(stored["dummy"][0]["code"], "pass")
+        self.assertEqual(self.handler.db.callbacks, {})
+
+        # Callbacks in the old global storage are moved on start
+        self.handler.db.callbacks = {self.room2: {"dummy": [dict(stored["dummy"][0])]}}
+        self.handler.at_start()
+        self.assertEqual(self.handler.db.callbacks, {})
+        self.assertEqual(len(self.handler.get_callbacks(self.room2)["dummy"]), 1)
+
+    def test_compiled(self):
+        """The code of callbacks is compiled once."""
+        self.handler.add_callback(
+            self.room1, "dummy", "character.db.strength = 5", author=self.char1, valid=True
+        )
+        locals = {"character": self.char1}
+        self.assertTrue(self.handler.call(self.room1, "dummy", locals=locals))
+        compiled = self.handler.get_compiled(self.room1, "dummy", 0, "character.db.strength = 5")
+        self.assertTrue(self.handler.call(self.room1, "dummy", locals=locals))
+        self.assertIs(
+            self.handler.get_compiled(self.room1, "dummy", 0, "character.db.strength = 5"),
+            compiled,
+        )
+        self.assertEqual(self.char1.db.strength, 5)
+
+        # Editing the callback uses the new code
+        self.handler.edit_callback(
+            self.room1, "dummy", 0, "character.db.strength = 6", author=self.char1, valid=True
+        )
+        self.assertTrue(self.handler.call(self.room1, "dummy", locals=locals))
+        self.assertEqual(self.char1.db.strength, 6)
+
+        stats = self.handler.get_stats(self.room1)[(self.room1, "dummy", 0)]
+        self.assertEqual(stats["calls"], 1)
+
+    def test_time_budget(self):
+        """Callbacks going over the time budget are disconnected."""
+        self.handler.add_callback(self.room1, "dummy", "pass", author=self.char1, valid=True)
+        with patch("evennia.contrib.ingame_python.scripts.TIME_BUDGET", 1), patch(
+            "evennia.contrib.ingame_python.scripts.time.time", Mock(side_effect=[0, 0.5, 10, 12])
+        ), patch("evennia.contrib.ingame_python.scripts.logger") as mock_logger:
+            self.handler.call(self.room1, "dummy", locals={})
+            self.assertTrue(self.handler.get_callbacks(self.room1)["dummy"][0]["valid"])
+            self.handler.call(self.room1, "dummy", locals={})
+        self.assertFalse(self.handler.get_callbacks(self.room1)["dummy"][0]["valid"])
+        self.assertIn((self.room1, "dummy", 0), self.handler.db.to_valid)
+        self.assertTrue(mock_logger.log_warn.called)
+        stats = self.handler.get_stats()[(self.room1, "dummy", 0)]
+        self.assertEqual((stats["calls"], stats["time"], stats["max"]), (2, 2.5, 2))
+
 
 class TestCmdCallback(CommandTest):
 
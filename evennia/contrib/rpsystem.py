@@ -96,7 +96,7 @@ Verbose Installation Instructions:
 """
 import re
 from re import escape as re_escape
-import itertools
+from collections import OrderedDict
 from django.conf import settings
 from evennia import DefaultObject, DefaultCharacter, ObjectDB
 from evennia import Command, CmdSet
@@ -151,6 +151,12 @@ _RE_SELF_REF = re.compile(r"/me|@", _RE_FLAGS)
 # regex for non-alphanumberic end of a string
 _RE_CHAREND = re.compile(r"\W+$", _RE_FLAGS)
 
+# the marker and eventual num-specifier before a reference, like /2-
+_RE_NUM_PREFIX = re.compile(r"%s[0-9]*%s*" % (_PREFIX, _NUM_SEP))
+
+# a character that may end a reference
+_RE_NONWORD = re.compile(r"\W", _RE_FLAGS)
+
 # reference markers for language
 _RE_REF_LANG = re.compile(r"\{+\##([0-9]+)\}+")
 # language says in the emote are on the form "..." or langname"..." (no spaces).
@@ -188,6 +194,129 @@ def _dummy_process(text, *args, **kwargs):
 # emoting mechanisms
 
 
+def sentence_words(sentence):
+    """
+    Split a sentence, like an sdesc, into the words it can be
+    referenced by.
+
+    Args:
+        sentence (str): The sentence to split.
+
+    Returns:
+        words (tuple): The words of the sentence.
+
+    """
+    # escape {#nnn} markers from sentence, replace with nnn
+    sentence = _RE_REF.sub(r"\1", sentence)
+    # escape {##nnn} markers, replace with nnn
+    sentence = _RE_REF_LANG.sub(r"\1", sentence)
+    # escape self-ref marker from sentence
+    sentence = _RE_SELF_REF.sub(r"", sentence)
+    return tuple(sentence.split())
+
+
+class TokenTrie(object):
+    """
+    A trie of words, matching the same 'ordered permutations' of
+    sentences as `ordered_permutation_regex`, but for many sentences
+    at once. Every run of consecutive words of a sentence is stored
+    (that is, n*(n+1)/2 paths for a sentence of n words), so matching a
+    reference only needs to walk the trie once, word by word.
+
+    """
+
+    def __init__(self, wordlists=()):
+        """
+        Args:
+            wordlists (iterable, optional): Sentences to add, each as a
+                tuple of words (see `sentence_words`). They are identified
+                by their index in `wordlists`.
+
+        """
+        # nodes are [{word: node, ...}, {entry, ...}]
+        self.root = [{}, set()]
+        for entry, words in enumerate(wordlists):
+            self.add(words, entry)
+
+    def add(self, words, entry):
+        """
+        Add a sentence to the trie.
+
+        Args:
+            words (tuple): The words of the sentence.
+            entry (any): What to return when matching the sentence.
+
+        """
+        words = [word.lower() for word in words]
+        for istart in range(len(words)):
+            node = self.root
+            for word in words[istart:]:
+                node = node[0].setdefault(word, [{}, set()])
+                node[1].add(entry)
+
+    def match(self, string, pos=0):
+        """
+        Find the sentences with the longest run of words matching a
+        string, from a given position. The last matched word must be
+        followed by a non-word character or the end of `string`.
+
+        Args:
+            string (str): The string to match.
+            pos (int, optional): Where in `string` to start matching.
+
+        Returns:
+            (end, entries) (tuple): Where in `string` the longest match
+                ends and the set of entries matching it. If nothing
+                matched, this is `(-1, set())`.
+
+        """
+        node, strlen = self.root, len(string)
+        best_end, best = -1, set()
+        while node[0]:
+            end = string.find(" ", pos)
+            end = strlen if end == -1 else end
+            for iend in range(pos + 1, end + 1):
+                if iend == end or _RE_NONWORD.match(string, iend):
+                    child = node[0].get(string[pos:iend].lower())
+                    if child:
+                        best_end, best = iend, child[1]
+            node = node[0].get(string[pos:end].lower())
+            if not node or end == strlen:
+                break
+            pos = end + 1
+        return best_end, best
+
+
+# cache of the latest used tries, {wordlists: TokenTrie}
+_TOKEN_TRIES = OrderedDict()
+_TOKEN_TRIE_CACHE_SIZE = 200
+
+
+def get_token_trie(wordlists):
+    """
+    Get a (cached) TokenTrie. As long as the candidates in a room and
+    their sdescs and recogs don't change, every emote in that room
+    reuses the same trie.
+
+    Args:
+        wordlists (iterable): Sentences, each as a tuple of words.
+
+    Returns:
+        trie (TokenTrie): A trie with the sentences, identified
+            by their index in `wordlists`.
+
+    """
+    key = tuple(wordlists)
+    try:
+        trie = _TOKEN_TRIES.pop(key)
+    except KeyError:
+        trie = TokenTrie(key)
+        if len(_TOKEN_TRIES) >= _TOKEN_TRIE_CACHE_SIZE:
+            _TOKEN_TRIES.popitem(last=False)
+    _TOKEN_TRIES[key] = trie
+    return trie
+
+
 def ordered_permutation_regex(sentence):
     """
     Builds a regex that matches 'ordered permutations' of a sentence's
@@ -211,28 +340,15 @@ def ordered_permutation_regex(sentence):
          like /2-tall.
 
     """
-    # escape {#nnn} markers from sentence, replace with nnn
-    sentence = _RE_REF.sub(r"\1", sentence)
-    # escape {##nnn} markers, replace with nnn
-    sentence = _RE_REF_LANG.sub(r"\1", sentence)
-    # escape self-ref marker from sentence
-    sentence = _RE_SELF_REF.sub(r"", sentence)
-
-    # ordered permutation algorithm
-    words = sentence.split()
-    combinations = itertools.product((True, False), repeat=len(words))
+    # ordered permutation algorithm: all runs of consecutive words
+    words = sentence_words(sentence)
     solution = []
-    for combination in combinations:
-        comb = []
-        for iword, word in enumerate(words):
-            if combination[iword]:
-                comb.append(word)
-            elif comb:
-                break
-        if comb:
+    for istart in range(len(words)):
+        for iend in range(istart + 1, len(words) + 1):
             solution.append(
                 _PREFIX
-                + r"[0-9]*%s*%s(?=\W|$)+" % (_NUM_SEP, re_escape(" ".join(comb)).rstrip("\\"))
+                + r"[0-9]*%s*%s(?=\W|$)+"
+                % (_NUM_SEP, re_escape(" ".join(words[istart:iend])).rstrip("\\"))
             )
 
     # combine into a match regex, first matching the longest down to the shortest components
@@ -240,13 +356,28 @@ def ordered_permutation_regex(sentence):
     return regex
 
 
+def match_tuple_from_key_alias(obj):
+    """
+    This will build a match tuple for any object, not just from those
+    with sdesc/recog handlers. It's used as a legacy mechanism for
+    being able to mix this contrib with objects not using sdescs.
+
+    Args:
+        obj (Object): This object's key and eventual aliases will
+            be used to build the tuple.
+
+    Returns:
+        match_tuple (tuple): A tuple (words, obj, key)
+
+    """
+    return (sentence_words(" ".join([obj.key] + obj.aliases.all())), obj, obj.key)
+
+
 def regex_tuple_from_key_alias(obj):
     """
     This will build a regex tuple for any object, not just from those
-    with sdesc/recog handlers. It's used as a legacy mechanism for
-    being able to mix this contrib with objects not using sdescs, but
-    note that creating the ordered permutation regex dynamically for
-    every object will add computational overhead.
+    with sdesc/recog handlers. The emote parser no longer uses regexes
+    (see `match_tuple_from_key_alias`); this is kept for custom code.
 
     Args:
         obj (Object): This object's key and eventual aliases will
@@ -358,24 +489,27 @@ def parse_sdescs_and_recogs(sender, candidates, string, search_mode=False):
         - says, "..." are
 
     """
-    # Load all candidate regex tuples [(regex, obj, sdesc/recog),...]
-    candidate_regexes = (
-        ([(_RE_SELF_REF, sender, sender.sdesc.get())] if hasattr(sender, "sdesc") else [])
-        + (
-            [sender.recog.get_regex_tuple(obj) for obj in candidates]
+    # the self-reference is matched separately, it takes priority over the rest
+    self_ref = (sender, sender.sdesc.get()) if hasattr(sender, "sdesc") else None
+
+    # Load all candidate match tuples [(words, obj, sdesc/recog),...]
+    candidate_tuples = (
+        (
+            [sender.recog.get_match_tuple(obj) for obj in candidates]
             if hasattr(sender, "recog")
             else []
         )
-        + [obj.sdesc.get_regex_tuple() for obj in candidates if hasattr(obj, "sdesc")]
+        + [obj.sdesc.get_match_tuple() for obj in candidates if hasattr(obj, "sdesc")]
         + [
-            regex_tuple_from_key_alias(obj)  # handle objects without sdescs
+            match_tuple_from_key_alias(obj)  # handle objects without sdescs
             for obj in candidates
             if not (hasattr(obj, "recog") and hasattr(obj, "sdesc"))
         ]
     )
 
     # filter out non-found data
-    candidate_regexes = [tup for tup in candidate_regexes if tup]
+    candidate_tuples = [tup for tup in candidate_tuples if tup and tup[0]]
+    trie = get_token_trie(tup[0] for tup in candidate_tuples)
 
     # escape mapping syntax on the form {#id} if it exists already in emote,
     # if so it is replaced with just "id".
@@ -399,15 +533,22 @@ def parse_sdescs_and_recogs(sender, candidates, string, search_mode=False):
         istart0 = marker_match.start()
         istart = istart0
 
-        # loop over all candidate regexes and match against the string following the match
-        matches = ((reg.match(string[istart:]), obj, text) for reg, obj, text in candidate_regexes)
-
-        # score matches by how long part of the string was matched
-        matches = [(match.end() if match else -1, obj, text) for match, obj, text in matches]
-        maxscore = max(score for score, obj, text in matches)
+        # match the self-reference and all candidates against the string following the match,
+        # scoring matches by how long part of the string was matched
+        matches = []
+        if self_ref:
+            match = _RE_SELF_REF.match(string, istart)
+            if match:
+                matches.append((match.end() - istart, [self_ref]))
+        iend, entries = trie.match(string, _RE_NUM_PREFIX.match(string, istart).end())
+        if entries:
+            matches.append(
+                (iend - istart, [candidate_tuples[ientry][1:] for ientry in sorted(entries)])
+            )
+        maxscore = max(score for score, _ in matches) if matches else -1
 
-        # we have a valid maxscore, extract all matches with this value
-        bestmatches = [(obj, text) for score, obj, text in matches if maxscore == score != -1]
+        # extract all matches with the max score
+        bestmatches = [tup for score, tups in matches if score == maxscore for tup in tups]
         nmatches = len(bestmatches)
 
         if not nmatches:
@@ -584,7 +725,6 @@ class SdescHandler(object):
     The handler stores data in the following Attributes
 
         _sdesc   - a string
-        _regex  - an empty dictionary
 
     """
 
@@ -598,7 +738,8 @@ class SdescHandler(object):
         """
         self.obj = obj
         self.sdesc = ""
-        self.sdesc_regex = ""
+        self.sdesc_words = ()
+        self.sdesc_regex = None
         self._cache()
 
     def _cache(self):
@@ -607,8 +748,8 @@ class SdescHandler(object):
 
         """
         self.sdesc = self.obj.attributes.get("_sdesc", default="")
-        sdesc_regex = self.obj.attributes.get("_sdesc_regex", default="")
-        self.sdesc_regex = re.compile(sdesc_regex, _RE_FLAGS)
+        self.sdesc_words = sentence_words(ansi.strip_ansi(self.sdesc))
+        self.sdesc_regex = None
 
     def add(self, sdesc, max_length=60):
         """
@@ -649,12 +790,11 @@ class SdescHandler(object):
             )
 
         # store to attributes
-        sdesc_regex = ordered_permutation_regex(cleaned_sdesc)
         self.obj.attributes.add("_sdesc", sdesc)
-        self.obj.attributes.add("_sdesc_regex", sdesc_regex)
         # local caching
         self.sdesc = sdesc
-        self.sdesc_regex = re.compile(sdesc_regex, _RE_FLAGS)
+        self.sdesc_words = sentence_words(cleaned_sdesc)
+        self.sdesc_regex = None
 
         return sdesc
 
@@ -666,14 +806,29 @@ class SdescHandler(object):
         """
         return self.sdesc or self.obj.key
 
-    def get_regex_tuple(self):
+    def get_match_tuple(self):
         """
         Return data for sdesc/recog handling
 
+        Returns:
+            tup (tuple): tuple (sdesc_words, obj, sdesc)
+
+        """
+        return self.sdesc_words, self.obj, self.sdesc
+
+    def get_regex_tuple(self):
+        """
+        Return a regex for matching the sdesc. The emote parser uses
+        `get_match_tuple` instead; this is kept for custom code.
+
         Returns:
             tup (tuple): tuple (sdesc_regex, obj, sdesc)
 
         """
+        if self.sdesc_regex is None:
+            self.sdesc_regex = re.compile(
+                ordered_permutation_regex(ansi.strip_ansi(self.sdesc)), _RE_FLAGS
+            )
         return self.sdesc_regex, self.obj, self.sdesc
 
 
@@ -687,7 +842,6 @@ class RecogHandler(object):
 
         _recog_ref2recog
         _recog_obj2recog
-        _recog_obj2regex
 
     """
 
@@ -704,6 +858,7 @@ class RecogHandler(object):
         self.ref2recog = {}
         self.obj2regex = {}
         self.obj2recog = {}
+        self.obj2words = {}
         self._cache()
 
     def _cache(self):
@@ -711,12 +866,13 @@ class RecogHandler(object):
         Load data to handler cache
         """
         self.ref2recog = self.obj.attributes.get("_recog_ref2recog", default={})
-        obj2regex = self.obj.attributes.get("_recog_obj2regex", default={})
         obj2recog = self.obj.attributes.get("_recog_obj2recog", default={})
-        self.obj2regex = dict(
-            (obj, re.compile(regex, _RE_FLAGS)) for obj, regex in obj2regex.items() if obj
-        )
         self.obj2recog = dict((obj, recog) for obj, recog in obj2recog.items() if obj)
+        self.obj2words = dict(
+            (obj, sentence_words(ansi.strip_ansi(recog))) for obj, recog in self.obj2recog.items()
+        )
+        # regexes are only built on demand, by get_regex_tuple
+        self.obj2regex = {}
 
     def add(self, obj, recog, max_length=60):
         """
@@ -766,12 +922,11 @@ class RecogHandler(object):
         key = "#%i" % obj.id
         self.obj.attributes.get("_recog_ref2recog", default={})[key] = recog
         self.obj.attributes.get("_recog_obj2recog", default={})[obj] = recog
-        regex = ordered_permutation_regex(cleaned_recog)
-        self.obj.attributes.get("_recog_obj2regex", default={})[obj] = regex
         # local caching
         self.ref2recog[key] = recog
         self.obj2recog[obj] = recog
-        self.obj2regex[obj] = re.compile(regex, _RE_FLAGS)
+        self.obj2words[obj] = sentence_words(cleaned_recog)
+        self.obj2regex.pop(obj, None)
         return recog
 
     def get(self, obj):
@@ -817,17 +972,36 @@ class RecogHandler(object):
         """
         if obj in self.obj2recog:
             del self.obj.db._recog_obj2recog[obj]
-            del self.obj.db._recog_obj2regex[obj]
             del self.obj.db._recog_ref2recog["#%i" % obj.id]
+            if self.obj.attributes.has("_recog_obj2regex"):
+                # regexes stored by older versions
+                self.obj.db._recog_obj2regex.pop(obj, None)
         self._cache()
 
+    def get_match_tuple(self, obj):
+        """
+        Returns:
+            rec (tuple): Tuple (recog_words, obj, recog) or `None`
+                if there is no (enabled) recog for `obj`.
+        """
+        if obj in self.obj2recog and obj.access(self.obj, "enable_recog", default=True):
+            return self.obj2words[obj], obj, self.obj2recog[obj]
+        return None
+
     def get_regex_tuple(self, obj):
         """
+        The emote parser uses `get_match_tuple` instead; this is
+        kept for custom code.
+
         Returns:
             rec (tuple): Tuple (recog_regex, obj, recog)
         """
         if obj in self.obj2recog and obj.access(self.obj, "enable_recog", default=True):
-            return self.obj2regex[obj], obj, self.obj2regex[obj]
+            if obj not in self.obj2regex:
+                self.obj2regex[obj] = re.compile(
+                    ordered_permutation_regex(ansi.strip_ansi(self.obj2recog[obj])), _RE_FLAGS
+                )
+            return self.obj2regex[obj], obj, self.obj2recog[obj]
         return None
 
 
@@ -1541,10 +1715,8 @@ class ContribRPCharacter(DefaultCharacter, ContribRPObject):
         super().at_object_creation()
 
         self.db._sdesc = ""
-        self.db._sdesc_regex = ""
 
         self.db._recog_ref2recog = {}
-        self.db._recog_obj2regex = {}
         self.db._recog_obj2recog = {}
 
         self.cmdset.add(RPSystemCmdSet, permanent=True)
@@ -139,6 +139,52 @@ class TestRPSystem(EvenniaTest):
             "/[0-9]*-*A(?=\\W|$)+",
         )
 
+    def test_token_trie(self):
+        trie = rpsystem.TokenTrie([("A", "tall", "man"), ("The", "tall", "Woman")])
+        self.assertEqual(trie.match("/tall man, hi", 1), (9, {0}))
+        self.assertEqual(trie.match("/tall wo", 1), (5, {0, 1}))
+        self.assertEqual(trie.match("/a TALL", 1), (7, {0}))
+        self.assertEqual(trie.match("/woman's", 1), (6, {1}))
+        self.assertEqual(trie.match("/tallish", 1), (-1, set()))
+        self.assertEqual(trie.match("/man tall", 1), (4, {0}))
+
+    def test_parse_sdescs_and_recogs_trie(self):
+        long_sdesc = " ".join("word%i" % iword for iword in range(40))
+        self.receiver1.sdesc.add(long_sdesc, max_length=1000)
+        self.receiver2.sdesc.add("A tall woman")
+        candidates = (self.receiver1, self.receiver2)
+        self.assertEqual(
+            rpsystem.parse_sdescs_and_recogs(
+                self.speaker, candidates, "/me nods to /word12 word13 word14 and /woman."
+            ),
+            (
+                "{#%i} nods to {#%i} and {#%i}."
+                % (self.speaker.id, self.receiver1.id, self.receiver2.id),
+                {
+                    "#%i" % self.speaker.id: self.speaker,
+                    "#%i" % self.receiver1.id: self.receiver1,
+                    "#%i" % self.receiver2.id: self.receiver2,
+                },
+            ),
+        )
+        self.receiver1.sdesc.add("A tall man")
+        with self.assertRaises(rpsystem.EmoteError):
+            rpsystem.parse_sdescs_and_recogs(self.speaker, candidates, "/me nods to /tall.")
+        self.assertEqual(
+            rpsystem.parse_sdescs_and_recogs(self.speaker, candidates, "/2-tall", search_mode=True),
+            [self.receiver2],
+        )
+        # recogs are listed before sdescs
+        self.speaker.recog.add(self.receiver2, "Tall Sally")
+        self.assertEqual(
+            rpsystem.parse_sdescs_and_recogs(self.speaker, candidates, "/tall", search_mode=True),
+            [self.receiver2, self.receiver1, self.receiver2],
+        )
+        self.assertEqual(
+            rpsystem.parse_sdescs_and_recogs(self.speaker, candidates, "/sally", search_mode=True),
+            [self.receiver2],
+        )
+
     def test_sdesc_handler(self):
         self.speaker.sdesc.add(sdesc0)
         self.assertEqual(self.speaker.sdesc.get(), sdesc0)
@@ -555,14 +601,14 @@ class TestWilderness(EvenniaTest):
         wilderness.enter_wilderness(self.char1)
         self.assertIsInstance(self.char1.location, wilderness.WildernessRoom)
         w = self.get_wilderness_script()
-        self.assertEqual(w.db.itemcoordinates[self.char1], (0, 0))
+        self.assertEqual(w.itemcoordinates[self.char1], (0, 0))
 
     def test_enter_wilderness_custom_coordinates(self):
         wilderness.create_wilderness()
         wilderness.enter_wilderness(self.char1, coordinates=(1, 2))
         self.assertIsInstance(self.char1.location, wilderness.WildernessRoom)
         w = self.get_wilderness_script()
-        self.assertEqual(w.db.itemcoordinates[self.char1], (1, 2))
+        self.assertEqual(w.itemcoordinates[self.char1], (1, 2))
 
     def test_enter_wilderness_custom_name(self):
         name = "customnname"
@@ -656,6 +702,55 @@ class TestWilderness(EvenniaTest):
             new_loc = wilderness.get_new_coordinates(loc, direction)
             self.assertEqual(new_loc, correct_loc, direction)
 
+    def test_spatial_hash(self):
+        index = wilderness.SpatialHash(cellsize=4)
+        index.add("a", (0, 0))
+        index.add("b", (3, 4))
+        index.add("c", (10, 10))
+        index.add("d", (-5, 1))
+        self.assertEqual(index.at((3, 4)), ["b"])
+        self.assertEqual(sorted(index.in_radius((0, 0), 5)), ["a", "b"])
+        self.assertEqual(sorted(index.in_radius((0, 0), 4.9)), ["a"])
+        self.assertEqual(sorted(index.in_box((-5, 0), (3, 3))), ["a", "d"])
+        self.assertEqual(sorted(index.in_box((-1000, -1000), (1000, 1000))), ["a", "b", "c", "d"])
+        index.add("a", (10, 10))
+        self.assertEqual(index.at((0, 0)), [])
+        self.assertEqual(sorted(index.at((10, 10))), ["a", "c"])
+        self.assertEqual(index.remove("c"), (10, 10))
+        self.assertEqual(index.remove("c"), None)
+        self.assertEqual(len(index), 3)
+
+    def test_nearby_and_persistence(self):
+        wilderness.create_wilderness()
+        w = self.get_wilderness_script()
+        wilderness.enter_wilderness(self.char1, coordinates=(1, 1))
+        wilderness.enter_wilderness(self.char2, coordinates=(3, 3))
+        self.assertEqual(w.get_objs_in_radius((1, 1), 2), [self.char1])
+        self.assertEqual(set(w.get_objs_in_box((0, 0), (3, 3))), set([self.char1, self.char2]))
+        # coordinates are stored on each object and reloaded from there
+        self.assertEqual(
+            self.char2.attributes.get("coordinates", category=w.coordinates_category), (3, 3)
+        )
+        w.ndb.spatial_index = None
+        self.char1.attributes.reset_cache()
+        self.char2.attributes.reset_cache()
+        # the index is loaded with one query for the coordinates, one for the items
+        with self.assertNumQueries(2):
+            w.spatial_index
+        self.assertEqual(w.get_obj_coordinates(self.char2), (3, 3))
+        self.assertEqual(w.get_objs_at_coordinates((1, 1)), [self.char1])
+        # deleted objects are removed from the index
+        self.char2.delete()
+        self.assertEqual(w.get_objs_in_box((0, 0), (3, 3)), [self.char1])
+
+    def test_convert_itemcoordinates(self):
+        wilderness.create_wilderness()
+        w = self.get_wilderness_script()
+        w.db.itemcoordinates = {self.char2: (2, 2)}
+        w.at_start()
+        self.assertFalse(w.attributes.has("itemcoordinates"))
+        self.assertEqual(w.get_objs_at_coordinates((2, 2)), [self.char2])
+
 
 # Testing chargen contrib
 from evennia.contrib import chargen
@@ -114,11 +114,27 @@ Implementation details:
     Rooms are created as needed. Unneeded rooms are stored away to avoid the
     overhead cost of creating new rooms again in the future.
 
+    The coordinates of every object in the wilderness are stored as an
+    Attribute on that object, so moving around only saves the position of
+    the one object that moved. In memory, the wilderness script keeps the
+    positions in a `SpatialHash`, which allows for quickly finding everything
+    at, or near, some coordinates:
+
+    ```python
+    script = wilderness.WildernessScript.objects.get(db_key="default")
+    nearby = script.get_objs_in_radius((4, 1), 5)
+    ```
+
 """
 
-from evennia import DefaultRoom, DefaultExit, DefaultScript
+from collections import defaultdict
+from evennia import DefaultRoom, DefaultExit, DefaultScript, ObjectDB
 from evennia import create_object, create_script
 from evennia.utils import inherits_from
+from evennia.utils.dbserialize import from_pickle
+
+# key of the Attribute storing an object's coordinates in a wilderness
+_COORDINATES_ATTR = "coordinates"
 
 
 def create_wilderness(name="default", mapprovider=None):
@@ -195,12 +211,178 @@ def get_new_coordinates(coordinates, direction):
     return (x, y)
 
 
+class SpatialHash(object):
+    """
+    An in-memory index of items (such as object ids) by (x, y) coordinates.
+    Besides finding the items at exact coordinates, the items are also
+    grouped into square cells of `cellsize` x `cellsize` coordinates, so that
+    finding the items in an area only needs to look at the cells overlapping
+    it.
+
+    """
+
+    def __init__(self, cellsize=16):
+        """
+        Args:
+            cellsize (int, optional): Width/height of the grouping cells.
+                A good size is around the radius of typical area queries.
+
+        """
+        self.cellsize = cellsize
+        # {item: (x, y)}
+        self.positions = {}
+        # {(x, y): {item, ...}}
+        self.coordinates = defaultdict(set)
+        # {(cellx, celly): {item, ...}}
+        self.cells = defaultdict(set)
+
+    def _cell(self, coordinates):
+        return (coordinates[0] // self.cellsize, coordinates[1] // self.cellsize)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __iter__(self):
+        return iter(list(self.positions))
+
+    def get(self, item, default=None):
+        """
+        Get the coordinates of an item.
+
+        Args:
+            item (hashable): The item to look for.
+            default (any, optional): Returned if `item` is not in the index.
+
+        Returns:
+            coordinates (tuple): The (x, y) coordinates of `item`.
+
+        """
+        return self.positions.get(item, default)
+
+    def add(self, item, coordinates):
+        """
+        Add an item to the index, or move it if it is already there.
+
+        Args:
+            item (hashable): The item to add.
+            coordinates (tuple): The (x, y) coordinates of `item`.
+
+        """
+        coordinates = tuple(coordinates)
+        if item in self.positions:
+            if self.positions[item] == coordinates:
+                return
+            self.remove(item)
+        self.positions[item] = coordinates
+        self.coordinates[coordinates].add(item)
+        self.cells[self._cell(coordinates)].add(item)
+
+    def remove(self, item):
+        """
+        Remove an item from the index.
+
+        Args:
+            item (hashable): The item to remove.
+
+        Returns:
+            coordinates (tuple or None): Where `item` was, or `None` if it
+                was not in the index.
+
+        """
+        coordinates = self.positions.pop(item, None)
+        if coordinates is not None:
+            for index, key in (
+                (self.coordinates, coordinates),
+                (self.cells, self._cell(coordinates)),
+            ):
+                index[key].discard(item)
+                if not index[key]:
+                    del index[key]
+        return coordinates
+
+    def at(self, coordinates):
+        """
+        Get the items at exact coordinates.
+
+        Args:
+            coordinates (tuple): The (x, y) coordinates.
+
+        Returns:
+            items (list): The items at `coordinates`.
+
+        """
+        return list(self.coordinates.get(tuple(coordinates), ()))
+
+    def in_box(self, min_coordinates, max_coordinates):
+        """
+        Get the items inside a rectangle.
+
+        Args:
+            min_coordinates (tuple): The (x, y) of the lower left corner.
+            max_coordinates (tuple): The (x, y) of the upper right corner.
+
+        Returns:
+            items (list): The items inside the rectangle, edges included.
+
+        """
+        (xmin, ymin), (xmax, ymax) = min_coordinates, max_coordinates
+        (cxmin, cymin), (cxmax, cymax) = self._cell((xmin, ymin)), self._cell((xmax, ymax))
+        items = []
+        if (cxmax - cxmin + 1) * (cymax - cymin + 1) > len(self.cells):
+            # the box covers more cells than are in use; check the used cells
+            cells = [
+                cell
+                for (cx, cy), cell in self.cells.items()
+                if cxmin <= cx <= cxmax and cymin <= cy <= cymax
+            ]
+        else:
+            cells = [
+                self.cells[(cx, cy)]
+                for cx in range(int(cxmin), int(cxmax) + 1)
+                for cy in range(int(cymin), int(cymax) + 1)
+                if (cx, cy) in self.cells
+            ]
+        for cell in cells:
+            for item in cell:
+                x, y = self.positions[item]
+                if xmin <= x <= xmax and ymin <= y <= ymax:
+                    items.append(item)
+        return items
+
+    def in_radius(self, coordinates, radius):
+        """
+        Get the items within a distance of some coordinates.
+
+        Args:
+            coordinates (tuple): The (x, y) of the center.
+            radius (int or float): The max (straight-line) distance
+                from `coordinates`.
+
+        Returns:
+            items (list): The items within `radius`.
+
+        """
+        x0, y0 = coordinates
+        radius2 = radius ** 2
+        return [
+            item
+            for item in self.in_box((x0 - radius, y0 - radius), (x0 + radius, y0 + radius))
+            if (self.positions[item][0] - x0) ** 2 + (self.positions[item][1] - y0) ** 2 <= radius2
+        ]
+
+
 class WildernessScript(DefaultScript):
     """
-    This is the main "handler" for the wilderness system: inside here the
-    coordinates of every item currently inside the wilderness is stored. This
+    This is the main "handler" for the wilderness system: it keeps track of
+    the coordinates of every item currently inside the wilderness. This
     script is responsible for creating rooms as needed and storing rooms away
     into storage when they are not needed anymore.
+
+    The coordinates of each item are stored in an Attribute on that item,
+    with a category unique to this wilderness.
     """
 
     def at_script_creation(self):
@@ -210,10 +392,6 @@ class WildernessScript(DefaultScript):
         """
         self.persistent = True
 
-        # Store the coordinates of every item that is inside the wilderness
-        # Key: object, Value: (x, y)
-        self.db.itemcoordinates = {}
-
         # Store the rooms that are used as views into the wilderness
         # Key: (x, y), Value: room object
         self.db.rooms = {}
@@ -233,17 +411,60 @@ class WildernessScript(DefaultScript):
         """
         return self.db.mapprovider
 
+    @property
+    def coordinates_category(self):
+        """
+        The category of the Attributes storing the coordinates of items in
+        this wilderness.
+
+        Returns:
+            category (str): The category.
+        """
+        return "wilderness_%s" % self.id
+
+    @property
+    def spatial_index(self):
+        """
+        The in-memory index of where every item in this wilderness is, by
+        item id. It is loaded from the items' Attributes on first use.
+
+        Returns:
+            SpatialHash: the index.
+        """
+        index = self.ndb.spatial_index
+        if index is None:
+            index = SpatialHash()
+            items = {}
+            category = self.coordinates_category
+            # read all coordinates in one query, rather than one per item
+            coordinates = dict(
+                ObjectDB.db_attributes.through.objects.filter(
+                    attribute__db_key=_COORDINATES_ATTR,
+                    attribute__db_category=category,
+                    attribute__db_attrtype=None,
+                ).values_list("objectdb_id", "attribute__db_value")
+            )
+            for item in ObjectDB.objects.get_by_attribute(key=_COORDINATES_ATTR, category=category):
+                if coordinates.get(item.id) is not None:
+                    index.add(item.id, from_pickle(coordinates[item.id]))
+                    items[item.id] = item
+            self.ndb.spatial_items = items
+            self.ndb.spatial_index = index
+        return index
+
     @property
     def itemcoordinates(self):
         """
         Returns a dictionary with the coordinates of every item inside this
         wilderness map. The key is the item, the value are the coordinates as
-        (x, y) tuple.
+        (x, y) tuple. This is a copy; use `move_obj` to change coordinates.
 
         Returns:
             {item: coordinates}
         """
-        return self.db.itemcoordinates
+        return {
+            item: self.spatial_index.get(item.id) for item in self._get_items(self.spatial_index)
+        }
 
     def at_start(self):
         """
@@ -252,14 +473,54 @@ class WildernessScript(DefaultScript):
         for coordinates, room in self.db.rooms.items():
             room.ndb.wildernessscript = self
             room.ndb.active_coordinates = coordinates
-        for item in list(self.db.itemcoordinates.keys()):
-            # Items deleted from the wilderness leave None type 'ghosts'
-            # that must be cleaned out
-            if item is None:
-                del self.db.itemcoordinates[item]
-                continue
+        olditemcoordinates = self.attributes.get("itemcoordinates")
+        if olditemcoordinates is not None:
+            # convert from storing all coordinates in one Attribute on
+            # the script. Items deleted from the wilderness leave None type
+            # 'ghosts' that are skipped.
+            for item, coordinates in olditemcoordinates.items():
+                if item is not None:
+                    self._set_obj_coordinates(item, coordinates)
+            self.attributes.remove("itemcoordinates")
+        for item in self._get_items(self.spatial_index):
             item.ndb.wilderness = self
 
+    def _set_obj_coordinates(self, obj, coordinates):
+        """
+        Store the coordinates of an item, without moving it.
+
+        Args:
+            obj (object): an object inside the wilderness
+            coordinates (tuple): coordinates as (x, y) tuple
+        """
+        coordinates = tuple(coordinates)
+        if self.spatial_index.get(obj.id) != coordinates:
+            self.spatial_index.add(obj.id, coordinates)
+            self.ndb.spatial_items[obj.id] = obj
+            obj.attributes.add(_COORDINATES_ATTR, coordinates, category=self.coordinates_category)
+
+    def _get_items(self, ids):
+        """
+        Get the items for ids found in the spatial index. Deleted items are
+        removed from the index.
+
+        Args:
+            ids (iterable): item ids from the index
+
+        Returns:
+            [Object, ]: the items that still exist
+        """
+        items = self.ndb.spatial_items
+        result = []
+        for dbid in list(ids):
+            item = items.get(dbid)
+            if item and item.pk:
+                result.append(item)
+            else:
+                self.spatial_index.remove(dbid)
+                items.pop(dbid, None)
+        return result
+
     def is_valid_coordinates(self, coordinates):
         """
         Returns True if coordinates are valid (and can be travelled to).
@@ -284,33 +545,49 @@ class WildernessScript(DefaultScript):
 
         Returns:
             tuple: (x, y) tuple of where obj is located
+
+        Raises:
+            KeyError: if obj is not inside the wilderness
         """
-        return self.itemcoordinates[obj]
+        return self.spatial_index.positions[obj.id]
 
     def get_objs_at_coordinates(self, coordinates):
         """
         Returns a list of every object at certain coordinates.
 
-        Imeplementation detail: this uses a naive iteration through every
-        object inside the wilderness which could cause slow downs when there
-        are a lot of objects in the map.
-
         Args:
             coordinates (tuple): a coordinate tuple like (x, y)
 
         Returns:
             [Object, ]: list of Objects at coordinates
         """
-        result = []
-        for item, item_coordinates in list(self.itemcoordinates.items()):
-            # Items deleted from the wilderness leave None type 'ghosts'
-            # that must be cleaned out
-            if item is None:
-                del self.db.itemcoordinates[item]
-                continue
-            if coordinates == item_coordinates:
-                result.append(item)
-        return result
+        return self._get_items(self.spatial_index.at(coordinates))
+
+    def get_objs_in_radius(self, coordinates, radius):
+        """
+        Returns a list of every object within some distance of coordinates.
+
+        Args:
+            coordinates (tuple): a coordinate tuple like (x, y)
+            radius (int or float): the max distance from coordinates
+
+        Returns:
+            [Object, ]: list of Objects within radius of coordinates
+        """
+        return self._get_items(self.spatial_index.in_radius(coordinates, radius))
+
+    def get_objs_in_box(self, min_coordinates, max_coordinates):
+        """
+        Returns a list of every object inside a rectangle.
+
+        Args:
+            min_coordinates (tuple): the (x, y) of the lower left corner
+            max_coordinates (tuple): the (x, y) of the upper right corner
+
+        Returns:
+            [Object, ]: list of Objects inside the rectangle, edges included
+        """
+        return self._get_items(self.spatial_index.in_box(min_coordinates, max_coordinates))
 
     def move_obj(self, obj, new_coordinates):
         """
@@ -321,7 +598,7 @@ class WildernessScript(DefaultScript):
             new_coordinates (tuple): tuple of (x, y) where to move obj to.
         """
         # Update the position of this obj in the wilderness
-        self.itemcoordinates[obj] = new_coordinates
+        self._set_obj_coordinates(obj, new_coordinates)
         old_room = obj.location
 
         # Remove the obj's location. This is needed so that the object does not
@@ -458,9 +735,10 @@ class WildernessScript(DefaultScript):
         Args:
             obj (object): the object that left
         """
-        # Remove that obj from the wilderness's coordinates dict
-        loc = self.db.itemcoordinates[obj]
-        del self.db.itemcoordinates[obj]
+        # Remove that obj from the wilderness's coordinates
+        loc = self.spatial_index.remove(obj.id)
+        self.ndb.spatial_items.pop(obj.id, None)
+        obj.attributes.remove(_COORDINATES_ATTR, category=self.coordinates_category)
 
         # And see if we can put that room away into storage.
         room = self.db.rooms[loc]
@@ -520,8 +798,8 @@ class WildernessRoom(DefaultRoom):
             # n, ne, ... exits.
             return
 
-        itemcoords = self.wilderness.db.itemcoordinates
-        if moved_obj in itemcoords:
+        coordinates = self.wilderness.spatial_index.get(moved_obj.id)
+        if coordinates is not None:
             # This object was already in the wilderness. We need to make sure
             # it goes to the correct room it belongs to.
             # Otherwise the following issue can come up:
@@ -532,14 +810,13 @@ class WildernessRoom(DefaultRoom):
             # Player 1 will end up in player 2's room, which has the wrong
             # coordinates
 
-            coordinates = itemcoords[moved_obj]
             # Setting the location to None is important here so that we always
             # get a "fresh" room
             moved_obj.location = None
             self.wilderness.move_obj(moved_obj, coordinates)
         else:
             # This object wasn't in the wilderness yet. Let's add it.
-            itemcoords[moved_obj] = self.coordinates
+            self.wilderness._set_obj_coordinates(moved_obj, self.coordinates)
 
     def at_object_leave(self, moved_obj, target_location):
         """
@@ -688,9 +965,7 @@ class WildernessExit(DefaultExit):
             bool: True if the traverse is allowed to happen
 
         """
-        itemcoordinates = self.location.wilderness.db.itemcoordinates
-
-        current_coordinates = itemcoordinates[traversing_object]
+        current_coordinates = self.location.wilderness.get_obj_coordinates(traversing_object)
         new_coordinates = get_new_coordinates(current_coordinates, self.key)
 
         if not self.at_traverse_coordinates(
@@ -0,0 +1,324 @@
+"""
+Help index
+
+This speeds up the `help` command, which would otherwise re-read and
+lock-check all database help entries and re-rate every help topic for
+similarity on every call. The index keeps
+
+- all `HelpEntry` objects, loaded once and re-loaded only after a help
+  entry was saved, deleted or had its aliases or tags changed.
+- the help entries visible to each permission profile. Two callers with
+  the same permissions (and superuser/quell status) see the same entries,
+  so the view-locks are only checked once per profile. Entries with locks
+  depending on more than permissions (like `attr()` or `tag()`) are still
+  checked every time.
+- an inverted index from every word in command docstrings and help entry
+  texts to the topics using it, for free-text suggestions.
+- a trigram- and prefix index of all topic names (keys, aliases and help
+  categories), used to find the few candidates worth rating for similarity
+  instead of rating the whole vocabulary. Names are never removed from this
+  index; suggestions are always limited to the topics the caller can
+  actually see.
+
+Commands are indexed as they are seen by the `help` command; a command is
+re-indexed if the command found under its key changes (such as when a new
+cmdset with a different version of the command was merged in).
+
+"""
+
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from evennia.help.models import HelpEntry
+from evennia.utils.utils import string_similarity, inherits_from
+
+_RE_WORD = re.compile(r"\w+")
+
+# lockfuncs whose result only depends on the permissions of the caller
+_PROFILE_LOCKFUNCS = (
+    "all",
+    "true",
+    "none",
+    "false",
+    "perm",
+    "perm_above",
+    "pperm",
+    "pperm_above",
+)
+
+# max number of permission profiles to remember the visible entries for
+_MAX_PROFILES = 256
+
+
+def trigrams(string):
+    """
+    Split a string into its overlapping, padded trigrams.
+
+    Args:
+        string (str): The string to split.
+
+    Returns:
+        trigrams (set): The trigrams, like `{" lo", "loo", "ook", "ok "}` for "look".
+
+    """
+    padded = " %s " % string.lower()
+    return set(padded[ind : ind + 3] for ind in range(len(padded) - 2))
+
+
+def tokenize(text):
+    """
+    Split a text into its (lower-case) words.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        tokens (set): The unique words in the text.
+
+    """
+    return set(_RE_WORD.findall((text or "").lower()))
+
+
+def lock_profile(caller):
+    """
+    Get the permission profile of a caller; all callers with the same profile
+    pass the same permission-based locks.
+
+    Args:
+        caller (Object, Account or Session): The one looking for help.
+
+    Returns:
+        profile (tuple or None): A hashable profile, or `None` if the caller
+            has no permissions to compare.
+
+    """
+    try:
+        lock_bypass = caller.locks.lock_bypass
+        perms = frozenset(caller.permissions.all())
+    except AttributeError:
+        return None
+    account = inherits_from(caller, "evennia.objects.objects.DefaultObject") and caller.account
+    if account:
+        return (
+            lock_bypass,
+            perms,
+            frozenset(account.permissions.all()),
+            bool(account.attributes.get("_quell")),
+        )
+    return (lock_bypass, perms, None, False)
+
+
+class HelpIndex(object):
+    """
+    Keeps the help entries and the search indexes. Use the `HELP_INDEX`
+    singleton rather than creating new instances of this class.
+
+    """
+
+    def __init__(self):
+        # {word: {cmdkey, ...}}
+        self.cmd_words = defaultdict(set)
+        # {trigram: {name, ...}}
+        self.trigrams = defaultdict(set)
+        # all lower-case names, sorted, for prefix lookup
+        self.sorted_names = []
+        # {lowercase name: {name, ...}}
+        self.names = defaultdict(set)
+        # {cmdkey: (signature, words)}
+        self.cmds = {}
+        self.clear_entries()
+
+    def clear_entries(self):
+        """
+        Forget all help entries, reloading them on next use.
+
+        """
+        self.entries = None
+        # entries whose view-lock only depends on permissions, and those that don't
+        self.profiled_entries = []
+        self.other_entries = []
+        self.visible = {}
+        # {word: {entrykey, ...}}
+        self.entry_words = defaultdict(set)
+
+    def add_name(self, name):
+        """
+        Add a topic name to the name indexes.
+
+        Args:
+            name (str): A command key or alias, help entry key or alias
+                or help category.
+
+        """
+        lname = name.lower()
+        if lname not in self.names:
+            insort(self.sorted_names, lname)
+        if name not in self.names[lname]:
+            self.names[lname].add(name)
+            for trigram in trigrams(lname):
+                self.trigrams[trigram].add(name)
+
+    def _load_entries(self):
+        """
+        Load and index all help entries.
+
+        """
+        entries = list(HelpEntry.objects.all())
+        for entry in entries:
+            lock = entry.locks.locks.get("view")
+            if not lock or all(
+                func.__name__ in _PROFILE_LOCKFUNCS for func, args, kwargs in lock[1]
+            ):
+                self.profiled_entries.append(entry)
+            else:
+                self.other_entries.append(entry)
+            aliases = entry.aliases.all()
+            for name in [entry.key, entry.help_category.lower()] + aliases:
+                self.add_name(name)
+            for word in tokenize(" ".join([entry.key, entry.entrytext] + aliases)):
+                self.entry_words[word].add(entry.key)
+        self.entries = entries
+
+    def get_entries(self, caller=None):
+        """
+        Get help entries.
+
+        Args:
+            caller (Object, Account or Session, optional): If given, only
+                return entries this caller may view.
+
+        Returns:
+            entries (list): The `HelpEntry` objects.
+
+        """
+        if self.entries is None:
+            self._load_entries()
+        if caller is None:
+            return list(self.entries)
+        profile = lock_profile(caller)
+        if profile is None:
+            return [entry for entry in self.entries if entry.access(caller, "view", default=True)]
+        try:
+            visible = self.visible[profile]
+        except KeyError:
+            if len(self.visible) >= _MAX_PROFILES:
+                self.visible.clear()
+            visible = self.visible[profile] = [
+                entry
+                for entry in self.profiled_entries
+                if entry.access(caller, "view", default=True)
+            ]
+        return visible + [
+            entry for entry in self.other_entries if entry.access(caller, "view", default=True)
+        ]
+
+    def index_commands(self, cmds):
+        """
+        Make sure commands are indexed. Commands are only (re-)indexed if
+        they were not seen before or have changed since they were.
+
+        Args:
+            cmds (list): Command instances.
+
+        """
+        for cmd in cmds:
+            signature = (cmd.__class__, tuple(cmd.aliases), cmd.help_category)
+            oldsignature, oldwords = self.cmds.get(cmd.key, (None, ()))
+            if signature == oldsignature:
+                continue
+            for name in [cmd.key, cmd.help_category.lower()] + list(cmd.aliases):
+                self.add_name(name)
+            words = tokenize(" ".join([cmd.key, cmd.__doc__ or ""] + list(cmd.aliases)))
+            for word in set(oldwords).difference(words):
+                self.cmd_words[word].discard(cmd.key)
+                if not self.cmd_words[word]:
+                    del self.cmd_words[word]
+            for word in words:
+                self.cmd_words[word].add(cmd.key)
+            self.cmds[cmd.key] = (signature, words)
+
+    def suggest(self, query, vocabulary, cutoff=0.6, maxnum=5):
+        """
+        Suggest topics related to a query.
+
+        Args:
+            query (str): What was searched for.
+            vocabulary (set): All names that may be suggested (that is,
+                the names of the topics visible to the caller).
+            cutoff (float, optional): How similar (0..1) a name must be to
+                the query to be suggested. Only names sharing at least one
+                trigram with the query are considered.
+            maxnum (int, optional): Max number of suggestions.
+
+        Returns:
+            suggestions (list): Names from `vocabulary`, most similar first.
+                If no name is similar enough, names starting with `query`
+                are suggested, followed by topics whose help text contains
+                all the words of `query`.
+
+        """
+        if maxnum <= 0:
+            return []
+        lquery = query.lower()
+        candidates = set()
+        for trigram in trigrams(lquery):
+            candidates.update(self.trigrams.get(trigram, ()))
+        candidates.intersection_update(vocabulary)
+        candidates.discard(query)
+        rated = sorted(
+            ((string_similarity(query, name), name) for name in candidates),
+            key=lambda tup: tup[0],
+            reverse=True,
+        )
+        suggestions = [name for rating, name in rated if rating >= cutoff][:maxnum]
+
+        if not suggestions:
+            # prefix lookup
+            ind = bisect_left(self.sorted_names, lquery)
+            while ind < len(self.sorted_names) and len(suggestions) < maxnum:
+                lname = self.sorted_names[ind]
+                if not lname.startswith(lquery):
+                    break
+                suggestions.extend(
+                    sorted(
+                        name
+                        for name in self.names[lname]
+                        if name != query and name in vocabulary and name not in suggestions
+                    )
+                )
+                ind += 1
+
+        if len(suggestions) < maxnum:
+            # free-text lookup
+            topics = set()
+            words = tokenize(query)
+            if words:
+                for index in (self.cmd_words, self.entry_words):
+                    topics.update(set.intersection(*(index.get(word, set()) for word in words)))
+            suggestions.extend(
+                sorted(
+                    name
+                    for name in topics
+                    if name != query and name in vocabulary and name not in suggestions
+                )
+            )
+        return suggestions[:maxnum]
+
+
+HELP_INDEX = HelpIndex()
+
+
+def _clear_entries(sender, **kwargs):
+    """
+    Signal handler for when help entries change.
+
+    """
+    HELP_INDEX.clear_entries()
+
+
+post_save.connect(_clear_entries, sender=HelpEntry, dispatch_uid="help_index_save")
+post_delete.connect(_clear_entries, sender=HelpEntry, dispatch_uid="help_index_delete")
+m2m_changed.connect(
+    _clear_entries, sender=HelpEntry.db_tags.through, dispatch_uid="help_index_tags"
+)
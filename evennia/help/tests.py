@@ -0,0 +1,77 @@
+"""
+Tests for the help system.
+
+"""
+
+from evennia.utils.test_resources import EvenniaTest
+from evennia.utils import create
+from evennia.commands.default.general import CmdLook, CmdGet
+from evennia.help.index import HELP_INDEX, HelpIndex, trigrams, tokenize, lock_profile
+
+
+class TestHelpIndex(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        HELP_INDEX.clear_entries()
+        self.index = HelpIndex()
+        self.entry1 = create.create_help_entry(
+            "Dragons", "Dragons breathe fire.", category="Bestiary", aliases=["wyrm"]
+        )
+        self.entry2 = create.create_help_entry(
+            "Staff rules", "Only for builders.", locks="view:perm(Builder)"
+        )
+        self.entry3 = create.create_help_entry(
+            "Secret", "Tagged readers only.", locks="view:tag(reader)"
+        )
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams("Look"), {" lo", "loo", "ook", "ok "})
+        self.assertEqual(tokenize("Look at THE look."), {"look", "at", "the"})
+
+    def test_get_entries(self):
+        self.assertEqual(
+            set(self.index.get_entries()), set([self.entry1, self.entry2, self.entry3])
+        )
+        self.assertEqual(self.index.get_entries(self.char2), [self.entry1])
+        self.assertEqual(len(self.index.visible), 1)
+        self.char2.tags.add("reader")
+        self.assertEqual(self.index.get_entries(self.char2), [self.entry1, self.entry3])
+        # the permission-only result is cached per profile
+        self.assertEqual(len(self.index.visible), 1)
+        self.account2.permissions.add("Builder")
+        self.assertEqual(
+            set(self.index.get_entries(self.char2)), set([self.entry1, self.entry2, self.entry3])
+        )
+        self.assertEqual(len(self.index.visible), 2)
+        self.assertEqual(lock_profile(self.session), None)
+
+    def test_invalidate(self):
+        HELP_INDEX.get_entries()
+        self.assertTrue(HELP_INDEX.entries)
+        self.entry1.entrytext = "Dragons breathe ice."
+        self.entry1.save()
+        self.assertEqual(HELP_INDEX.entries, None)
+        HELP_INDEX.get_entries()
+        self.assertIn("Dragons", HELP_INDEX.entry_words["ice"])
+        self.entry1.aliases.add("drake")
+        self.assertEqual(HELP_INDEX.entries, None)
+        self.entry3.delete()
+        self.assertNotIn(self.entry3, HELP_INDEX.get_entries())
+
+    def test_suggest(self):
+        look, get = CmdLook(), CmdGet()
+        self.index.get_entries()
+        self.index.index_commands([look, get])
+        vocabulary = set(["look", "l", "ls", "get", "grab", "Dragons", "wyrm", "bestiary"])
+        self.assertEqual(self.index.suggest("loko", vocabulary), ["look"])
+        self.assertEqual(self.index.suggest("drag", vocabulary), ["Dragons"])
+        # free-text search of the help texts
+        self.assertEqual(self.index.suggest("fire", vocabulary), ["Dragons"])
+        self.assertEqual(self.index.suggest("fire", vocabulary - set(["Dragons"])), [])
+        self.assertEqual(self.index.suggest("loko", vocabulary, maxnum=0), [])
+        # a changed command is re-indexed
+        self.assertIn("look", self.index.cmd_words["observes"])
+        CmdLook2 = type("CmdLook2", (CmdLook,), {"__doc__": "peer around"})
+        self.index.index_commands([CmdLook2()])
+        self.assertNotIn("observes", self.index.cmd_words)
+        self.assertEqual(self.index.suggest("peer", vocabulary), ["look"])
@@ -18,7 +18,7 @@ from django.db import models
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import validate_comma_separated_integer_list
 
-from evennia.typeclasses.models import TypedObject
+from evennia.typeclasses.models import TypedObject, prefetch_handlers
 from evennia.objects.manager import ObjectDBManager
 from evennia.utils import logger
 from evennia.utils.utils import make_iter, dbref, lazy_property
@@ -44,6 +44,10 @@ class ContentsHandler(object):
         self.obj = obj
         self._pkcache = {}
         self._idcache = obj.__class__.__instance_cache__
+        # {exitname: [pk, ...]} of the Exits among the contents, built when needed
+        self._exitcache = None
+        # changes whenever the exit cache is rebuilt
+        self.exit_version = 0
         self.init()
 
     def init(self):
@@ -51,9 +55,12 @@ class ContentsHandler(object):
         Re-initialize the content cache
 
         """
-        self._pkcache.update(
-            dict((obj.pk, None) for obj in ObjectDB.objects.filter(db_location=self.obj) if obj.pk)
-        )
+        objs = [obj for obj in ObjectDB.objects.filter(db_location=self.obj) if obj.pk]
+        # contents are usually looked at together, so cache their
+        # Attributes and Tags in bulk rather than one object at a time
+        prefetch_handlers(objs)
+        self._pkcache.update(dict((obj.pk, None) for obj in objs))
+        self._exitcache = None
 
     def get(self, exclude=None):
         """
@@ -92,6 +99,8 @@ class ContentsHandler(object):
 
         """
         self._pkcache[obj.pk] = None
+        if obj.db_destination_id:
+            self._exitcache = None
 
     def remove(self, obj):
         """
@@ -102,6 +111,8 @@ class ContentsHandler(object):
 
         """
         self._pkcache.pop(obj.pk, None)
+        if obj.db_destination_id:
+            self._exitcache = None
 
     def clear(self):
         """
@@ -111,6 +122,69 @@ class ContentsHandler(object):
         self._pkcache = {}
         self.init()
 
+    def update_exits(self):
+        """
+        Mark the exit cache as outdated, such as after an Exit in this
+        location was renamed or got new aliases. It is rebuilt the next
+        time it's used.
+
+        """
+        self._exitcache = None
+
+    def _get_exitcache(self):
+        "Get the exit cache, rebuilding it if needed"
+        if self._exitcache is None:
+            exitcache = {}
+            for obj in self.get():
+                if obj.db_destination_id:
+                    for name in [obj.db_key] + obj.aliases.all():
+                        exitcache.setdefault(name.strip().lower(), []).append(obj.pk)
+            self._exitcache = exitcache
+            self.exit_version += 1
+        return self._exitcache
+
+    def get_exit_version(self):
+        """
+        Get the version of the exit cache, rebuilding it if needed. This
+        changes whenever the Exits in this location change.
+
+        Returns:
+            version (int): The version.
+
+        """
+        self._get_exitcache()
+        return self.exit_version
+
+    def get_exit_names(self):
+        """
+        Get the names and aliases of all Exits in this location.
+
+        Returns:
+            names (list): The lowercase names and aliases.
+
+        """
+        return list(self._get_exitcache())
+
+    def get_exits(self, name):
+        """
+        Get the Exits in this location with a given name or alias.
+
+        Args:
+            name (str): The name or alias to look for (case-insensitive).
+
+        Returns:
+            exits (list): The matching Exits; usually only one.
+
+        """
+        pks = self._get_exitcache().get(name.strip().lower(), [])
+        try:
+            return [self._idcache[pk] for pk in pks]
+        except KeyError:
+            # an Exit was flushed from the idmapper cache; rebuild
+            self.init()
+            pks = self._get_exitcache().get(name.strip().lower(), [])
+            return [self._idcache[pk] for pk in pks if pk in self._idcache]
+
 
 # -------------------------------------------------------------
 #
@@ -7,11 +7,12 @@ entities.
 """
 import time
 import inflect
+from weakref import WeakKeyDictionary
 from collections import defaultdict
 
 from django.conf import settings
 
-from evennia.typeclasses.models import TypeclassBase
+from evennia.typeclasses.models import TypeclassBase, prefetch_handlers
 from evennia.typeclasses.attributes import NickHandler
 from evennia.objects.manager import ObjectManager
 from evennia.objects.models import ObjectDB
@@ -35,6 +36,7 @@ from django.utils.translation import gettext as _
 
 _INFLECT = inflect.engine()
 _MULTISESSION_MODE = settings.MULTISESSION_MODE
+_EXIT_DISPATCH = settings.EXIT_DISPATCH
 
 _ScriptDB = None
 _SESSIONS = None
@@ -1659,7 +1661,9 @@ class DefaultObject(ObjectDB, metaclass=TypeclassBase):
         if not looker:
             return ""
         # get and identify all objects
-        visible = (con for con in self.contents if con != looker and con.access(looker, "view"))
+        contents = self.contents
+        prefetch_handlers(contents)
+        visible = (con for con in contents if con != looker and con.access(looker, "view"))
         exits, users, things = [], [], defaultdict(list)
         for con in visible:
             key = con.get_display_name(looker)
@@ -2377,6 +2381,84 @@ class ExitCommand(command.Command):
             return " (%s)" % self.obj.get_display_name(caller)
 
 
+class ExitDispatchCommand(command.Command):
+    """
+    Used with `settings.EXIT_DISPATCH`, this command has all the names and
+    aliases of the Exits in a location, and looks up the Exit to traverse
+    by the name it was called with.
+
+    """
+
+    auto_help = False
+    arg_regex = r"^$"
+    is_exit = True
+
+    def func(self):
+        """
+        Find the Exit and run its exit command.
+        """
+        caller = self.caller
+        exits = [
+            exi
+            for exi in self.obj.contents_cache.get_exits(self.cmdname)
+            if exi.access(caller, "call", no_superuser_bypass=True)
+        ]
+        if not exits:
+            caller.msg(_("Command '%s' is not available.") % self.cmdname)
+            return
+        if len(exits) > 1:
+            caller.msg(_AT_SEARCH_RESULT(exits, caller, query=self.cmdname))
+            return
+        exi = exits[0]
+        cmd = exi.create_exit_command(exi)
+        for attrname in ("caller", "session", "account", "cmdname", "raw_cmdname", "args"):
+            setattr(cmd, attrname, getattr(self, attrname, None))
+        cmd.cmdset, cmd.raw_string = self.cmdset, self.raw_string
+        if cmd.at_pre_cmd():
+            return
+        cmd.parse()
+        cmd.func()
+        cmd.at_post_cmd()
+
+
+class ExitDispatchCmdSet(cmdset.CmdSet):
+    """
+    Used with `settings.EXIT_DISPATCH`, this is put on a location in
+    place of one cmdset per Exit. It holds a single `ExitDispatchCommand`
+    for all Exits in the location, updated when they change.
+
+    """
+
+    key = "ExitCmdSet"
+    priority = 101
+    duplicates = True
+
+    def at_cmdset_creation(self):
+        """
+        Set up the dispatch command.
+        """
+        self.exit_version = None
+        self.update_exits()
+
+    def update_exits(self):
+        """
+        Rebuild the dispatch command if the Exits in the location
+        have changed.
+
+        """
+        contents = self.cmdsetobj.contents_cache
+        # this is checked for every Exit on every command, so keep it cheap
+        exit_version = contents.get_exit_version()
+        if self.exit_version == exit_version:
+            return
+        self.exit_version = exit_version
+        names = contents.get_exit_names()
+        self.commands = []
+        self._contains_cache = WeakKeyDictionary()
+        if names:
+            self.add(ExitDispatchCommand(key=names[0], aliases=names[1:], obj=self.cmdsetobj))
+
+
 #
 # Base Exit object
 
@@ -2421,9 +2503,30 @@ class DefaultExit(DefaultObject):
 
         """
 
+        cmd = self.create_exit_command(exidbobj)
+        # create a cmdset
+        exit_cmdset = cmdset.CmdSet(None)
+        exit_cmdset.key = "ExitCmdSet"
+        exit_cmdset.priority = self.priority
+        exit_cmdset.duplicates = True
+        # add command to cmdset
+        exit_cmdset.add(cmd)
+        return exit_cmdset
+
+    def create_exit_command(self, exidbobj):
+        """
+        Helper function for creating the command traversing an exit.
+
+        Args:
+            exidbobj (Object): The DefaultExit object to base the command on.
+
+        Returns:
+            cmd (Command): An instance of `exit_command`.
+
+        """
         # create an exit command. We give the properties here,
         # to always trigger metaclass preparations
-        cmd = self.exit_command(
+        return self.exit_command(
             key=exidbobj.db_key.strip().lower(),
             aliases=exidbobj.aliases.all(),
             locks=str(exidbobj.locks),
@@ -2433,14 +2536,6 @@ class DefaultExit(DefaultObject):
             is_exit=True,
             obj=exidbobj,
         )
-        # create a cmdset
-        exit_cmdset = cmdset.CmdSet(None)
-        exit_cmdset.key = "ExitCmdSet"
-        exit_cmdset.priority = self.priority
-        exit_cmdset.duplicates = True
-        # add command to cmdset
-        exit_cmdset.add(cmd)
-        return exit_cmdset
 
     # Command hooks
 
@@ -2550,7 +2645,24 @@ class DefaultExit(DefaultObject):
           force_init (bool): If `True`, force a re-build of the cmdset
             (for example to update aliases).
 
+        Notes:
+            With `settings.EXIT_DISPATCH`, this instead makes sure our
+            location has an `ExitDispatchCmdSet` that is up to date.
+
         """
+        if _EXIT_DISPATCH:
+            location = self.location
+            if not location:
+                return
+            if "force_init" in kwargs:
+                location.contents_cache.update_exits()
+            for cset in location.cmdset.cmdset_stack:
+                if isinstance(cset, ExitDispatchCmdSet):
+                    cset.update_exits()
+                    break
+            else:
+                location.cmdset.add(ExitDispatchCmdSet, permanent=False)
+            return
 
         if "force_init" in kwargs or not self.cmdset.has_cmdset("ExitCmdSet", must_be_default=True):
             # we are resetting, or no exit-cmdset was set. Create one dynamically.
@@ -2562,6 +2674,10 @@ class DefaultExit(DefaultObject):
         that happens, we make sure to remove any old ExitCmdSet cmdset
         (this most commonly occurs when renaming an existing exit)
         """
+        if _EXIT_DISPATCH:
+            if self.location:
+                self.location.contents_cache.update_exits()
+            return
         self.cmdset.remove_default()
 
     def at_traverse(self, traversing_object, target_location, **kwargs):
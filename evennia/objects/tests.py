@@ -1,6 +1,9 @@
+from mock import patch
+from evennia.utils import create
 from evennia.utils.test_resources import EvenniaTest
 from evennia import DefaultObject, DefaultCharacter, DefaultRoom, DefaultExit
 from evennia.objects.models import ObjectDB
+from evennia.objects.objects import ExitDispatchCmdSet
 
 
 class DefaultObjectTest(EvenniaTest):
@@ -137,3 +140,48 @@ class TestObjectManager(EvenniaTest):
         self.assertEqual(obj2.attributes.get(key="phrase"), "xyzzy")
         self.assertEqual(self.obj1.attributes.get(key="phrase", category="adventure"), "plugh")
         self.assertEqual(obj2.attributes.get(key="phrase", category="adventure"), "plugh")
+
+
+@patch("evennia.objects.objects._EXIT_DISPATCH", True)
+class TestExitDispatch(EvenniaTest):
+    def test_exit_cache(self):
+        contents = self.room1.contents_cache
+        self.exit.aliases.add("o")
+        self.exit.at_cmdset_get(force_init=True)
+        self.assertEqual(sorted(contents.get_exit_names()), ["o", "out"])
+        self.assertEqual(contents.get_exits("OUT"), [self.exit])
+        exit2 = create.create_object(
+            DefaultExit, key="out", location=self.room1, destination=self.room1
+        )
+        self.assertEqual(set(contents.get_exits("out")), set([self.exit, exit2]))
+        exit2.location = None
+        self.assertEqual(contents.get_exits("out"), [self.exit])
+        self.assertEqual(contents.get_exits("nowhere"), [])
+
+    def test_dispatch(self):
+        self.exit.at_cmdset_get()
+        self.assertFalse(self.exit.cmdset.has_cmdset("ExitCmdSet"))
+        exit_cmdset = self.room1.cmdset.cmdset_stack[-1]
+        self.assertIsInstance(exit_cmdset, ExitDispatchCmdSet)
+        self.assertEqual([cmd.key for cmd in exit_cmdset], ["out"])
+
+        # a new exit updates the existing cmdset
+        create.create_object(DefaultExit, key="up", location=self.room1, destination=self.room2)
+        self.exit.at_cmdset_get()
+        self.assertEqual(self.room1.cmdset.cmdset_stack[-1], exit_cmdset)
+        cmd = exit_cmdset.commands[0]
+        self.assertEqual(set([cmd.key] + cmd.aliases), set(["out", "up"]))
+
+        cmd.caller, cmd.session, cmd.account = self.char1, None, None
+        cmd.cmdname = cmd.raw_cmdname = cmd.raw_string = "up"
+        cmd.args, cmd.cmdset = "", exit_cmdset
+        cmd.func()
+        self.assertEqual(self.char1.location, self.room2)
+
+    def test_unchanged_exits(self):
+        self.exit.at_cmdset_get()
+        contents = self.room1.contents_cache
+        # nothing is rebuilt while the exits stay the same
+        with patch.object(contents, "get_exit_names") as mock_names:
+            self.exit.at_cmdset_get()
+            mock_names.assert_not_called()
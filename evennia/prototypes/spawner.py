@@ -134,10 +134,15 @@ import copy
 import hashlib
 import time
 
+from twisted.internet import defer
+from twisted.internet.task import cooperate
 from django.conf import settings
+from django.db import connection, transaction
 
 import evennia
 from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.dbserialize import to_pickle
 from evennia.utils.utils import make_iter, is_iter
 from evennia.prototypes import prototypes as protlib
 from evennia.prototypes.prototypes import (
@@ -490,19 +495,22 @@ def prototype_diff_from_object(prototype, obj):
     return diff, obj_prototype
 
 
-def batch_update_objects_with_prototype(prototype, diff=None, objects=None):
+def _prepare_batch_update(prototype, diff=None, objects=None):
     """
-    Update existing objects with the latest version of the prototype.
+    Resolve the prototype, objects and flattened diff to use for a batch update.
 
     Args:
         prototype (str or dict): Either the `prototype_key` to use or the
             prototype dict itself.
-        diff (dict, optional): This a diff structure that describes how to update the protototype.
-            If not given this will be constructed from the first object found.
-        objects (list, optional): List of objects to update. If not given, query for these
+        diff (dict, optional): Diff describing how to update the prototype. If not
+            given, this will be constructed from the first object found.
+        objects (list, optional): Objects to update. If not given, query for these
             objects using the prototype's `prototype_key`.
+
     Returns:
-        changed (int): The number of objects that had changes applied to them.
+        new_prototype, diff, objects (tuple): The prototype dict, the flattened
+            diff and the objects to update, as a list or an unevaluated queryset. If
+            no objects were found, `diff` is `None`.
 
     """
     prototype = protlib.homogenize_prototype(prototype)
@@ -514,17 +522,48 @@ def batch_update_objects_with_prototype(prototype, diff=None, objects=None):
 
     prototype_key = new_prototype["prototype_key"]
 
-    if not objects:
+    is_queryset = hasattr(objects, "values_list")
+    if not is_queryset and not objects:
         objects = ObjectDB.objects.get_by_tag(prototype_key, category=_PROTOTYPE_TAG_CATEGORY)
+        is_queryset = hasattr(objects, "values_list")
 
-    if not objects:
-        return 0
+    # don't evaluate a queryset here; only the first object is needed for the diff
+    first_obj = objects.first() if is_queryset else (objects[0] if objects else None)
+    if first_obj is None:
+        return new_prototype, None, objects
 
     if not diff:
-        diff, _ = prototype_diff_from_object(new_prototype, objects[0])
+        diff, _ = prototype_diff_from_object(new_prototype, first_obj)
 
     # make sure the diff is flattened
-    diff = flatten_diff(diff)
+    return new_prototype, flatten_diff(diff), objects
+
+
+def batch_update_objects_with_prototype(prototype, diff=None, objects=None):
+    """
+    Update existing objects with the latest version of the prototype.
+
+    Args:
+        prototype (str or dict): Either the `prototype_key` to use or the
+            prototype dict itself.
+        diff (dict, optional): This a diff structure that describes how to update the protototype.
+            If not given this will be constructed from the first object found.
+        objects (list, optional): List of objects to update. If not given, query for these
+            objects using the prototype's `prototype_key`.
+    Returns:
+        changed (int): The number of objects that had changes applied to them.
+
+    Notes:
+        This updates each object in turn through its handlers. For updating very many
+        objects, use `bulk_update_objects_with_prototype` instead.
+
+    """
+    new_prototype, diff, objects = _prepare_batch_update(prototype, diff, objects)
+
+    if diff is None:
+        return 0
+
+    prototype_key = new_prototype["prototype_key"]
     changed = 0
     for obj in objects:
         do_save = False
@@ -630,6 +669,432 @@ def batch_update_objects_with_prototype(prototype, diff=None, objects=None):
     return changed
 
 
+# Set-based prototype updating
+
+_BULK_UPDATE_CHUNK_SIZE = 500
+_OBJ_ATTR_THROUGH = ObjectDB.db_attributes.through
+_OBJ_TAG_THROUGH = ObjectDB.db_tags.through
+_OBJ_MODEL = "objectdb"
+_BULK_FIELD_KEYS = {
+    "key": ("db_key", str),
+    "typeclass": ("db_typeclass_path", str),
+    "location": ("db_location", value_to_obj),
+    "home": ("db_home", value_to_obj),
+    "destination": ("db_destination", value_to_obj),
+}
+_BULK_TAG_KEYS = {
+    "tags": (None, "tags"),
+    "aliases": ("alias", "aliases"),
+    "permissions": ("permission", "permissions"),
+}
+
+
+def _is_static_value(value):
+    "Check if a prototype value initializes to the same result every time."
+    if callable(value) or (value and isinstance(value, (list, tuple)) and callable(value[0])):
+        return False
+    # protfuncs like $random() may give a different result for every object
+    return not (isinstance(value, str) and "$" in value)
+
+
+def _init_spawn_values(value, validator, objs):
+    """
+    Initialize a prototype value for a number of objects at once.
+
+    Args:
+        value (any): The prototype value to initialize.
+        validator (callable): Passed to `init_spawn_value`.
+        objs (list): The objects to get the value for.
+
+    Returns:
+        values (list): One value per object in `objs`. Static values are
+            only initialized once and the very same value is then re-used for every
+            object, which allows the caller to group them by `id()`.
+
+    """
+    if _is_static_value(value):
+        return [init_spawn_value(value, validator)] * len(objs)
+    return [init_spawn_value(value, validator) for _ in objs]
+
+
+def _group_by_value(objs, values):
+    """
+    Group objects sharing the same (identical) value.
+
+    Returns:
+        groups (list): List of `(value, [obj, ...])`.
+
+    """
+    groups = {}
+    for obj, value in zip(objs, values):
+        groups.setdefault(id(value), (value, []))[1].append(obj)
+    return list(groups.values())
+
+
+def _bulk_set_field(objs, fieldname, values):
+    "Set a database field on many objects with one UPDATE per distinct value."
+    for value, group in _group_by_value(objs, values):
+        ObjectDB.objects.filter(id__in=[obj.id for obj in group]).update(**{fieldname: value})
+        for obj in group:
+            if fieldname == "db_location":
+                # keep the contents caches up-to-date, since no save-hooks are triggered
+                if obj.db_location:
+                    obj.db_location.contents_cache.remove(obj)
+                if value:
+                    value.contents_cache.add(obj)
+            setattr(obj, fieldname, value)
+            if fieldname == "db_typeclass_path":
+                obj.set_class_from_typeclass(typeclass_path=value)
+
+
+def _bulk_set_locks(objs, lockstring, replace=False):
+    "Update the lock storage of many objects, grouping those with identical locks."
+    if replace:
+        groups = [(lockstring, objs)]
+    else:
+        storages = {}
+        for obj in objs:
+            storages.setdefault(obj.db_lock_storage or "", []).append(obj)
+        groups = []
+        for old_storage, group in storages.items():
+            # let the lockhandler merge and validate the locks once per group
+            merged = group[0].locks._parse_lockstring(
+                ";".join(part for part in (old_storage, lockstring) if part)
+            )
+            groups.append((";".join(tup[2] for tup in merged.values()), group))
+    for storage, group in groups:
+        ObjectDB.objects.filter(id__in=[obj.id for obj in group]).update(db_lock_storage=storage)
+        for obj in group:
+            obj.db_lock_storage = storage
+            obj.locks.reset()
+
+
+def _bulk_remove_attributes(objs, keys=None):
+    """
+    Delete Attributes from many objects at once.
+
+    Args:
+        objs (list): Objects to remove Attributes from.
+        keys (list, optional): Keys of the (category-less) Attributes to remove. If not
+            given, all Attributes on the objects are removed.
+
+    """
+    query = {
+        "objectdb_id__in": [obj.id for obj in objs],
+        "attribute__db_model": _OBJ_MODEL,
+        "attribute__db_attrtype": None,
+    }
+    if keys is not None:
+        query["attribute__db_key__in"] = [key.strip().lower() for key in keys]
+        query["attribute__db_category"] = None
+    attr_ids = _OBJ_ATTR_THROUGH.objects.filter(**query).values_list("attribute_id", flat=True)
+    # this also flushes the deleted Attributes from the idmapper cache
+    Attribute.objects.filter(id__in=list(attr_ids)).delete()
+    for obj in objs:
+        if keys is None:
+            obj.attributes.reset_cache()
+        else:
+            for key in keys:
+                obj.attributes._delcache(key.strip().lower(), None)
+
+
+def _bulk_add_attributes(objs, attrdefs):
+    """
+    Add or update Attributes on many objects at once.
+
+    Args:
+        objs (list): Objects to add the Attributes to.
+        attrdefs (list): List of `(key, values, category, lockstring)`, where `values` is
+            a list with one value per object in `objs`.
+
+    Notes:
+        Existing Attributes are updated with one UPDATE per distinct value, new ones are
+        created and linked to their objects in bulk. Attribute instances already in
+        the idmapper cache are updated in-place so they don't go stale.
+
+    """
+    objids = [obj.id for obj in objs]
+    can_bulk_create = getattr(
+        connection.features,
+        "can_return_rows_from_bulk_insert",
+        getattr(connection.features, "can_return_ids_from_bulk_insert", False),
+    )
+    for key, values, category, lockstring in attrdefs:
+        key = key.strip().lower()
+        category = category.strip().lower() if category else None
+        lockstring = lockstring or ""
+        existing = dict(
+            _OBJ_ATTR_THROUGH.objects.filter(
+                objectdb_id__in=objids,
+                attribute__db_model=_OBJ_MODEL,
+                attribute__db_attrtype=None,
+                attribute__db_key=key,
+                attribute__db_category=category,
+            ).values_list("objectdb_id", "attribute_id")
+        )
+        update_objs, update_values, to_create = [], [], []
+        for obj, value in zip(objs, values):
+            if obj.id in existing:
+                update_objs.append(obj)
+                update_values.append(value)
+            else:
+                to_create.append((obj, value))
+
+        for value, group in _group_by_value(update_objs, update_values):
+            attr_ids = [existing[obj.id] for obj in group]
+            pickled = to_pickle(value)
+            Attribute.objects.filter(id__in=attr_ids).update(
+                db_value=pickled, db_strvalue=None, db_lock_storage=lockstring
+            )
+            for attr_id in attr_ids:
+                attr = Attribute.get_cached_instance(attr_id)
+                if attr:
+                    # refresh idmapper-cached instance in place
+                    attr.db_value = pickled
+                    attr.db_strvalue = None
+                    attr.db_lock_storage = lockstring
+                    attr.locks.reset()
+
+        if to_create:
+            new_attrs = [
+                Attribute(
+                    db_key=key,
+                    db_category=category,
+                    db_model=_OBJ_MODEL,
+                    db_attrtype=None,
+                    db_value=to_pickle(value),
+                    db_lock_storage=lockstring,
+                )
+                for _, value in to_create
+            ]
+            if can_bulk_create:
+                new_attrs = Attribute.objects.bulk_create(new_attrs)
+                for attr in new_attrs:
+                    Attribute.cache_instance(attr)
+            else:
+                # the backend can't report the new ids, so we must save one by one
+                for attr in new_attrs:
+                    attr.save()
+            _OBJ_ATTR_THROUGH.objects.bulk_create(
+                [
+                    _OBJ_ATTR_THROUGH(objectdb_id=obj.id, attribute_id=attr.id)
+                    for (obj, _), attr in zip(to_create, new_attrs)
+                ]
+            )
+            for (obj, _), attr in zip(to_create, new_attrs):
+                obj.attributes._setcache(key, category, attr)
+
+
+def _bulk_clear_tags(objs, tagtype, category=None, exclude_category=None):
+    "Unlink all Tags of a given tagtype (and optionally category) from many objects."
+    query = _OBJ_TAG_THROUGH.objects.filter(
+        objectdb_id__in=[obj.id for obj in objs], tag__db_model=_OBJ_MODEL, tag__db_tagtype=tagtype
+    )
+    if category:
+        query = query.filter(tag__db_category=category)
+    if exclude_category:
+        query = query.exclude(tag__db_category=exclude_category)
+    query.delete()
+
+
+def _bulk_add_tags(objs, tagdefs, tagtype):
+    """
+    Link Tags to many objects at once.
+
+    Args:
+        objs (list): Objects to tag.
+        tagdefs (list): List of `(keys, category, data)` where `keys` is a list with
+            one tag-key per object in `objs`.
+        tagtype (str or None): The type of Tag (`None`, "alias" or "permission").
+
+    """
+    pairs = set()
+    for keys, category, data in tagdefs:
+        for key, group in _group_by_value(objs, keys):
+            if not key:
+                continue
+            tag = ObjectDB.objects.create_tag(
+                key=str(key), category=category, data=data, tagtype=tagtype
+            )
+            pairs.update((obj.id, tag.id) for obj in group)
+    if not pairs:
+        return
+    existing = set(
+        _OBJ_TAG_THROUGH.objects.filter(
+            objectdb_id__in=[obj.id for obj in objs], tag_id__in=set(tagid for _, tagid in pairs),
+        ).values_list("objectdb_id", "tag_id")
+    )
+    _OBJ_TAG_THROUGH.objects.bulk_create(
+        [_OBJ_TAG_THROUGH(objectdb_id=objid, tag_id=tagid) for objid, tagid in pairs - existing]
+    )
+
+
+def _bulk_update_chunk(objs, new_prototype, diff):
+    """
+    Apply a flattened prototype diff to a set of objects using set-based queries.
+
+    Args:
+        objs (list): The objects to update.
+        new_prototype (dict): The prototype to apply.
+        diff (dict): A flattened diff, as produced by `flatten_diff`.
+
+    Returns:
+        changed (int): The number of objects that had changes applied to them.
+
+    """
+    if not objs:
+        return 0
+    prototype_key = new_prototype["prototype_key"]
+    do_update = False
+    attrdefs = []
+
+    for key, directive in diff.items():
+        if directive not in ("UPDATE", "REPLACE", "REMOVE"):
+            continue
+        if directive == "REMOVE":
+            do_update = True
+        if key in _PROTOTYPE_META_NAMES:
+            # prototype meta keys are not stored on-object
+            continue
+        do_update = True
+        val = new_prototype.get(key)
+
+        if key == "exec":
+            # we don't auto-rerun exec statements, it would be huge security risk!
+            continue
+        elif key in _BULK_FIELD_KEYS:
+            fieldname, validator = _BULK_FIELD_KEYS[key]
+            if directive == "REMOVE":
+                default = {"db_key": "", "db_typeclass_path": settings.BASE_OBJECT_TYPECLASS}
+                _bulk_set_field(objs, fieldname, [default.get(fieldname)] * len(objs))
+            else:
+                _bulk_set_field(objs, fieldname, _init_spawn_values(val, validator, objs))
+        elif key == "locks":
+            if directive == "REMOVE":
+                _bulk_set_locks(objs, "", replace=True)
+            else:
+                _bulk_set_locks(objs, init_spawn_value(val, str), replace=directive == "REPLACE")
+        elif key in _BULK_TAG_KEYS:
+            tagtype, handlername = _BULK_TAG_KEYS[key]
+            if directive in ("REPLACE", "REMOVE"):
+                # the prototype-tag itself is managed separately below
+                _bulk_clear_tags(objs, tagtype, exclude_category=_PROTOTYPE_TAG_CATEGORY)
+            if directive != "REMOVE":
+                if key == "tags":
+                    tagdefs = [
+                        (_init_spawn_values(ttag, str, objs), tcategory, tdata)
+                        for ttag, tcategory, tdata in val
+                    ]
+                else:
+                    tagdefs = [(_init_spawn_values(tkey, str, objs), None, None) for tkey in val]
+                _bulk_add_tags(objs, tagdefs, tagtype)
+            for obj in objs:
+                getattr(obj, handlername).reset_cache()
+        elif key == "attrs":
+            if directive in ("REPLACE", "REMOVE"):
+                _bulk_remove_attributes(objs)
+            if directive != "REMOVE":
+                attrdefs.extend(
+                    (
+                        init_spawn_value(akey, str),
+                        _init_spawn_values(aval, value_to_obj, objs),
+                        acategory,
+                        alocks,
+                    )
+                    for akey, aval, acategory, alocks in val
+                )
+        elif directive == "REMOVE":
+            _bulk_remove_attributes(objs, keys=[key])
+        else:
+            attrdefs.append((key, _init_spawn_values(val, value_to_obj, objs), None, ""))
+
+    if attrdefs:
+        _bulk_add_attributes(objs, attrdefs)
+
+    # make sure all objects are tagged with the (possibly new) prototype
+    prototag = ObjectDB.objects.create_tag(key=prototype_key, category=_PROTOTYPE_TAG_CATEGORY)
+    _OBJ_TAG_THROUGH.objects.filter(
+        objectdb_id__in=[obj.id for obj in objs], tag__db_category=_PROTOTYPE_TAG_CATEGORY
+    ).exclude(tag_id=prototag.id).delete()
+    tagged = set(
+        _OBJ_TAG_THROUGH.objects.filter(
+            objectdb_id__in=[obj.id for obj in objs], tag_id=prototag.id
+        ).values_list("objectdb_id", flat=True)
+    )
+    untagged = [obj for obj in objs if obj.id not in tagged]
+    if untagged:
+        _OBJ_TAG_THROUGH.objects.bulk_create(
+            [_OBJ_TAG_THROUGH(objectdb_id=obj.id, tag_id=prototag.id) for obj in untagged]
+        )
+        for obj in untagged:
+            obj.tags.reset_cache()
+
+    return len(objs) if do_update else 0
+
+
+def bulk_update_objects_with_prototype(
+    prototype, diff=None, objects=None, chunk_size=_BULK_UPDATE_CHUNK_SIZE, callback=None
+):
+    """
+    Set-based version of `batch_update_objects_with_prototype`, for updating very many
+    objects. The diff is calculated once and then applied to chunks of objects with bulk
+    UPDATE/INSERT/DELETE queries on the affected Attribute and Tag rows. The work
+    cooperatively yields to the reactor between chunks, so the server is not stalled.
+
+    Args:
+        prototype (str or dict): Either the `prototype_key` to use or the
+            prototype dict itself.
+        diff (dict, optional): This a diff structure that describes how to update the protototype.
+            If not given this will be constructed from the first object found.
+        objects (list or Queryset, optional): Objects to update. If not given, query for these
+            objects using the prototype's `prototype_key`.
+        chunk_size (int, optional): How many objects to update before yielding to the reactor.
+        callback (callable, optional): Called after each chunk as
+            `callback(num_processed, num_total)`, for progress reporting.
+
+    Returns:
+        deferred (Deferred): Fires with the number of objects that had changes applied
+            to them, once all chunks have completed.
+
+    Notes:
+        Since this bypasses the normal handlers, no `save` is called on the objects.
+        Idmapper-cached Objects and Attributes are instead updated in-place and the
+        handler caches reset as needed.
+
+    """
+    new_prototype, diff, objects = _prepare_batch_update(prototype, diff, objects)
+    changed = [0]
+
+    if diff is None:
+        return defer.succeed(0)
+
+    if hasattr(objects, "values_list"):
+        # a queryset - only load one chunk of objects into memory at a time
+        objids = list(objects.values_list("id", flat=True))
+
+        def _get_chunk(istart):
+            return list(ObjectDB.objects.filter(id__in=objids[istart : istart + chunk_size]))
+
+    else:
+        objids = objects
+
+        def _get_chunk(istart):
+            return objects[istart : istart + chunk_size]
+
+    ntotal = len(objids)
+
+    def _run_chunks():
+        for istart in range(0, ntotal, chunk_size):
+            chunk = _get_chunk(istart)
+            with transaction.atomic():
+                changed[0] += _bulk_update_chunk(chunk, new_prototype, diff)
+            if callback:
+                callback(min(istart + chunk_size, ntotal), ntotal)
+            yield
+
+    return cooperate(_run_chunks()).whenDone().addCallback(lambda _: changed[0])
+
+
 def batch_create_object(*objparams):
     """
     This is a cut-down version of the create_object() function,
@@ -5,6 +5,7 @@ Unit tests for the prototypes and spawner
 
 from random import randint
 import mock
+from twisted.internet import defer
 from anything import Something
 from django.test.utils import override_settings
 from evennia.utils.test_resources import EvenniaTest
@@ -304,6 +305,96 @@ class TestUtils(EvenniaTest):
         )
 
 
+def _mock_cooperate(iterator):
+    "Run all chunks of a cooperative task at once"
+    for _ in iterator:
+        pass
+    return mock.Mock(whenDone=lambda: defer.succeed(iterator))
+
+
+class TestBulkUpdate(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.prot = {
+            "prototype_key": "bulkprot",
+            "typeclass": "evennia.objects.objects.DefaultObject",
+            "key": "thing",
+            "location": self.room1,
+            "attrs": [("weight", 10, None, ""), ("color", "red", None, "")],
+            "tags": [("heavy", "size", None)],
+            "aliases": ["stuff"],
+        }
+        self.objs = spawner.spawn(*([self.prot] * 5))
+
+    @mock.patch("evennia.prototypes.spawner.cooperate", _mock_cooperate)
+    def test_bulk_update_objects_with_prototype(self):
+        obj = self.objs[0]
+        weight_attr = obj.attributes.get("weight", return_obj=True)
+
+        new_prot = dict(self.prot)
+        new_prot["key"] = "new thing"
+        new_prot["attrs"] = [
+            ("weight", 20, None, ""),
+            ("color", "red", None, ""),
+            ("material", "wood", None, ""),
+        ]
+        new_prot["tags"] = [("light", "size", None)]
+        new_prot["aliases"] = ["stuff", "junk"]
+        new_prot["desc"] = "A new thing."
+
+        progress = []
+        result = []
+        spawner.bulk_update_objects_with_prototype(
+            new_prot,
+            objects=self.objs,
+            chunk_size=2,
+            callback=lambda nprocessed, ntotal: progress.append((nprocessed, ntotal)),
+        ).addCallback(result.append)
+
+        self.assertEqual(result, [5])
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        # cached Attribute was updated in-place
+        self.assertEqual(weight_attr.value, 20)
+        for obj in self.objs:
+            self.assertEqual(obj.key, "new thing")
+            self.assertEqual(obj.location, self.room1)
+            self.assertEqual(obj.db.weight, 20)
+            self.assertEqual(obj.db.material, "wood")
+            self.assertEqual(obj.db.desc, "A new thing.")
+            self.assertEqual(obj.db.color, "red")
+            self.assertEqual(obj.tags.get(category="size"), "light")
+            self.assertEqual(sorted(obj.aliases.all()), ["junk", "stuff"])
+            self.assertEqual(obj.tags.get(category=spawner._PROTOTYPE_TAG_CATEGORY), "bulkprot")
+            # the result must match that of a database reload
+            obj.attributes.reset_cache()
+            self.assertEqual(obj.db.weight, 20)
+        self.assertEqual(
+            spawner.prototype_diff_from_object(new_prot, self.objs[-1])[0]["key"],
+            ("new thing", "new thing", "KEEP"),
+        )
+
+    @mock.patch("evennia.prototypes.spawner.cooperate", _mock_cooperate)
+    def test_bulk_update_queryset(self):
+        new_prot = dict(self.prot)
+        new_prot["attrs"] = [("color", "blue", None, "")]
+        result = []
+        spawner.bulk_update_objects_with_prototype(new_prot, chunk_size=3).addCallback(
+            result.append
+        )
+        self.assertEqual(result, [5])
+        for obj in self.objs:
+            # attrs were replaced
+            self.assertEqual(obj.db.color, "blue")
+            self.assertEqual(obj.db.weight, None)
+
+    def test_prepare_batch_update_lazy(self):
+        _, diff, objects = spawner._prepare_batch_update(self.prot)
+        self.assertTrue(diff)
+        # the objects are not loaded until updated one chunk at a time
+        self.assertIsNone(objects._result_cache)
+        self.assertEqual(objects.count(), 5)
+
+
 class TestProtLib(EvenniaTest):
     def setUp(self):
         super(TestProtLib, self).setUp()
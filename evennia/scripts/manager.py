@@ -4,6 +4,7 @@ The custom manager for Scripts.
 
 from django.db.models import Q
 from evennia.typeclasses.managers import TypedObjectManager, TypeclassManager
+from evennia.scripts.scheduler import get_shared_typeclass_paths
 from evennia.utils.utils import make_iter
 
 __all__ = ("ScriptManager",)
@@ -186,8 +187,12 @@ class ScriptDBManager(TypedObjectManager):
                 # special mode when server starts or object logs in.
                 # This deletes all non-persistent scripts from database
                 nr_stopped += self.remove_non_persistent(obj=obj)
-            # turn off the activity flag for all remaining scripts
-            scripts = self.get_all_scripts()
+            # turn off the activity flag for all remaining scripts. Scripts
+            # on the shared timer are left running; they are resumed by the
+            # script scheduler without being loaded.
+            scripts = self.get_all_scripts().exclude(
+                db_typeclass_path__in=get_shared_typeclass_paths()
+            )
             for script in scripts:
                 script.is_active = False
 
@@ -197,8 +202,13 @@ class ScriptDBManager(TypedObjectManager):
                 scripts = self.get_id(dbref)
             elif obj:
                 scripts = self.get_all_scripts_on_obj(obj, key=key)
-            else:
+            elif key:
                 scripts = self.get_all_scripts(key=key)
+            else:
+                # Scripts on the shared timer are validated when they repeat
+                scripts = self.get_all_scripts().exclude(
+                    db_typeclass_path__in=get_shared_typeclass_paths()
+                )
 
         if not scripts:
             # no scripts available to validate
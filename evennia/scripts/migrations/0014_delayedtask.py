@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("scripts", "0013_auto_20191025_0831")]
+
+    operations = [
+        migrations.CreateModel(
+            name="DelayedTask",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("db_date", models.DateTimeField(db_index=True, verbose_name="due date")),
+                ("db_value", models.BinaryField(verbose_name="value")),
+            ],
+            options={"verbose_name": "Delayed task", "ordering": ("db_date", "id")},
+        )
+    ]
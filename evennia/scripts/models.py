@@ -31,7 +31,7 @@ from evennia.typeclasses.models import TypedObject
 from evennia.scripts.manager import ScriptDBManager
 from evennia.utils.utils import dbref, to_str
 
-__all__ = ("ScriptDB",)
+__all__ = ("ScriptDB", "DelayedTask")
 _GA = object.__getattribute__
 _SA = object.__setattr__
 
@@ -179,3 +179,34 @@ class ScriptDB(TypedObject):
 
     obj = property(__get_obj, __set_obj)
     object = property(__get_obj, __set_obj)
+
+
+# ------------------------------------------------------------
+#
+# DelayedTask
+#
+# ------------------------------------------------------------
+
+
+class DelayedTask(models.Model):
+    """
+    A persistent task of the TaskHandler, created by `utils.delay` with
+    `persistent=True`. Each task is stored in its own row, so adding or
+    removing one does not require re-saving all the others.
+
+    The DelayedTask has the following properties:
+      date - when the task is due
+      value - the serialized (date, callback, args, kwargs) of the task
+
+    """
+
+    db_date = models.DateTimeField("due date", db_index=True)
+    db_value = models.BinaryField("value")
+
+    class Meta(object):
+        "Define Django meta options"
+        verbose_name = "Delayed task"
+        ordering = ("db_date", "id")
+
+    def __str__(self):
+        return "<DelayedTask {} due {}>".format(self.id, self.db_date)
@@ -0,0 +1,368 @@
+"""
+Script scheduler
+
+Every timed Script normally runs its own timer in the reactor. With
+many thousands of Scripts this makes for as many delayed calls, and
+every reload or validation loads all Scripts from the database to
+restart them.
+
+Scripts setting the class property `shared_timer = True` are instead
+hosted on the `SCRIPT_SCHEDULER`. This keeps the due times of all such
+Scripts in a single heap, with only the earliest one scheduled in the
+reactor. Only the ids of the Scripts are stored, so a Script does not
+have to stay in memory between its repeats; it's loaded from the
+database when due. The scheduler saves its state when the server stops
+and restores it on start without loading the Scripts, and these Scripts
+are skipped by `ScriptDB.objects.validate` when validating all Scripts.
+Instead, `is_valid` is checked whenever the Script is due.
+
+Note that since they are not loaded on start, the `at_start` hook of
+such Scripts is not called after a reload, only when they are first
+started or unpaused.
+
+"""
+
+import heapq
+from twisted.internet import reactor
+from evennia.utils import logger
+from evennia.utils.utils import class_from_module
+
+_SAVE_KEY = "script_scheduler"
+# compact the heap when it holds this many times more items than there are Scripts
+_COMPACT_RATIO = 2
+
+_SCRIPTDB = None
+_SERVERCONFIG = None
+
+
+def get_shared_typeclass_paths():
+    """
+    Get the typeclass paths of all Scripts in the database using the
+    shared timer. This only loads the typeclasses, not the Scripts.
+
+    Returns:
+        paths (list): The typeclass paths.
+
+    """
+    global _SCRIPTDB
+    if not _SCRIPTDB:
+        from evennia.scripts.models import ScriptDB as _SCRIPTDB
+
+    paths = []
+    for path in _SCRIPTDB.objects.order_by().values_list("db_typeclass_path", flat=True).distinct():
+        try:
+            typeclass = class_from_module(path)
+        except Exception:
+            continue
+        if getattr(typeclass, "shared_timer", False):
+            paths.append(path)
+    return paths
+
+
+class SharedTimerTask(object):
+    """
+    Stands in for the `ExtendedLoopingCall` of a Script using the shared
+    timer, so the Script can treat both the same way. It holds no state
+    of its own; that is kept by the scheduler.
+
+    """
+
+    def __init__(self, script, scheduler=None):
+        """
+        Args:
+            script (Script): The Script to run.
+            scheduler (ScriptScheduler, optional): The scheduler to use.
+                Defaults to `SCRIPT_SCHEDULER`.
+
+        """
+        self.script = script
+        self.scheduler = scheduler or SCRIPT_SCHEDULER
+
+    def __bool__(self):
+        return self.running
+
+    @property
+    def running(self):
+        return self.script.id in self.scheduler
+
+    @property
+    def callcount(self):
+        return self.scheduler.get_callcount(self.script.id)
+
+    @callcount.setter
+    def callcount(self, value):
+        self.scheduler.set_callcount(self.script.id, value)
+
+    def start(self, interval, now=True, start_delay=None, count_start=0):
+        """
+        Start running the Script every interval seconds. Takes the same
+        arguments as `ExtendedLoopingCall.start`. Nothing is done if
+        interval is 0, since there is nothing to repeat.
+
+        """
+        if interval > 0:
+            self.scheduler.add(
+                self.script, interval, now=now, start_delay=start_delay, count_start=count_start
+            )
+
+    def stop(self):
+        self.scheduler.remove(self.script.id)
+
+    def force_repeat(self):
+        self.scheduler.force_repeat(self.script)
+
+    def next_call_time(self):
+        return self.scheduler.next_call_time(self.script.id)
+
+
+class ScriptScheduler(object):
+    """
+    Runs the repeats of many Scripts on one timer. Use the
+    `SCRIPT_SCHEDULER` singleton rather than creating new instances
+    of this class.
+
+    """
+
+    def __init__(self, clock=None):
+        """
+        Args:
+            clock (IReactorTime, optional): The clock to use, for testing.
+                Defaults to the reactor.
+
+        """
+        self.clock = clock or reactor
+        # {script_id: [due time, interval, callcount, sequence number]}
+        self.entries = {}
+        # (due time, sequence number, script_id); entries whose sequence
+        # number no longer matches are outdated and skipped
+        self.heap = []
+        self._seq = 0
+        self._call = None
+
+    def __contains__(self, script_id):
+        return script_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _push(self, script_id, due):
+        "Set the next due time of a Script"
+        self._seq += 1
+        entry = self.entries[script_id]
+        entry[0], entry[3] = due, self._seq
+        heapq.heappush(self.heap, (due, self._seq, script_id))
+
+    def _is_current(self, item):
+        entry = self.entries.get(item[2])
+        return entry is not None and entry[3] == item[1]
+
+    def _schedule(self):
+        "Make sure the reactor calls us at the earliest due time"
+        if len(self.heap) > _COMPACT_RATIO * len(self.entries) + 64:
+            self.heap = [
+                (entry[0], entry[3], script_id) for script_id, entry in self.entries.items()
+            ]
+            heapq.heapify(self.heap)
+        while self.heap and not self._is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        call = self._call
+        if not self.heap:
+            if call and call.active():
+                call.cancel()
+            self._call = None
+            return
+        due = self.heap[0][0]
+        if call and call.active():
+            if call.getTime() <= due:
+                return
+            call.cancel()
+        self._call = self.clock.callLater(max(0, due - self.clock.seconds()), self._tick)
+
+    def _load(self, script_ids):
+        "Get Scripts by id, from the cache or else with one query"
+        global _SCRIPTDB
+        if not _SCRIPTDB:
+            from evennia.scripts.models import ScriptDB as _SCRIPTDB
+
+        scripts, missing = {}, []
+        for script_id in script_ids:
+            script = _SCRIPTDB.get_cached_instance(script_id)
+            if script:
+                scripts[script_id] = script
+            else:
+                missing.append(script_id)
+        if missing:
+            scripts.update(
+                (script.id, script) for script in _SCRIPTDB.objects.filter(id__in=missing)
+            )
+        return scripts
+
+    def _fire(self, script):
+        "Run one repeat of a Script"
+        self.entries[script.id][2] += 1
+        script._step_task()
+
+    def _tick(self):
+        "Run all Scripts that are due"
+        self._call = None
+        now = self.clock.seconds()
+        due_ids = []
+        while self.heap and self.heap[0][0] <= now:
+            item = heapq.heappop(self.heap)
+            if self._is_current(item):
+                due_ids.append(item[2])
+        scripts = self._load(due_ids)
+        for script_id in due_ids:
+            entry = self.entries.get(script_id)
+            if not entry:
+                # removed by a Script that ran before it
+                continue
+            script = scripts.get(script_id)
+            if not script or script._is_deleted:
+                del self.entries[script_id]
+                continue
+            # like a LoopingCall, skip repeats missed if we were too busy
+            due = entry[0] + entry[1]
+            self._push(script_id, due if due > now else now + entry[1])
+            try:
+                self._fire(script)
+            except Exception:
+                logger.log_trace()
+        self._schedule()
+
+    def add(self, script, interval, now=True, start_delay=None, count_start=0):
+        """
+        Start running a Script every interval seconds.
+
+        Args:
+            script (Script): The Script to run. Its `at_repeat` hook is
+                called through `_step_task`.
+            interval (int): Repeat interval in seconds.
+            now (bool, optional): Whether to run immediately or after
+                `start_delay` seconds.
+            start_delay (int, optional): The number of seconds before the
+                first repeat. If None, wait interval seconds.
+            count_start (int, optional): Number of repeats to start at.
+
+        Raises:
+            ValueError: If `interval` is not > 0.
+
+        """
+        if interval <= 0:
+            raise ValueError("interval must be > 0")
+        self.entries[script.id] = [0, interval, max(0, count_start), 0]
+        if not now and start_delay is not None:
+            delay = max(0, start_delay)
+        else:
+            delay = interval
+        self._push(script.id, self.clock.seconds() + delay)
+        self._schedule()
+        if now:
+            self._fire(script)
+
+    def remove(self, script_id):
+        """
+        Stop running a Script.
+
+        Args:
+            script_id (int): The id of the Script.
+
+        """
+        if self.entries.pop(script_id, None):
+            self._schedule()
+
+    def force_repeat(self, script):
+        """
+        Run a Script right away. Its next repeat will be one interval
+        from now.
+
+        Args:
+            script (Script): The Script to run.
+
+        """
+        entry = self.entries.get(script.id)
+        if entry:
+            self._push(script.id, self.clock.seconds() + entry[1])
+            self._schedule()
+            self._fire(script)
+
+    def next_call_time(self, script_id):
+        """
+        Get the time until a Script repeats.
+
+        Args:
+            script_id (int): The id of the Script.
+
+        Returns:
+            next (float or None): Seconds until the next repeat, or
+                None if the Script is not running.
+
+        """
+        entry = self.entries.get(script_id)
+        if entry:
+            return max(0, entry[0] - self.clock.seconds())
+
+    def get_callcount(self, script_id):
+        entry = self.entries.get(script_id)
+        return entry[2] if entry else 0
+
+    def set_callcount(self, script_id, value):
+        entry = self.entries.get(script_id)
+        if entry:
+            entry[2] = max(0, int(value))
+
+    def save(self):
+        """
+        Save the state of all running Scripts to the database. This is
+        called by the Server when stopping.
+
+        """
+        global _SERVERCONFIG
+        if not _SERVERCONFIG:
+            from evennia.server.models import ServerConfig as _SERVERCONFIG
+
+        now = self.clock.seconds()
+        _SERVERCONFIG.objects.conf(
+            _SAVE_KEY,
+            value=dict(
+                (script_id, (max(0, entry[0] - now), entry[2]))
+                for script_id, entry in self.entries.items()
+            ),
+        )
+
+    def restore(self):
+        """
+        Resume all active Scripts using the shared timer, without loading
+        them. This is called by the Server on start, after validating the
+        other Scripts.
+
+        Returns:
+            nrestored (int): The number of Scripts restored.
+
+        """
+        global _SCRIPTDB, _SERVERCONFIG
+        if not _SCRIPTDB:
+            from evennia.scripts.models import ScriptDB as _SCRIPTDB
+        if not _SERVERCONFIG:
+            from evennia.server.models import ServerConfig as _SERVERCONFIG
+
+        saved = _SERVERCONFIG.objects.conf(_SAVE_KEY) or {}
+        _SERVERCONFIG.objects.conf(_SAVE_KEY, delete=True)
+        paths = get_shared_typeclass_paths()
+        if not paths:
+            return 0
+        now = self.clock.seconds()
+        for script_id, interval in _SCRIPTDB.objects.filter(
+            db_typeclass_path__in=paths, db_is_active=True, db_interval__gt=0
+        ).values_list("id", "db_interval"):
+            if script_id in self.entries:
+                continue
+            # Scripts without saved state (like after a crash) start over
+            delay, callcount = saved.get(script_id, (interval, 0))
+            self.entries[script_id] = [0, interval, callcount, 0]
+            self._push(script_id, now + delay)
+        self._schedule()
+        return len(self.entries)
+
+
+SCRIPT_SCHEDULER = ScriptScheduler()
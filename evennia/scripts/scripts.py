@@ -12,6 +12,7 @@ from django.utils.translation import gettext as _
 from evennia.typeclasses.models import TypeclassBase
 from evennia.scripts.models import ScriptDB
 from evennia.scripts.manager import ScriptManager
+from evennia.scripts.scheduler import SharedTimerTask
 from evennia.utils import create, logger
 
 __all__ = ["DefaultScript", "DoNothing", "Store"]
@@ -151,42 +152,66 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
 
     objects = ScriptManager()
 
+    # if set, run on the shared timer of the `SCRIPT_SCHEDULER` instead
+    # of a timer of our own. See `evennia.scripts.scheduler`.
+    shared_timer = False
+
     def __str__(self):
         return "<{cls} {key}>".format(cls=self.__class__.__name__, key=self.key)
 
     def __repr__(self):
         return str(self)
 
+    def _get_task(self, create=False):
+        """
+        Get the task runner.
+
+        Args:
+            create (bool, optional): Create the runner if there is none.
+
+        Returns:
+            task (ExtendedLoopingCall, SharedTimerTask or None): The runner.
+                Runners on the shared timer are only returned while running
+                unless `create` is set.
+
+        """
+        if self.shared_timer:
+            task = SharedTimerTask(self)
+            return task if create or task.running else None
+        if create and not self.ndb._task:
+            self.ndb._task = ExtendedLoopingCall(self._step_task)
+        return self.ndb._task
+
     def _start_task(self):
         """
         Start task runner.
 
         """
-        if not self.ndb._task:
-            self.ndb._task = ExtendedLoopingCall(self._step_task)
+        task = self._get_task(create=True)
 
         if self.db._paused_time:
             # the script was paused; restarting
             callcount = self.db._paused_callcount or 0
-            self.ndb._task.start(
+            task.start(
                 self.db_interval, now=False, start_delay=self.db._paused_time, count_start=callcount
             )
             del self.db._paused_time
             del self.db._paused_repeats
 
-        elif not self.ndb._task.running:
+        elif not task.running:
             # starting script anew
-            self.ndb._task.start(self.db_interval, now=not self.db_start_delay)
+            task.start(self.db_interval, now=not self.db_start_delay)
 
     def _stop_task(self):
         """
         Stop task runner
 
         """
-        task = self.ndb._task
+        task = self._get_task()
         if task and task.running:
             task.stop()
-        self.ndb._task = None
+        if not self.shared_timer:
+            self.ndb._task = None
 
     def _step_errback(self, e):
         """
@@ -209,7 +234,7 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
         Step task runner. No try..except needed due to defer wrap.
 
         """
-        if not self.ndb._task:
+        if not self._get_task():
             # if there is no task, we have no business using this method
             return
 
@@ -221,10 +246,11 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
         self.at_repeat()
 
         # check repeats
-        if self.ndb._task:
+        task = self._get_task()
+        if task:
             # we need to check for the task in case stop() was called
             # inside at_repeat() and it already went away.
-            callcount = self.ndb._task.callcount
+            callcount = task.callcount
             maxcount = self.db_repeats
             if maxcount > 0 and maxcount <= callcount:
                 self.stop()
@@ -372,7 +398,7 @@ class DefaultScript(ScriptBase):
             on their scripts and when they will next be run.
 
         """
-        task = self.ndb._task
+        task = self._get_task()
         if task:
             try:
                 return int(round(task.next_call_time()))
@@ -390,7 +416,7 @@ class DefaultScript(ScriptBase):
                 if it has unlimited repeats.
 
         """
-        task = self.ndb._task
+        task = self._get_task()
         if task:
             return max(0, self.db_repeats - task.callcount)
         return None
@@ -437,8 +463,8 @@ class DefaultScript(ScriptBase):
         if self.is_active and not force_restart:
             # The script is already running, but make sure we have a _task if
             # this is after a cache flush
-            if not self.ndb._task and self.db_interval >= 0:
-                self.ndb._task = ExtendedLoopingCall(self._step_task)
+            if not self._get_task() and self.db_interval >= 0:
+                task = self._get_task(create=True)
                 try:
                     start_delay, callcount = SCRIPT_FLUSH_TIMERS[self.id]
                     del SCRIPT_FLUSH_TIMERS[self.id]
@@ -447,7 +473,7 @@ class DefaultScript(ScriptBase):
                     now = not self.db_start_delay
                     start_delay = None
                     callcount = 0
-                self.ndb._task.start(
+                task.start(
                     self.db_interval, now=now, start_delay=start_delay, count_start=callcount
                 )
             return 0
@@ -520,7 +546,7 @@ class DefaultScript(ScriptBase):
         self.db._manual_pause = manual_pause
         if not self.db._paused_time:
             # only allow pause if not already paused
-            task = self.ndb._task
+            task = self._get_task()
             if task:
                 self.db._paused_time = task.next_call_time()
                 self.db._paused_callcount = task.callcount
@@ -610,7 +636,7 @@ class DefaultScript(ScriptBase):
             This is only useful if repeats != 0.
 
         """
-        task = self.ndb._task
+        task = self._get_task()
         if task:
             task.callcount = max(0, int(value))
 
@@ -620,7 +646,7 @@ class DefaultScript(ScriptBase):
         will reset the timer and count down repeats as if the script
         had fired normally.
         """
-        task = self.ndb._task
+        task = self._get_task()
         if task:
             task.force_repeat()
 
@@ -4,13 +4,30 @@ Module containing the task handler for Evennia deferred tasks, persistent or not
 
 from datetime import datetime, timedelta
 
+from django.conf import settings
+from django.utils import timezone
 from twisted.internet import reactor
 from twisted.internet.task import deferLater
+from evennia.scripts.models import DelayedTask
 from evennia.server.models import ServerConfig
-from evennia.utils.logger import log_err
+from evennia.utils.logger import log_err, log_trace
 from evennia.utils.dbserialize import dbserialize, dbunserialize
 
 TASK_HANDLER = None
+# stay below the max number of query parameters of SQLite
+_BATCH_SIZE = 500
+
+
+def _db_date(date):
+    """
+    Get the value of the due date column for a task date. The tasks keep
+    naive local dates (also in their pickled value), but the column needs
+    aware ones when `settings.USE_TZ` is set.
+
+    """
+    if settings.USE_TZ and timezone.is_naive(date):
+        return timezone.make_aware(date)
+    return date
 
 
 class TaskHandler(object):
@@ -20,7 +37,8 @@ class TaskHandler(object):
 
     When `utils.delay` is called, the task handler is used to create
     the task.  If `utils.delay`  is called with `persistent=True`, the
-    task handler stores the new task and saves.
+    task handler stores the new task in its own database row, which
+    is deleted when the task is run or removed.
 
     It's easier to access these tasks (should it be necessary) using
     `evennia.scripts.taskhandler.TASK_HANDLER`, which contains one
@@ -30,67 +48,87 @@ class TaskHandler(object):
 
     def __init__(self):
         self.tasks = {}
-        self.to_save = {}
+
+    def _serialize(self, date, callback, args, kwargs):
+        """
+        Serialize a task for storing.
+
+        Raises:
+            ValueError: If the callback cannot be pickled.
+
+        """
+        if getattr(callback, "__self__", None):
+            # `callback` is an instance method
+            callback = (callback.__self__, callback.__name__)
+
+        # Check if callback can be pickled. args and kwargs have been checked
+        try:
+            dbserialize(callback)
+        except (TypeError, AttributeError):
+            raise ValueError(
+                "the specified callback {} cannot be pickled. "
+                "It must be a top-level function in a module or an "
+                "instance method.".format(callback)
+            )
+        return dbserialize((date, callback, args, kwargs))
+
+    def _migrate(self):
+        """
+        Move tasks saved by older versions, all in one ServerConfig value,
+        to their own rows.
+
+        """
+        value = ServerConfig.objects.conf("delayed_tasks")
+        if not value:
+            return
+        if isinstance(value, str):
+            value = dbunserialize(value)
+        DelayedTask.objects.bulk_create(
+            DelayedTask(db_date=_db_date(dbunserialize(serialized)[0]), db_value=serialized)
+            for serialized in value.values()
+        )
+        ServerConfig.objects.conf("delayed_tasks", delete=True)
 
     def load(self):
-        """Load from the ServerConfig.
+        """Load the tasks from the database, in the order they are due.
 
         Note:
             This should be automatically called when Evennia starts.
-            It populates `self.tasks` according to the ServerConfig.
+            It populates `self.tasks` according to the database.
 
         """
-        to_save = False
-        value = ServerConfig.objects.conf("delayed_tasks", default={})
-        if isinstance(value, str):
-            tasks = dbunserialize(value)
-        else:
-            tasks = value
-
-        # At this point, `tasks` contains a dictionary of still-serialized tasks
-        for task_id, value in tasks.items():
-            date, callback, args, kwargs = dbunserialize(value)
+        self._migrate()
+        invalid = []
+        for task_id, value in DelayedTask.objects.values_list("id", "db_value").iterator():
+            date, callback, args, kwargs = dbunserialize(bytes(value))
             if isinstance(callback, tuple):
                 # `callback` can be an object and name for instance methods
                 obj, method = callback
                 if obj is None:
-                    to_save = True
+                    invalid.append(task_id)
                     continue
 
                 callback = getattr(obj, method)
             self.tasks[task_id] = (date, callback, args, kwargs)
 
-        if to_save:
-            self.save()
+        if invalid:
+            DelayedTask.objects.filter(id__in=invalid).delete()
 
     def save(self):
-        """Save the tasks in ServerConfig."""
-        for task_id, (date, callback, args, kwargs) in self.tasks.items():
-            if task_id in self.to_save:
-                continue
-
-            if getattr(callback, "__self__", None):
-                # `callback` is an instance method
-                obj = callback.__self__
-                name = callback.__name__
-                callback = (obj, name)
+        """Save the tasks that are not yet stored in the database.
 
-            # Check if callback can be pickled. args and kwargs have been checked
-            safe_callback = None
+        Note:
+            Tasks are stored when added, so this is normally not needed.
 
-            try:
-                dbserialize(callback)
-            except (TypeError, AttributeError):
-                raise ValueError(
-                    "the specified callback {} cannot be pickled. "
-                    "It must be a top-level function in a module or an "
-                    "instance method.".format(callback)
+        """
+        stored = set(DelayedTask.objects.values_list("id", flat=True))
+        for task_id, (date, callback, args, kwargs) in self.tasks.items():
+            if task_id not in stored:
+                DelayedTask.objects.create(
+                    id=task_id,
+                    db_date=_db_date(date),
+                    db_value=self._serialize(date, callback, args, kwargs),
                 )
-            else:
-                safe_callback = callback
-
-            self.to_save[task_id] = dbserialize((date, safe_callback, args, kwargs))
-        ServerConfig.objects.conf("delayed_tasks", self.to_save)
 
     def add(self, timedelay, callback, *args, **kwargs):
         """Add a new persistent task in the configuration.
@@ -111,13 +149,8 @@ class TaskHandler(object):
             now = datetime.now()
             delta = timedelta(seconds=timedelay)
 
-            # Choose a free task_id
             safe_args = []
             safe_kwargs = {}
-            used_ids = list(self.tasks.keys())
-            task_id = 1
-            while task_id in used_ids:
-                task_id += 1
 
             # Check that args and kwargs contain picklable information
             for arg in args:
@@ -144,8 +177,13 @@ class TaskHandler(object):
                 else:
                     safe_kwargs[key] = value
 
-            self.tasks[task_id] = (now + delta, callback, safe_args, safe_kwargs)
-            self.save()
+            # the id of the stored row is the task_id
+            date = now + delta
+            task_id = DelayedTask.objects.create(
+                db_date=_db_date(date),
+                db_value=self._serialize(date, callback, safe_args, safe_kwargs),
+            ).id
+            self.tasks[task_id] = (date, callback, safe_args, safe_kwargs)
             callback = self.do_task
             args = [task_id]
             kwargs = {}
@@ -164,10 +202,7 @@ class TaskHandler(object):
 
         """
         del self.tasks[task_id]
-        if task_id in self.to_save:
-            del self.to_save[task_id]
-
-        self.save()
+        DelayedTask.objects.filter(id=task_id).delete()
 
     def do_task(self, task_id):
         """Execute the task (call its callback).
@@ -180,12 +215,28 @@ class TaskHandler(object):
 
         """
         date, callback, args, kwargs = self.tasks.pop(task_id)
-        if task_id in self.to_save:
-            del self.to_save[task_id]
-
-        self.save()
+        DelayedTask.objects.filter(id=task_id).delete()
         callback(*args, **kwargs)
 
+    def do_overdue_tasks(self, task_ids):
+        """Execute many tasks at once, removing them in one query.
+
+        Args:
+            task_ids (list): Valid task IDs, in the order to run them.
+
+        Note:
+            An error in one callback does not stop the others.
+
+        """
+        tasks = [self.tasks.pop(task_id) for task_id in task_ids if task_id in self.tasks]
+        for istart in range(0, len(task_ids), _BATCH_SIZE):
+            DelayedTask.objects.filter(id__in=task_ids[istart : istart + _BATCH_SIZE]).delete()
+        for date, callback, args, kwargs in tasks:
+            try:
+                callback(*args, **kwargs)
+            except Exception:
+                log_trace()
+
     def create_delays(self):
         """Create the delayed tasks for the persistent tasks.
 
@@ -194,9 +245,16 @@ class TaskHandler(object):
 
         """
         now = datetime.now()
-        for task_id, (date, callbac, args, kwargs) in self.tasks.items():
-            seconds = max(0, (date - now).total_seconds())
-            deferLater(reactor, seconds, self.do_task, task_id)
+        overdue = []
+        for task_id, (date, callback, args, kwargs) in self.tasks.items():
+            seconds = (date - now).total_seconds()
+            if seconds <= 0:
+                overdue.append(task_id)
+            else:
+                deferLater(reactor, seconds, self.do_task, task_id)
+        if overdue:
+            # run all tasks that came due while the server was down together
+            deferLater(reactor, 0, self.do_overdue_tasks, overdue)
 
 
 # Create the soft singleton
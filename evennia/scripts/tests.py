@@ -1,10 +1,18 @@
 # this is an optimized version only available in later Django versions
+import warnings
+from datetime import datetime, timedelta
 from unittest import TestCase
+from mock import patch
+from twisted.internet.task import Clock
 from evennia import DefaultScript
-from evennia.scripts.models import ScriptDB, ObjectDoesNotExist
+from evennia.scripts.models import DelayedTask, ScriptDB, ObjectDoesNotExist
 from evennia.utils.create import create_script
 from evennia.utils.test_resources import EvenniaTest
 from evennia.scripts.scripts import DoNothing
+from evennia.scripts.scheduler import ScriptScheduler, get_shared_typeclass_paths
+from evennia.scripts.taskhandler import TaskHandler
+from evennia.server.models import ServerConfig
+from evennia.utils.dbserialize import dbserialize
 
 
 class TestScript(EvenniaTest):
@@ -51,3 +59,128 @@ class TestScriptDB(TestCase):
         "Can deleted scripts be said to be valid?"
         self.scr.delete()
         self.assertFalse(self.scr.is_valid())  # assertRaises? See issue #509
+
+
+class SharedTimerScript(DefaultScript):
+    shared_timer = True
+
+    def at_repeat(self):
+        self.db.count = (self.db.count or 0) + 1
+
+
+class TestScriptScheduler(EvenniaTest):
+    def setUp(self):
+        super(TestScriptScheduler, self).setUp()
+        self.clock = Clock()
+        self.scheduler = ScriptScheduler(clock=self.clock)
+        patcher = patch("evennia.scripts.scheduler.SCRIPT_SCHEDULER", self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create(self, **kwargs):
+        return create_script(SharedTimerScript, key="shared", interval=10, **kwargs)
+
+    def test_repeat(self):
+        script = self._create()
+        self.assertIn(script.id, self.scheduler)
+        self.assertEqual(script.db.count, 1)
+        self.assertFalse(script.ndb._task)
+        self.clock.advance(4)
+        self.assertEqual(script.time_until_next_repeat(), 6)
+        self.clock.advance(6)
+        self.assertEqual(script.db.count, 2)
+        # one delayed call for all scripts
+        other = self._create(start_delay=True)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        script.force_repeat()
+        self.assertEqual(script.db.count, 3)
+        self.clock.advance(10)
+        self.assertEqual((script.db.count, other.db.count), (4, 1))
+        other.pause()
+        self.assertNotIn(other.id, self.scheduler)
+        other.unpause()
+        self.assertIn(other.id, self.scheduler)
+        other.stop()
+        self.assertNotIn(other.id, self.scheduler)
+
+    def test_repeats(self):
+        script = self._create(repeats=2)
+        self.assertEqual(script.remaining_repeats(), 1)
+        self.clock.advance(10)
+        self.assertNotIn(script.id, self.scheduler)
+        self.assertFalse(ScriptDB.objects.filter(id=script.id))
+        self.clock.advance(10)
+        self.assertFalse(self.clock.getDelayedCalls())
+
+    def test_flush(self):
+        script = self._create()
+        self.assertTrue(script.at_idmapper_flush())
+        ScriptDB.flush_cached_instance(script, force=True)
+        self.clock.advance(10)
+        self.assertEqual(ScriptDB.objects.get(id=script.id).db.count, 2)
+        ScriptDB.objects.get(id=script.id).delete()
+        self.clock.advance(10)
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_save_restore(self):
+        script = self._create()
+        self.clock.advance(4)
+        self.assertIn(script.typeclass_path, get_shared_typeclass_paths())
+        self.scheduler.save()
+        scheduler = ScriptScheduler(clock=self.clock)
+        self.assertEqual(scheduler.restore(), 1)
+        self.assertEqual(scheduler.next_call_time(script.id), 6)
+        self.assertEqual(scheduler.get_callcount(script.id), 1)
+        self.assertFalse(ServerConfig.objects.conf("script_scheduler"))
+
+
+def _set_value(obj, value):
+    obj.db.value = value
+
+
+@patch("evennia.scripts.taskhandler.deferLater")
+class TestTaskHandler(EvenniaTest):
+    def test_add_remove(self, mock_deferlater):
+        handler = TaskHandler()
+        with warnings.catch_warnings():
+            # storing a naive due date warns when USE_TZ is set
+            warnings.simplefilter("error", RuntimeWarning)
+            handler.add(10, _set_value, self.obj1, 1, persistent=True)
+            handler.add(5, _set_value, self.obj1, 2, persistent=True)
+        self.assertEqual(DelayedTask.objects.count(), 2)
+        task_id = mock_deferlater.call_args[0][3]
+        handler.remove(task_id)
+        self.assertEqual(DelayedTask.objects.count(), 1)
+        handler.do_task(list(handler.tasks)[0])
+        self.assertEqual(self.obj1.db.value, 1)
+        self.assertFalse(DelayedTask.objects.exists())
+
+    def test_load(self, mock_deferlater):
+        handler = TaskHandler()
+        handler.add(10, _set_value, self.obj1, 1, persistent=True)
+        handler.add(5, _set_value, self.obj2, 2, persistent=True)
+        ServerConfig.objects.conf(
+            "delayed_tasks",
+            {
+                1: dbserialize(
+                    (datetime.now() - timedelta(seconds=5), _set_value, [self.obj1], {"value": 3})
+                )
+            },
+        )
+        handler = TaskHandler()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            handler.load()
+        self.assertFalse(ServerConfig.objects.conf("delayed_tasks"))
+        # the tasks are loaded in the order they are due
+        dates = [task[0] for task in handler.tasks.values()]
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(len(dates), 3)
+        mock_deferlater.reset_mock()
+        handler.create_delays()
+        self.assertEqual(mock_deferlater.call_count, 3)
+        func, overdue = mock_deferlater.call_args[0][2:]
+        self.assertEqual(func, handler.do_overdue_tasks)
+        func(overdue)
+        self.assertEqual(self.obj1.db.value, 3)
+        self.assertEqual(DelayedTask.objects.count(), 2)
@@ -66,11 +66,13 @@ call the handler's `save()` and `restore()` methods when the server reboots.
 
 """
 import inspect
+import time
 
 from twisted.internet.defer import inlineCallbacks
 from django.core.exceptions import ObjectDoesNotExist
 from evennia.scripts.scripts import ExtendedLoopingCall
 from evennia.server.models import ServerConfig
+from evennia.server.profiling.metrics import METRICS
 from evennia.utils.logger import log_trace, log_err
 from evennia.utils.dbserialize import dbserialize, dbunserialize, pack_dbobj
 from evennia.utils import variable_from_module
@@ -78,6 +80,12 @@ from evennia.utils import variable_from_module
 _GA = object.__getattribute__
 _SA = object.__setattr__
 
+_TICK_DURATION = METRICS.histogram(
+    "evennia_ticker_duration_seconds",
+    "Time spent calling all subscribers of a ticker, per ticker interval.",
+    ("interval",),
+)
+
 
 _ERROR_ADD_TICKER = """TickerHandler: Tried to add an invalid ticker:
 {storekey}
@@ -111,6 +119,7 @@ class Ticker(object):
         self._to_add = []
         self._to_remove = []
         self._is_ticking = True
+        tstart = time.time()
         for store_key, (args, kwargs) in self.subscriptions.items():
             callback = yield kwargs.pop("_callback", "at_tick")
             obj = yield kwargs.pop("_obj", None)
@@ -135,6 +144,7 @@ class Ticker(object):
                 # make sure to re-store
                 kwargs["_callback"] = callback
                 kwargs["_obj"] = obj
+        _TICK_DURATION.observe(time.time() - tstart, interval=self.interval)
         # cleanup - we do this here to avoid changing the subscription dict while it loops
         self._is_ticking = False
         for store_key in self._to_remove:
@@ -6,8 +6,10 @@ Portal. This module sets up the Client-side communication.
 
 import os
 from evennia.server.portal import amp
+from twisted.application import internet
 from twisted.internet import protocol
 from evennia.utils import logger
+from evennia.server.profiling import tracing
 
 
 class AMPClientFactory(protocol.ReconnectingClientFactory):
@@ -38,6 +40,25 @@ class AMPClientFactory(protocol.ReconnectingClientFactory):
         # not really used unless connecting to multiple servers, but
         # avoids having to check for its existence on the protocol
         self.broadcasts = []
+        amp.register_queue_metric(self)
+
+    def make_service(self, host, port, unix_socket=None):
+        """
+        Create the service connecting this factory to the Portal.
+
+        Args:
+            host (str): The host of the Portal, for TCP.
+            port (int): The AMP port of the Portal, for TCP.
+            unix_socket (str, optional): Path of a Unix domain socket the
+                Portal listens on. If given, this is used instead of TCP.
+
+        Returns:
+            service (Service): The service, not yet started.
+
+        """
+        if unix_socket:
+            return internet.UNIXClient(unix_socket, self)
+        return internet.TCPClient(host, port, self)
 
     def startedConnecting(self, connector):
         """
@@ -133,7 +154,7 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
 
         """
         # print("server data_to_portal: {}, {}, {}".format(command, sessid, kwargs))
-        return self.callRemote(command, packed_data=amp.dumps((sessid, kwargs))).addErrback(
+        return self.callRemote(command, packed_data=self.pack_data((sessid, kwargs))).addErrback(
             self.errback, command.key
         )
 
@@ -147,6 +168,9 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
             kwargs (any, optiona): Extra data.
 
         """
+        trace_id = kwargs.get(tracing.TRACE_KEY)
+        if trace_id:
+            tracing.stamp(trace_id, "server.amp_send")
         return self.data_to_portal(amp.MsgServer2Portal, session.sessid, **kwargs)
 
     def send_AdminServer2Portal(self, session, operation="", **kwargs):
@@ -184,9 +208,20 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
 
         """
         sessid, kwargs = self.data_in(packed_data)
+        trace_id = kwargs.pop(tracing.TRACE_KEY, None)
+        if trace_id:
+            tracing.stamp(trace_id, "server.amp_receive")
         session = self.factory.server.sessions.get(sessid, None)
         if session:
-            self.factory.server.sessions.data_in(session, **kwargs)
+            if trace_id:
+                # output sent to the session while handling this input is part of the trace
+                tracing.set_active(session, trace_id)
+                try:
+                    self.factory.server.sessions.data_in(session, **kwargs)
+                finally:
+                    tracing.set_active(session, None)
+            else:
+                self.factory.server.sessions.data_in(session, **kwargs)
         return {}
 
     @amp.AdminPortal2Server.responder
@@ -1838,12 +1838,14 @@ def init_game_directory(path, check_db=True, need_gamedir=True):
             print(INFO_WINDOWS_BATFILE.format(twistd_path=twistd_path))
 
 
-def run_dummyrunner(number_of_dummies):
+def run_dummyrunner(number_of_dummies, extra_args=None):
     """
     Start an instance of the dummyrunner
 
     Args:
         number_of_dummies (int): The number of dummy accounts to start.
+        extra_args (list, optional): Extra command line arguments to pass on
+            to the dummyrunner, like `--seed` or `--scenario`.
 
     Notes:
         The dummy accounts' behavior can be customized by adding a
@@ -1856,6 +1858,8 @@ def run_dummyrunner(number_of_dummies):
     config_file = os.path.join(SETTINGS_PATH, "dummyrunner_settings.py")
     if os.path.exists(config_file):
         cmdstr.extend(["--config", config_file])
+    if extra_args:
+        cmdstr.extend(extra_args)
     try:
         call(cmdstr, env=getenv())
     except KeyboardInterrupt:
@@ -2065,7 +2069,8 @@ def main():
         action="store",
         dest="dummyrunner",
         metavar="<N>",
-        help="test a server by connecting <N> dummy accounts to it",
+        help="test a server by connecting <N> dummy accounts to it. Extra options "
+        "(--seed, --scenario, --duration, --output) are passed on to the dummyrunner",
     )
     parser.add_argument(
         "-v",
@@ -2181,7 +2186,7 @@ def main():
     if args.dummyrunner:
         # launch the dummy runner
         init_game_directory(CURRENT_DIR, check_db=True)
-        run_dummyrunner(args.dummyrunner[0])
+        run_dummyrunner(args.dummyrunner[0], extra_args=unknown_args)
     elif args.listsetting:
         # display all current server settings
         init_game_directory(CURRENT_DIR, check_db=False)
@@ -58,10 +58,11 @@ def text(session, *args, **kwargs):
         text (str): First arg is used as text-command input. Other
             arguments are ignored.
 
-    """
-    # from evennia.server.profiling.timetrace import timetrace
-    # text = timetrace(text, "ServerSession.data_in")
+    Returns:
+        deferred (Deferred or None): Fires when the command has finished
+            executing. `None` if no command was executed.
 
+    """
     txt = args[0] if args else None
 
     # explicitly check for None since text can be an empty string, which is
@@ -85,8 +86,9 @@ def text(session, *args, **kwargs):
                 txt, categories=("inputline", "channel"), include_account=False
             )
     kwargs.pop("options", None)
-    cmdhandler(session, txt, callertype="session", session=session, **kwargs)
+    deferred = cmdhandler(session, txt, callertype="session", session=session, **kwargs)
     session.update_session_counters()
+    return deferred
 
 
 def bot_data_in(session, *args, **kwargs):
@@ -6,19 +6,23 @@ This module acts as a central place for AMP-servers and -clients to get commands
 """
 
 from functools import wraps
+import os
+import socket
 import time
 from twisted.protocols import amp
 from collections import defaultdict, namedtuple
-from io import BytesIO
 from itertools import count
+import struct
 import zlib  # Used in Compressed class
 import pickle
 
 from twisted.internet.defer import DeferredList, Deferred
-from evennia.utils.utils import to_str, variable_from_module
+from evennia.utils.utils import class_from_module, to_str, variable_from_module
+from evennia.server.profiling.metrics import METRICS
 
 # delayed import
 _LOGGER = None
+_CODEC = None
 
 # communication bits
 # (chr(9) and chr(10) are \t and \n, so skipping them)
@@ -73,6 +77,16 @@ Content-Type: text/html
 )
 
 
+_AMP_MESSAGES = METRICS.counter(
+    "evennia_amp_messages_total", "Data messages sent and received over AMP.", ("direction",)
+)
+_AMP_BYTES = METRICS.counter(
+    "evennia_amp_bytes_total",
+    "Packed size of data messages sent and received over AMP (before compression).",
+    ("direction",),
+)
+
+
 # Helper functions for pickling.
 
 
@@ -84,6 +98,181 @@ def loads(data):
     return pickle.loads(data)
 
 
+# Codecs for the data messages between Portal and Server
+
+
+# first byte of messages packed on the text fast path (pickles start with b"\x80"),
+# for outgoing text with empty options and for incoming text
+_TEXT_TAG = b"\x01"
+_INPUT_TAG = b"\x02"
+# first byte of an uncompressed message chunk (zlib streams start with b"\x78")
+_RAW_TAG = b"\x00"
+_SESSID = struct.Struct("!I")
+
+
+def _loads_any(packed_data):
+    "Unpack data packed by any of the codecs"
+    tag = packed_data[:1]
+    if tag == _TEXT_TAG or tag == _INPUT_TAG:
+        return (
+            _SESSID.unpack_from(packed_data, 1)[0],
+            {
+                "text": [
+                    [str(packed_data[5:], "utf-8")],
+                    {"options": {}} if tag == _TEXT_TAG else {},
+                ]
+            },
+        )
+    return pickle.loads(packed_data)
+
+
+def _decompress_any(data):
+    "Decompress data compressed by any of the codecs"
+    if data[:1] == _RAW_TAG:
+        return data[1:]
+    return zlib.decompress(data)
+
+
+class PickleAMPCodec(object):
+    """
+    Packs data messages with pickle and compresses all of them with zlib.
+    This was the only codec before codecs were made pluggable. Set
+    `settings.AMP_CODEC` to the path of this or another codec class.
+
+    Whatever the codec, Portal and Server can read messages from all the
+    default codecs, so they don't need to be restarted together when
+    changing it.
+
+    """
+
+    compress_level = 9
+
+    def dumps(self, data):
+        """
+        Pack a message for sending.
+
+        Args:
+            data (any): The message, usually a tuple `(sessid, kwargs)`.
+
+        Returns:
+            packed_data (bytes): The packed message.
+
+        """
+        return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, packed_data):
+        """
+        Unpack a received message.
+
+        Args:
+            packed_data (bytes): The packed message.
+
+        Returns:
+            data (any): The message.
+
+        """
+        return _loads_any(packed_data)
+
+    def compress(self, data):
+        """
+        Compress a chunk of a packed message for the wire.
+
+        Args:
+            data (bytes or memoryview): Up to `AMP_MAXLEN` bytes of packed
+                message.
+
+        Returns:
+            compressed (bytes): The data to send.
+
+        """
+        return zlib.compress(data, self.compress_level)
+
+    def decompress(self, data):
+        """
+        Decompress a received chunk of a packed message.
+
+        Args:
+            data (bytes): The received data.
+
+        Returns:
+            decompressed (bytes): The chunk of packed message.
+
+        """
+        return _decompress_any(data)
+
+
+class FastAMPCodec(PickleAMPCodec):
+    """
+    The default codec. Plain text messages without options, the bulk of
+    the traffic both ways, are packed as just their session id and utf-8
+    encoded text. Everything else is pickled. Only chunks of at least
+    `compress_min` bytes are compressed, using a fast compression level;
+    for smaller chunks compression costs far more time than it saves
+    bytes on the wire.
+
+    """
+
+    compress_level = 1
+    compress_min = 1024
+
+    def dumps(self, data):
+        try:
+            sessid, kwargs = data
+            if len(kwargs) == 1:
+                args, dkwargs = kwargs["text"]
+                if len(args) == 1 and type(args[0]) is str:
+                    if not dkwargs:
+                        tag = _INPUT_TAG
+                    elif len(dkwargs) == 1 and dkwargs.get("options") == {}:
+                        tag = _TEXT_TAG
+                    else:
+                        tag = None
+                    if tag:
+                        return tag + _SESSID.pack(sessid) + args[0].encode("utf-8")
+        except (TypeError, ValueError, KeyError, AttributeError, struct.error):
+            pass
+        return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+    def compress(self, data):
+        if len(data) < self.compress_min:
+            return _RAW_TAG + data
+        return zlib.compress(data, self.compress_level)
+
+
+def get_codec():
+    """
+    Get the codec for data messages, set by `settings.AMP_CODEC`.
+
+    Returns:
+        codec (PickleAMPCodec): The codec instance.
+
+    """
+    global _CODEC
+    if not _CODEC:
+        from django.conf import settings
+
+        _CODEC = class_from_module(settings.AMP_CODEC)()
+    return _CODEC
+
+
+def get_unix_socket():
+    """
+    Get the Unix socket to use between Portal and Server, set by
+    `settings.AMP_UNIX_SOCKET`.
+
+    Returns:
+        path (str or None): The absolute path of the socket, or None if
+            TCP should be used.
+
+    """
+    from django.conf import settings
+
+    path = settings.AMP_UNIX_SOCKET
+    if not path or not hasattr(socket, "AF_UNIX"):
+        return None
+    return os.path.join(settings.GAME_DIR, path)
+
+
 def _get_logger():
     "Delay import of logger until absolutely necessary"
     global _LOGGER
@@ -96,9 +285,10 @@ def _get_logger():
 def catch_traceback(func):
     "Helper decorator"
 
+    @wraps(func)
     def decorator(*args, **kwargs):
         try:
-            func(*args, **kwargs)
+            return func(*args, **kwargs)
         except Exception as err:
             _get_logger().log_trace()
             raise  # make sure the error is visible on the other side of the connection too
@@ -107,6 +297,22 @@ def catch_traceback(func):
     return decorator
 
 
+def register_queue_metric(factory):
+    """
+    Add a metric for how many AMP requests are waiting for an answer.
+
+    Args:
+        factory (Factory): The AMP factory, tracking its connections
+            in `factory.broadcasts`.
+
+    """
+    METRICS.gauge(
+        "evennia_amp_queue_depth",
+        "AMP requests sent and still waiting for an answer.",
+        func=lambda: sum(len(protcl._outstandingRequests) for protcl in factory.broadcasts),
+    )
+
+
 # AMP Communication Command types
 
 
@@ -125,16 +331,17 @@ class Compressed(amp.String):
         put it back together here.
 
         """
-
-        value = BytesIO()
-        value.write(self.fromStringProto(strings.get(name), proto))
-        for counter in count(2):
-            # count from 2 upwards
-            chunk = strings.get(b"%s.%d" % (name, counter))
-            if chunk is None:
-                break
-            value.write(self.fromStringProto(chunk, proto))
-        objects[str(name, "utf-8")] = value.getvalue()
+        value = self.fromStringProto(strings.get(name), proto)
+        if b"%s.2" % name in strings:
+            chunks = [value]
+            for counter in count(2):
+                # count from 2 upwards
+                chunk = strings.get(b"%s.%d" % (name, counter))
+                if chunk is None:
+                    break
+                chunks.append(self.fromStringProto(chunk, proto))
+            value = b"".join(chunks)
+        objects[str(name, "utf-8")] = value
 
     def toBox(self, name, strings, objects, proto):
         """
@@ -142,19 +349,18 @@ class Compressed(amp.String):
         we break up too-long data snippets into multiple batches here.
 
         """
-
-        # print("toBox: name={}, strings={}, objects={}, proto{}".format(name, strings, objects, proto))
-
-        value = BytesIO(objects[str(name, "utf-8")])
-        strings[name] = self.toStringProto(value.read(AMP_MAXLEN), proto)
-
-        # print("toBox strings[name] = {}".format(strings[name]))
-
-        for counter in count(2):
-            chunk = value.read(AMP_MAXLEN)
-            if not chunk:
-                break
-            strings[b"%s.%d" % (name, counter)] = self.toStringProto(chunk, proto)
+        value = objects[str(name, "utf-8")]
+        if len(value) <= AMP_MAXLEN:
+            # the common case, sent without copying
+            strings[name] = self.toStringProto(value, proto)
+            return
+
+        value = memoryview(value)
+        strings[name] = self.toStringProto(value[:AMP_MAXLEN], proto)
+        for counter, istart in enumerate(range(AMP_MAXLEN, len(value), AMP_MAXLEN), 2):
+            strings[b"%s.%d" % (name, counter)] = self.toStringProto(
+                value[istart : istart + AMP_MAXLEN], proto
+            )
 
     def toString(self, inObject):
         """
@@ -163,14 +369,14 @@ class Compressed(amp.String):
         Note: In Py3 this is really a byte stream.
 
         """
-        return zlib.compress(super(Compressed, self).toString(inObject), 9)
+        return get_codec().compress(inObject)
 
     def fromString(self, inString):
         """
         Convert (decompress) from the string-representation on the wire to Python.
 
         """
-        return super(Compressed, self).fromString(zlib.decompress(inString))
+        return get_codec().decompress(inString)
 
 
 class MsgLauncher2Portal(amp.Command):
@@ -262,8 +468,8 @@ class FunctionCall(amp.Command):
 
     key = "FunctionCall"
     arguments = [
-        (b"module", amp.String()),
-        (b"function", amp.String()),
+        (b"module", amp.Unicode()),
+        (b"function", amp.Unicode()),
         (b"args", amp.String()),
         (b"kwargs", amp.String()),
     ]
@@ -345,6 +551,13 @@ class AMPMultiConnectionProtocol(amp.AMP):
             amp.AMP.__init__(self)
         self._transportPeer = transport.getPeer()
         self._transportHost = transport.getHost()
+        if hasattr(transport, "setTcpNoDelay"):
+            # don't hold back small boxes waiting for the ack of earlier ones
+            try:
+                transport.setTcpNoDelay(True)
+            except OSError:
+                # not supported by all platforms; only costs some latency
+                pass
         amp.BinaryBoxProtocol.makeConnection(self, transport)
 
     def connectionMade(self):
@@ -395,14 +608,31 @@ class AMPMultiConnectionProtocol(amp.AMP):
         Process incoming packed data.
 
         Args:
-            packed_data (bytes): Pickled data.
+            packed_data (bytes): Data packed by the codec.
         Returns:
-            unpaced_data (any): Unpickled package
+            unpaced_data (any): Unpacked package
 
         """
-        msg = loads(packed_data)
+        _AMP_MESSAGES.inc(direction="in")
+        _AMP_BYTES.inc(len(packed_data), direction="in")
+        msg = get_codec().loads(packed_data)
         return msg
 
+    def pack_data(self, data):
+        """
+        Pack outgoing data.
+
+        Args:
+            data (any): Data to pack with the codec (`settings.AMP_CODEC`).
+        Returns:
+            packed_data (bytes): Packed data.
+
+        """
+        packed_data = get_codec().dumps(data)
+        _AMP_MESSAGES.inc(direction="out")
+        _AMP_BYTES.inc(len(packed_data), direction="out")
+        return packed_data
+
     def broadcast(self, command, sessid, **kwargs):
         """
         Send data across the wire to all connections.
@@ -461,26 +691,23 @@ class AMPMultiConnectionProtocol(amp.AMP):
 
     @FunctionCall.responder
     @catch_traceback
-    def receive_functioncall(self, module, function, func_args, func_kwargs):
+    def receive_functioncall(self, module, function, args, kwargs):
         """
         This allows Portal- and Server-process to call an arbitrary
         function in the other process. It is intended for use by
         plugin modules.
 
         Args:
-            module (str or module): The module containing the
+            module (str): The python path of the module containing the
                 `function` to call.
             function (str): The name of the function to call in
                 `module`.
-            func_args (str): Pickled args tuple for use in `function` call.
-            func_kwargs (str): Pickled kwargs dict for use in `function` call.
+            args (bytes): Pickled args tuple for use in `function` call.
+            kwargs (bytes): Pickled kwargs dict for use in `function` call.
 
         """
-        args = loads(func_args)
-        kwargs = loads(func_kwargs)
-
         # call the function (don't catch tracebacks here)
-        result = variable_from_module(module, function)(*args, **kwargs)
+        result = variable_from_module(module, function)(*loads(args), **loads(kwargs))
 
         if isinstance(result, Deferred):
             # if result is a deferred, attach handler to properly
@@ -6,11 +6,13 @@ these are the Evennia Server and the evennia launcher).
 """
 import os
 import sys
+from twisted.application import internet
 from twisted.internet import protocol
 from evennia.server.portal import amp
 from django.conf import settings
 from subprocess import Popen, STDOUT
 from evennia.utils import logger
+from evennia.server.profiling import tracing
 
 
 def _is_windows():
@@ -58,11 +60,33 @@ class AMPServerFactory(protocol.ServerFactory):
         self.portal = portal
         self.protocol = AMPServerProtocol
         self.broadcasts = []
+        amp.register_queue_metric(self)
         self.server_connection = None
         self.launcher_connection = None
         self.disconnect_callbacks = {}
         self.server_connect_callbacks = []
 
+    def make_services(self, port, interface, unix_socket=None):
+        """
+        Create the services listening for AMP connections to this factory.
+
+        Args:
+            port (int): The TCP port to listen on.
+            interface (str): The interface to listen on for TCP.
+            unix_socket (str, optional): Path of a Unix domain socket to
+                also listen on, for the Server to connect to. The launcher
+                always uses TCP.
+
+        Returns:
+            services (list): The services, not yet started.
+
+        """
+        services = [internet.TCPServer(port, self, interface=interface)]
+        if unix_socket:
+            # wantPID removes the socket file left by a crashed Portal
+            services.append(internet.UNIXServer(unix_socket, self, mode=0o600, wantPID=True))
+        return services
+
     def buildProtocol(self, addr):
         """
         Start a new connection, and store it on the service object.
@@ -141,13 +165,14 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
 
         """
         # print("portal data_to_server: {}, {}, {}".format(command, sessid, kwargs))
+        packed_data = self.pack_data((sessid, kwargs))
         if self.factory.server_connection:
             return self.factory.server_connection.callRemote(
-                command, packed_data=amp.dumps((sessid, kwargs))
+                command, packed_data=packed_data
             ).addErrback(self.errback, command.key)
         else:
             # if no server connection is available, broadcast
-            return self.broadcast(command, sessid, packed_data=amp.dumps((sessid, kwargs)))
+            return self.broadcast(command, sessid, packed_data=packed_data)
 
     def start_server(self, server_twistd_cmd):
         """
@@ -256,6 +281,9 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             deferred (Deferred): Asynchronous return.
 
         """
+        trace_id = kwargs.get(tracing.TRACE_KEY)
+        if trace_id:
+            tracing.stamp(trace_id, "portal.amp_send")
         return self.data_to_server(amp.MsgPortal2Server, session.sessid, **kwargs)
 
     def send_AdminPortal2Server(self, session, operation="", **kwargs):
@@ -373,6 +401,9 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         """
         try:
             sessid, kwargs = self.data_in(packed_data)
+            trace_id = kwargs.get(tracing.TRACE_KEY)
+            if trace_id:
+                tracing.stamp(trace_id, "portal.amp_receive")
             session = self.factory.portal.sessions.get(sessid, None)
             if session:
                 self.factory.portal.sessions.data_out(session, **kwargs)
@@ -15,6 +15,7 @@ from os.path import dirname, abspath
 from twisted.application import internet, service
 from twisted.internet import protocol, reactor
 from twisted.python.log import ILogObserver
+from twisted.web import resource
 
 import django
 
@@ -29,6 +30,7 @@ from evennia.utils.utils import get_evennia_version, mod_import, make_iter
 from evennia.server.portal.portalsessionhandler import PORTAL_SESSIONS
 from evennia.utils import logger
 from evennia.server.webserver import EvenniaReverseProxyResource
+from evennia.server.profiling.metrics import ReactorLagMonitor
 from django.db import connection
 
 
@@ -65,6 +67,7 @@ SSH_INTERFACES = ["127.0.0.1"] if LOCKDOWN_MODE else settings.SSH_INTERFACES
 WEBSERVER_INTERFACES = ["127.0.0.1"] if LOCKDOWN_MODE else settings.WEBSERVER_INTERFACES
 WEBSOCKET_CLIENT_INTERFACE = "127.0.0.1" if LOCKDOWN_MODE else settings.WEBSOCKET_CLIENT_INTERFACE
 WEBSOCKET_CLIENT_URL = settings.WEBSOCKET_CLIENT_URL
+WEBSOCKET_CLIENT_DEFLATE = settings.WEBSOCKET_CLIENT_DEFLATE
 
 TELNET_ENABLED = settings.TELNET_ENABLED and TELNET_PORTS and TELNET_INTERFACES
 SSL_ENABLED = settings.SSL_ENABLED and SSL_PORTS and SSL_INTERFACES
@@ -233,6 +236,9 @@ if "--nodaemon" not in sys.argv:
 # and is where we store all the other services.
 PORTAL = Portal(application)
 
+# measure how responsive the reactor is, for the runtime metrics
+PORTAL.services.addService(ReactorLagMonitor())
+
 if LOCKDOWN_MODE:
 
     INFO_DICT["lockdown_mode"] = "  LOCKDOWN_MODE active: Only local connections."
@@ -243,14 +249,19 @@ if AMP_ENABLED:
     # the portal and the mud server. Only reason to ever deactivate
     # it would be during testing and debugging.
 
-    from evennia.server.portal import amp_server
+    from evennia.server.portal import amp, amp_server
 
+    unix_socket = amp.get_unix_socket()
     INFO_DICT["amp"] = "amp: %s" % AMP_PORT
+    if unix_socket:
+        INFO_DICT["amp"] += ", %s" % unix_socket
 
     factory = amp_server.AMPServerFactory(PORTAL)
-    amp_service = internet.TCPServer(AMP_PORT, factory, interface=AMP_INTERFACE)
-    amp_service.setName("PortalAMPServer")
-    PORTAL.services.addService(amp_service)
+    for iservice, amp_service in enumerate(
+        factory.make_services(AMP_PORT, AMP_INTERFACE, unix_socket=unix_socket)
+    ):
+        amp_service.setName("PortalAMPServer%s" % (iservice or ""))
+        PORTAL.services.addService(amp_service)
 
 
 # We group all the various services under the same twisted app.
@@ -351,6 +362,8 @@ if WEBSERVER_ENABLED:
             ifacestr = "-%s" % interface
         for proxyport, serverport in WEBSERVER_PORTS:
             web_root = EvenniaReverseProxyResource("127.0.0.1", serverport, "")
+            # the Server's /metrics are only for local access, don't relay them
+            web_root.putChild(b"metrics", resource.ForbiddenResource())
             webclientstr = ""
             if WEBCLIENT_ENABLED:
                 # create ajax client processes at /webclientdata
@@ -381,6 +394,10 @@ if WEBSERVER_ENABLED:
                     factory.noisy = False
                     factory.protocol = webclient.WebSocketClient
                     factory.sessionhandler = PORTAL_SESSIONS
+                    if WEBSOCKET_CLIENT_DEFLATE:
+                        factory.setProtocolOptions(
+                            perMessageCompressionAccept=webclient.accept_deflate
+                        )
                     websocket_service = internet.TCPServer(port, factory, interface=w_interface)
                     websocket_service.setName("EvenniaWebSocket%s:%s" % (w_ifacestr, port))
                     PORTAL.services.addService(websocket_service)
@@ -5,10 +5,14 @@ Sessionhandler for portal sessions
 
 import time
 from collections import deque, namedtuple
+from zope.interface import implementer
 from twisted.internet import reactor
+from twisted.internet.interfaces import IPushProducer
 from django.conf import settings
 from evennia.server.sessionhandler import SessionHandler, PCONN, PDISCONN, PCONNSYNC, PDISCONNALL
-from evennia.utils.logger import log_trace
+from evennia.server.profiling import tracing
+from evennia.server.profiling.metrics import METRICS
+from evennia.utils.logger import log_trace, log_info
 
 # module import
 _MOD_IMPORT = None
@@ -25,10 +29,161 @@ _MIN_TIME_BETWEEN_COMMANDS = 1.0 / float(_MAX_COMMAND_RATE)
 _ERROR_COMMAND_OVERFLOW = settings.COMMAND_RATE_WARNING
 _ERROR_MAX_CHAR = settings.MAX_CHAR_LIMIT_WARNING
 
+# per-session output queues
+_OUTPUT_QUEUE_SIZE = int(settings.PORTAL_OUTPUT_QUEUE_SIZE)
+_OUTPUT_QUEUE_OVERFLOW = settings.PORTAL_OUTPUT_QUEUE_OVERFLOW
+_ERROR_OUTPUT_OVERFLOW = "Your client is not reading the game output fast enough."
+
+_OUTPUT_DROPPED = METRICS.counter(
+    "evennia_portal_output_dropped_total",
+    "Messages dropped from full session output queues.",
+    ("cmdname",),
+)
+_OUTPUT_DISCONNECTS = METRICS.counter(
+    "evennia_portal_output_disconnects_total",
+    "Sessions disconnected because their output queue was full.",
+)
+
 _CONNECTION_QUEUE = deque()
 
 DUMMYSESSION = namedtuple("DummySession", ["sessid"])(0)
 
+
+@implementer(IPushProducer)
+class OutputQueue(object):
+    """
+    Holds back the output to a session while its client does not read it
+    fast enough. This is registered as a producer with the session's
+    transport, which pauses it when its write buffer fills up and resumes
+    it when the buffer has been written to the client.
+
+    """
+
+    def __init__(self, sessionhandler, session):
+        """
+        Args:
+            sessionhandler (PortalSessionHandler): The handler sending the output.
+            session (PortalSession): The session to queue output for.
+
+        """
+        self.sessionhandler = sessionhandler
+        self.session = session
+        self.paused = False
+        self.stopped = False
+        # (cmdname, cmdargs, cmdkwargs, size)
+        self.items = deque()
+        self.size = 0
+        # prompts are not queued, only the latest one is sent after the rest
+        self.prompt = None
+
+    @property
+    def holding(self):
+        """
+        If output must go through the queue to keep its order.
+
+        """
+        return self.paused or self.items or self.prompt
+
+    def pauseProducing(self):
+        self.paused = True
+
+    def resumeProducing(self):
+        self.paused = False
+        while self.items and not self.paused:
+            cmdname, cmdargs, cmdkwargs, size = self.items.popleft()
+            self.size -= size
+            self.sessionhandler.send(self.session, cmdname, cmdargs, cmdkwargs)
+        if self.prompt and not self.paused:
+            prompt, self.prompt = self.prompt, None
+            self.sessionhandler.send(self.session, *prompt)
+        if not self.holding and getattr(self.session.transport, "disconnecting", False):
+            # closed by the protocol itself; the transport only finishes
+            # closing once we are unregistered
+            self.release(flush=False)
+
+    def stopProducing(self):
+        # the connection is closing
+        self.paused = self.stopped = True
+        self.items.clear()
+        self.size = 0
+        self.prompt = None
+
+    def release(self, flush=True):
+        """
+        Stop holding back output, since the session is disconnecting. The
+        queue is unregistered from the transport, which otherwise never
+        finishes closing the connection while the queue is paused.
+
+        Args:
+            flush (bool, optional): Pass the held back output on to the
+                transport first, to be sent before the connection closes.
+
+        """
+        items, prompt = list(self.items), self.prompt
+        self.stopProducing()
+        if flush:
+            for cmdname, cmdargs, cmdkwargs, _ in items:
+                self.sessionhandler.send(self.session, cmdname, cmdargs, cmdkwargs)
+            if prompt:
+                self.sessionhandler.send(self.session, *prompt)
+        transport = self.session.transport
+        if getattr(transport, "producer", None) is self:
+            transport.unregisterProducer()
+
+    def _drop(self, keep):
+        """
+        Drop queued messages other than those with `cmdname` in `keep`.
+
+        """
+        items = deque()
+        for item in self.items:
+            if item[0] in keep:
+                items.append(item)
+            else:
+                self.size -= item[3]
+                _OUTPUT_DROPPED.inc(cmdname=item[0])
+        self.items = items
+
+    def put(self, cmdname, cmdargs, cmdkwargs):
+        """
+        Queue a message, applying the overflow policy if the queue is full.
+
+        Args:
+            cmdname (str): Name of the send-instruction, like "text".
+            cmdargs (list): Its arguments.
+            cmdkwargs (dict): Its keyword arguments.
+
+        Returns:
+            queued (bool): If the message was queued or dropped. False means
+                the session was disconnected.
+
+        """
+        if self.stopped:
+            return True
+        if cmdname.strip().lower() == "prompt":
+            self.prompt = (cmdname, cmdargs, cmdkwargs)
+            return True
+        size = sum(len(arg) if isinstance(arg, str) else len(str(arg)) for arg in cmdargs)
+        if self.size + size > _OUTPUT_QUEUE_SIZE:
+            # drop low-priority OOB messages first
+            self._drop(("text",))
+            if cmdname != "text":
+                _OUTPUT_DROPPED.inc(cmdname=cmdname)
+                return True
+        if self.size + size > _OUTPUT_QUEUE_SIZE:
+            if _OUTPUT_QUEUE_OVERFLOW == "drop":
+                while self.items and self.size + size > _OUTPUT_QUEUE_SIZE:
+                    item = self.items.popleft()
+                    self.size -= item[3]
+                    _OUTPUT_DROPPED.inc(cmdname=item[0])
+            else:
+                self.sessionhandler.overflow_disconnect(self.session)
+                return False
+        self.items.append((cmdname, cmdargs, cmdkwargs, size))
+        self.size += size
+        return True
+
+
 # -------------------------------------------------------------
 # Portal-SessionHandler class
 # -------------------------------------------------------------
@@ -213,6 +368,7 @@ class PortalSessionHandler(SessionHandler):
             # sessions while we are looping over them.
             sessionhandler._disconnect_all = True
             for session in sessionhandler.values():
+                sessionhandler.release_output_queue(session)
                 session.disconnect()
             del sessionhandler._disconnect_all
 
@@ -264,6 +420,7 @@ class PortalSessionHandler(SessionHandler):
 
         """
         if session:
+            self.release_output_queue(session)
             session.disconnect(reason)
             if session.sessid in self:
                 # in case sess.disconnect doesn't delete it
@@ -279,6 +436,7 @@ class PortalSessionHandler(SessionHandler):
 
         """
         for session in list(self.values()):
+            self.release_output_queue(session)
             session.disconnect(reason)
             del session
         self.clear()
@@ -418,8 +576,14 @@ class PortalSessionHandler(SessionHandler):
                 reactor.callLater(1.0, self.data_in, session, **kwargs)
                 return
 
+            trace_id = tracing.start_trace()
+            if trace_id:
+                tracing.stamp(trace_id, "portal.data_in")
+
             # scrub data
             kwargs = self.clean_senddata(session, kwargs)
+            if trace_id:
+                kwargs[tracing.TRACE_KEY] = trace_id
 
             # relay data to Server
             session.cmd_last = now
@@ -440,27 +604,136 @@ class PortalSessionHandler(SessionHandler):
             method exixts, it sends the data to a method send_default.
 
         """
-        # from evennia.server.profiling.timetrace import timetrace  # DEBUG
-        # text = timetrace(text, "portalsessionhandler.data_out")  # DEBUG
+        trace_id = kwargs.pop(tracing.TRACE_KEY, None)
 
         # distribute outgoing data to the correct session methods.
         if session:
+            queue = self.get_output_queue(session)
             for cmdname, (cmdargs, cmdkwargs) in kwargs.items():
-                funcname = "send_%s" % cmdname.strip().lower()
-                if hasattr(session, funcname):
-                    # better to use hassattr here over try..except
-                    # - avoids hiding AttributeErrors in the call.
-                    try:
-                        getattr(session, funcname)(*cmdargs, **cmdkwargs)
-                    except Exception:
-                        log_trace()
+                if queue and queue.holding:
+                    # the client is not keeping up; hold back the output
+                    if not queue.put(cmdname, cmdargs, cmdkwargs):
+                        break
                 else:
-                    try:
-                        # note that send_default always takes cmdname
-                        # as arg too.
-                        session.send_default(cmdname, *cmdargs, **cmdkwargs)
-                    except Exception:
-                        log_trace()
+                    self.send(session, cmdname, cmdargs, cmdkwargs)
+            if trace_id:
+                tracing.stamp(trace_id, "portal.protocol_write")
+
+    def send(self, session, cmdname, cmdargs, cmdkwargs):
+        """
+        Send a single instruction to a session protocol, calling its
+        method send_<cmdname>, or send_default if no such method exists.
+
+        Args:
+            session (Session): Session to send to.
+            cmdname (str): Name of the send-instruction, like "text".
+            cmdargs (list): Its arguments.
+            cmdkwargs (dict): Its keyword arguments.
+
+        """
+        funcname = "send_%s" % cmdname.strip().lower()
+        if hasattr(session, funcname):
+            # better to use hassattr here over try..except
+            # - avoids hiding AttributeErrors in the call.
+            try:
+                getattr(session, funcname)(*cmdargs, **cmdkwargs)
+            except Exception:
+                log_trace()
+        else:
+            try:
+                # note that send_default always takes cmdname
+                # as arg too.
+                session.send_default(cmdname, *cmdargs, **cmdkwargs)
+            except Exception:
+                log_trace()
+
+    def get_output_queue(self, session):
+        """
+        Get the output queue of a session, creating it on first use.
+
+        Args:
+            session (Session): The session.
+
+        Returns:
+            queue (OutputQueue or None): The queue, or None if queueing is off
+                or the session's transport does not accept producers (such as
+                for the AJAX webclient, which buffers its own output).
+
+        """
+        try:
+            return session.output_queue
+        except AttributeError:
+            queue = None
+            transport = getattr(session, "transport", None)
+            if _OUTPUT_QUEUE_SIZE > 0 and hasattr(transport, "registerProducer"):
+                queue = OutputQueue(self, session)
+                try:
+                    transport.registerProducer(queue, True)
+                except Exception:
+                    # another producer is already registered
+                    queue = None
+            session.output_queue = queue
+            return queue
+
+    def release_output_queue(self, session, flush=True):
+        """
+        Release the output queue of a session about to be disconnected, so
+        its connection can close.
+
+        Args:
+            session (Session): The session.
+            flush (bool, optional): Send the held back output before the
+                connection closes.
+
+        """
+        queue = getattr(session, "output_queue", None)
+        if queue:
+            queue.release(flush=flush)
+
+    def get_output_queue_sizes(self):
+        """
+        Get the sizes of the sessions' non-empty output queues.
+
+        Returns:
+            sizes (dict): `{sessid: size}`, with `size` the approximate
+                size in bytes of the queued output.
+
+        """
+        return dict(
+            (sessid, session.output_queue.size)
+            for sessid, session in self.items()
+            if getattr(session, "output_queue", None) and session.output_queue.size
+        )
+
+    def overflow_disconnect(self, session):
+        """
+        Disconnect a session whose client does not read its output
+        fast enough.
+
+        Args:
+            session (Session): The session to disconnect.
+
+        """
+        _OUTPUT_DISCONNECTS.inc()
+        log_info(
+            "Portal: disconnecting session %s (%s) with a full output queue."
+            % (session.sessid, session.address)
+        )
+        self.release_output_queue(session, flush=False)
+        session.disconnect(_ERROR_OUTPUT_OVERFLOW)
+        transport = getattr(session, "transport", None)
+        if hasattr(transport, "abortConnection"):
+            # don't wait for the client to read what's already buffered
+            transport.abortConnection()
 
 
 PORTAL_SESSIONS = PortalSessionHandler()
+
+METRICS.gauge(
+    "evennia_portal_output_queue_bytes",
+    "Approximate size of the output held back for slow clients, by session.",
+    ("sessid",),
+    func=lambda: dict(
+        ((sessid,), size) for sessid, size in PORTAL_SESSIONS.get_output_queue_sizes().items()
+    ),
+)
@@ -359,9 +359,6 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
             kwargs (any): Options from the protocol.
 
         """
-        # from evennia.server.profiling.timetrace import timetrace  # DEBUG
-        # text = timetrace(text, "telnet.data_in")  # DEBUG
-
         self.sessionhandler.data_in(self, **kwargs)
 
     def data_out(self, **kwargs):
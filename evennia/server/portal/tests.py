@@ -15,8 +15,12 @@ import pickle
 from mock import Mock, MagicMock
 from evennia.server.portal import irc
 
+from autobahn.websocket.compress import PerMessageDeflateOffer
 from twisted.conch.telnet import IAC, WILL, DONT, SB, SE, NAWS, DO
+from twisted.internet import abstract, main
+from twisted.internet.task import Clock
 from twisted.test import proto_helpers
+from twisted.web import server
 from twisted.trial.unittest import TestCase as TwistedTestCase
 
 from .telnet import TelnetServerFactory, TelnetProtocol
@@ -29,8 +33,13 @@ from .mssp import MSSP
 from .mxp import MXP
 from .telnet_oob import MSDP, MSDP_VAL, MSDP_VAR
 
+from . import amp
 from .amp import AMPMultiConnectionProtocol, MsgServer2Portal, MsgPortal2Server, AMP_MAXLEN
 from .amp_server import AMPServerFactory
+from .portalsessionhandler import PortalSessionHandler
+from . import webclient
+from .webclient import WebSocketClient
+from .webclient_ajax import AjaxWebClient
 
 
 class TestAMPServer(TwistedTestCase):
@@ -46,6 +55,10 @@ class TestAMPServer(TwistedTestCase):
         self.transport = MagicMock()  # proto_helpers.StringTransport()
         self.transport.client = ["localhost"]
         self.transport.write = MagicMock()
+        # the wire data below is that of the pickle codec
+        patcher = mock.patch("evennia.server.portal.amp._CODEC", amp.PickleAMPCodec())
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_amp_out(self):
         self.proto.makeConnection(self.transport)
@@ -144,6 +157,50 @@ class TestAMPServer(TwistedTestCase):
             )
 
 
+class TestAMPCodec(TestCase):
+    def _wire(self, codec, data):
+        "Send data through codec and the AMP box format"
+        argument = amp.Compressed()
+        strings, objects = {}, {}
+        with mock.patch("evennia.server.portal.amp._CODEC", codec):
+            argument.toBox(b"packed_data", strings, {"packed_data": codec.dumps(data)}, None)
+            argument.fromBox(b"packed_data", strings, objects, None)
+            return strings, codec.loads(objects["packed_data"])
+
+    def test_fast(self):
+        codec = amp.FastAMPCodec()
+        text = (3, {"text": [["Hello wörld"], {"options": {}}]})
+        inp = (3, {"text": [["look"], {}]})
+        other = (3, {"text": [["Hello"], {"options": {"raw": True}}]})
+        self.assertEqual(codec.dumps(text), b"\x01\x00\x00\x00\x03Hello w\xc3\xb6rld")
+        self.assertEqual(codec.dumps(inp), b"\x02\x00\x00\x00\x03look")
+        self.assertEqual(codec.dumps(other)[:1], b"\x80")
+        for data in (text, inp, other, (3, {"text": [["a", "b"], {}]}), (4, {})):
+            strings, result = self._wire(codec, data)
+            self.assertEqual(result, data)
+        # small messages are sent uncompressed, in one chunk
+        self.assertEqual(list(strings), [b"packed_data"])
+        self.assertEqual(strings[b"packed_data"][:1], b"\x00")
+
+    def test_large(self):
+        data = (1, {"text": [["test" * AMP_MAXLEN], {"options": {}}]})
+        for codec in (amp.FastAMPCodec(), amp.PickleAMPCodec()):
+            strings, result = self._wire(codec, data)
+            self.assertEqual(result, data)
+            self.assertEqual(len(strings), 5)
+
+    def test_mixed(self):
+        "Each codec reads what the others send"
+        data = (1, {"text": [["look"], {}]})
+        packed = amp.FastAMPCodec().dumps(data)
+        compressed = amp.FastAMPCodec().compress(packed)
+        codec = amp.PickleAMPCodec()
+        self.assertEqual(codec.loads(codec.decompress(compressed)), data)
+        packed = codec.dumps(data)
+        compressed = codec.compress(packed)
+        self.assertEqual(amp.FastAMPCodec().loads(amp.FastAMPCodec().decompress(compressed)), data)
+
+
 class TestIRC(TestCase):
     def test_plain_ansi(self):
         """
@@ -269,3 +326,173 @@ class TestTelnet(TwistedTestCase):
         self.proto.nop_keep_alive.stop()
         self.proto._handshake_delay.cancel()
         return d
+
+
+class _QueueSession(object):
+    sessid = 1
+    address = "localhost"
+
+    def __init__(self):
+        self.transport = proto_helpers.StringTransport()
+        self.send_text = Mock()
+        self.send_prompt = Mock()
+        self.send_default = Mock()
+        self.disconnect = Mock()
+
+
+class TestOutputQueue(TestCase):
+    def setUp(self):
+        self.handler = PortalSessionHandler()
+        self.session = _QueueSession()
+        self.handler[self.session.sessid] = self.session
+
+    def test_queue(self):
+        session = self.session
+        self.handler.data_out(session, text=[["a"], {}])
+        session.send_text.assert_called_with("a")
+        queue = session.output_queue
+        self.assertEqual(session.transport.producer, queue)
+        # the transport's buffer is full
+        queue.pauseProducing()
+        self.handler.data_out(session, text=[["b"], {}], prompt=[["HP 1"], {}])
+        self.handler.data_out(session, foo=[[1], {}], prompt=[["HP 2"], {}])
+        self.assertEqual(session.send_text.call_count, 1)
+        self.assertEqual([item[0] for item in queue.items], ["text", "foo"])
+        self.assertEqual(self.handler.get_output_queue_sizes(), {1: 2})
+        queue.resumeProducing()
+        session.send_text.assert_called_with("b")
+        session.send_default.assert_called_with("foo", 1)
+        # prompts were collapsed
+        session.send_prompt.assert_called_once_with("HP 2")
+        self.assertEqual(self.handler.get_output_queue_sizes(), {})
+
+    @mock.patch("evennia.server.portal.portalsessionhandler._OUTPUT_QUEUE_SIZE", 10)
+    def test_overflow(self):
+        session = self.session
+        queue = self.handler.get_output_queue(session)
+        queue.pauseProducing()
+        self.handler.data_out(session, text=[["12345678"], {}], foo=[["x"], {}])
+        self.assertEqual(queue.size, 9)
+        # OOB messages are dropped first
+        self.handler.data_out(session, text=[["90"], {}])
+        self.assertEqual([item[0] for item in queue.items], ["text", "text"])
+        with mock.patch(
+            "evennia.server.portal.portalsessionhandler._OUTPUT_QUEUE_OVERFLOW", "drop"
+        ):
+            self.handler.data_out(session, text=[["abc"], {}])
+        self.assertEqual([item[1] for item in queue.items], [["90"], ["abc"]])
+        self.handler.data_out(session, text=[["abcdefgh"], {}])
+        session.disconnect.assert_called_once()
+        self.assertTrue(queue.stopped)
+        self.assertFalse(queue.items)
+        self.assertIsNone(session.transport.producer)
+
+    def test_disconnect_paused(self):
+        session = self.session
+        queue = self.handler.get_output_queue(session)
+        queue.pauseProducing()
+        self.handler.data_out(session, text=[["bye"], {}])
+        self.handler.server_disconnect(session, reason="Idle timeout")
+        # held back output is sent on before the connection closes
+        session.send_text.assert_called_with("bye")
+        session.disconnect.assert_called_with("Idle timeout")
+        self.assertIsNone(session.transport.producer)
+        self.assertTrue(queue.stopped)
+
+    def test_lose_connection_paused(self):
+        session = self.session
+        session.transport = transport = abstract.FileDescriptor(reactor=Mock())
+        transport.connected = True
+        transport.writeSomeData = lambda data: len(data)
+        queue = self.handler.get_output_queue(session)
+        # the transport's buffer filled up
+        transport.producerPaused = True
+        queue.pauseProducing()
+        transport.loseConnection()
+        transport.reactor.reset_mock()
+        # the buffer was written; the transport resumes the (empty) queue
+        self.assertIsNone(transport.doWrite())
+        self.assertIsNone(transport.producer)
+        # and is asked to write again, to finish closing
+        transport.reactor.addWriter.assert_called_with(transport)
+        self.assertEqual(transport.doWrite(), main.CONNECTION_DONE)
+
+
+@mock.patch("evennia.server.portal.webclient.reactor", new_callable=Clock)
+class TestWebSocket(TestCase):
+    def setUp(self):
+        self.proto = WebSocketClient()
+        self.proto.state = self.proto.STATE_OPEN
+        self.proto.sendMessage = Mock()
+        self.proto.data_in = Mock()
+
+    def test_default(self, clock):
+        self.assertEqual(self.proto.onConnect(Mock(protocols=[])), None)
+        self.proto.send_default("foo", 1, bar=2)
+        self.proto.sendMessage.assert_called_with(b'["foo", [1], {"bar": 2}]')
+        self.proto.onMessage(b'["text", ["look"], {}]', False)
+        self.proto.data_in.assert_called_with(text=[["look"], {}])
+
+    def test_batch(self, clock):
+        self.assertEqual(
+            self.proto.onConnect(Mock(protocols=["other", webclient.JSON_BATCH])),
+            webclient.JSON_BATCH,
+        )
+        self.proto.send_default("foo", 1)
+        self.proto.send_default("bar")
+        self.assertFalse(self.proto.sendMessage.called)
+        clock.advance(0)
+        self.proto.sendMessage.assert_called_once_with(b'[["foo", [1], {}], ["bar", [], {}]]')
+        self.proto.onMessage(b'[["text", ["look"], {}], ["text", ["north"], {}]]', False)
+        self.assertEqual(self.proto.data_in.call_count, 2)
+
+    @unittest.skipIf(not webclient.msgpack, "msgpack is not installed")
+    def test_msgpack(self, clock):
+        self.proto.onConnect(Mock(protocols=[webclient.JSON_BATCH, webclient.MSGPACK_BATCH]))
+        self.assertEqual(self.proto.subprotocol, webclient.MSGPACK_BATCH)
+        self.proto.send_default("foo", 1)
+        clock.advance(0)
+        args, kwargs = self.proto.sendMessage.call_args
+        self.assertTrue(kwargs["isBinary"])
+        self.assertEqual(webclient.msgpack.unpackb(args[0], raw=False), [["foo", [1], {}]])
+        self.proto.onMessage(webclient.msgpack.packb(["text", ["look"], {}]), True)
+        self.proto.data_in.assert_called_with(text=[["look"], {}])
+
+    def test_deflate(self, clock):
+        offer = PerMessageDeflateOffer()
+        self.assertEqual(webclient.accept_deflate([Mock(), offer]).offer, offer)
+        self.assertEqual(webclient.accept_deflate([]), None)
+
+
+@mock.patch("evennia.server.portal.webclient_ajax.reactor", new_callable=Clock)
+class TestAjaxWebClient(TestCase):
+    def _request(self, batch=True):
+        args = {b"csessid": [b"1"]}
+        if batch:
+            args[b"batch"] = [b"1"]
+        return Mock(args=args)
+
+    def test_receive(self, clock):
+        client = AjaxWebClient()
+        client.lineSend("1", ["foo", [], {}])
+        client.lineSend("1", ["bar", [], {}])
+        self.assertEqual(client.mode_receive(self._request(batch=False)), b'["foo", [], {}]')
+        client.lineSend("1", ["foo", [], {}])
+        self.assertEqual(client.mode_receive(self._request()), b'[["bar", [], {}],["foo", [], {}]]')
+        self.assertFalse(client.databuffer)
+
+    def test_waiting(self, clock):
+        client = AjaxWebClient()
+        request = self._request()
+        self.assertEqual(client.mode_receive(request), server.NOT_DONE_YET)
+        client.lineSend("1", ["foo", [], {}])
+        client.lineSend("1", ["bar", [], {}])
+        self.assertFalse(request.write.called)
+        clock.advance(0)
+        request.write.assert_called_once_with(b'[["foo", [], {}],["bar", [], {}]]')
+        self.assertFalse(client.requests)
+        # legacy clients get one message per poll
+        request = self._request(batch=False)
+        client.mode_receive(request)
+        client.lineSend("1", ["foo", [], {}])
+        request.write.assert_called_once_with(b'["foo", [], {}]')
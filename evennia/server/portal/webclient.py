@@ -13,10 +13,24 @@ which represents an "inputfunc" to be called on the Evennia side with *args, **k
 The most common inputfunc is "text", which takes just the text input
 from the command line and interprets it as an Evennia Command: `["text", ["look"], {}]`
 
+By default, each message to the client is sent as a JSON text frame on
+the same form. Clients can instead request one of these WebSocket
+subprotocols:
+
+- `evennia.json.batch` - all messages sent in the same reactor iteration are
+  sent together as one JSON text frame, `[[cmdname, args, kwargs], ...]`.
+- `evennia.msgpack.batch` - like above, but as a binary frame encoded with
+  MessagePack. This requires the optional `msgpack` package.
+
+Incoming frames may also be batched, and binary frames are decoded as
+MessagePack. The permessage-deflate extension is accepted when offered by
+the client if `settings.WEBSOCKET_CLIENT_DEFLATE` is set.
+
 """
 import re
 import json
 import html
+from twisted.internet import reactor
 from twisted.internet.protocol import Protocol
 from django.conf import settings
 from evennia.server.session import Session
@@ -24,6 +38,12 @@ from evennia.utils.utils import to_str, mod_import
 from evennia.utils.ansi import parse_ansi
 from evennia.utils.text2html import parse_html
 from autobahn.twisted.websocket import WebSocketServerProtocol
+from autobahn.websocket.compress import PerMessageDeflateOffer, PerMessageDeflateOfferAccept
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 _RE_SCREENREADER_REGEX = re.compile(
     r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE
@@ -39,6 +59,29 @@ CLOSE_NORMAL = WebSocketServerProtocol.CLOSE_STATUS_CODE_NORMAL
 #   called when the browser is navigating away from the page
 GOING_AWAY = WebSocketServerProtocol.CLOSE_STATUS_CODE_GOING_AWAY
 
+# subprotocols for batched messages, in order of preference
+JSON_BATCH = "evennia.json.batch"
+MSGPACK_BATCH = "evennia.msgpack.batch"
+_SUBPROTOCOLS = (MSGPACK_BATCH, JSON_BATCH) if msgpack else (JSON_BATCH,)
+
+
+def accept_deflate(offers):
+    """
+    Accept the permessage-deflate extension if offered by the client. This
+    is given to the WebSocket factory as `perMessageCompressionAccept`.
+
+    Args:
+        offers (list): The compression offers of the client.
+
+    Returns:
+        accept (PerMessageDeflateOfferAccept or None): The accepted offer,
+            or None to not use compression.
+
+    """
+    for offer in offers:
+        if isinstance(offer, PerMessageDeflateOffer):
+            return PerMessageDeflateOfferAccept(offer)
+
 
 class WebSocketClient(WebSocketServerProtocol, Session):
     """
@@ -52,6 +95,27 @@ class WebSocketClient(WebSocketServerProtocol, Session):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.protocol_key = "webclient/websocket"
+        # the batching subprotocol in use, if any
+        self.subprotocol = None
+        self.outbuffer = []
+        self._flush_call = None
+
+    def onConnect(self, request):
+        """
+        Called during the opening handshake. Selects the batching
+        subprotocol if the client requested one.
+
+        Args:
+            request (ConnectionRequest): The handshake request.
+
+        Returns:
+            subprotocol (str or None): The selected subprotocol.
+
+        """
+        for subprotocol in _SUBPROTOCOLS:
+            if subprotocol in request.protocols:
+                self.subprotocol = subprotocol
+                return subprotocol
 
     def get_client_session(self):
         """
@@ -150,6 +214,7 @@ class WebSocketClient(WebSocketServerProtocol, Session):
         # in case anyone wants to expose this functionality later.
         #
         # sendClose() under autobahn/websocket/interfaces.py
+        self.flush()
         self.sendClose(CLOSE_NORMAL, reason)
 
     def onClose(self, wasClean, code=None, reason=None):
@@ -179,8 +244,14 @@ class WebSocketClient(WebSocketServerProtocol, Session):
                              UTF-8 encoded text.
 
         """
-        cmdarray = json.loads(str(payload, "utf-8"))
-        if cmdarray:
+        if isBinary and msgpack:
+            cmdarray = msgpack.unpackb(payload, raw=False)
+        else:
+            cmdarray = json.loads(str(payload, "utf-8"))
+        if not cmdarray:
+            return
+        # a batch is a list of [cmdname, args, kwargs] lists
+        for cmdarray in cmdarray if isinstance(cmdarray[0], list) else (cmdarray,):
             self.data_in(**{cmdarray[0]: [cmdarray[1], cmdarray[2]]})
 
     def sendLine(self, line):
@@ -193,6 +264,38 @@ class WebSocketClient(WebSocketServerProtocol, Session):
         """
         return self.sendMessage(line.encode())
 
+    def send_cmdarray(self, cmdarray):
+        """
+        Send a message to the client, batched if the client asked for it.
+
+        Args:
+            cmdarray (list): The message, on the form `[cmdname, args, kwargs]`.
+
+        """
+        if not self.subprotocol:
+            self.sendLine(json.dumps(cmdarray))
+            return
+        self.outbuffer.append(cmdarray)
+        if not self._flush_call:
+            # send all messages of this reactor iteration together
+            self._flush_call = reactor.callLater(0, self.flush)
+
+    def flush(self):
+        """
+        Send all buffered messages to the client in one frame.
+
+        """
+        if self._flush_call and self._flush_call.active():
+            self._flush_call.cancel()
+        self._flush_call = None
+        outbuffer, self.outbuffer = self.outbuffer, []
+        if not outbuffer or self.state != self.STATE_OPEN:
+            return
+        if self.subprotocol == MSGPACK_BATCH:
+            self.sendMessage(msgpack.packb(outbuffer, use_bin_type=True), isBinary=True)
+        else:
+            self.sendLine(json.dumps(outbuffer))
+
     def at_login(self):
         csession = self.get_client_session()
         if csession:
@@ -273,7 +376,7 @@ class WebSocketClient(WebSocketServerProtocol, Session):
             args[0] = parse_html(text, strip_ansi=nocolor)
 
         # send to client on required form [cmdname, args, kwargs]
-        self.sendLine(json.dumps([cmd, args, kwargs]))
+        self.send_cmdarray([cmd, args, kwargs])
 
     def send_prompt(self, *args, **kwargs):
         kwargs["options"].update({"send_prompt": True})
@@ -294,4 +397,4 @@ class WebSocketClient(WebSocketServerProtocol, Session):
 
         """
         if not cmdname == "options":
-            self.sendLine(json.dumps([cmdname, args, kwargs]))
+            self.send_cmdarray([cmdname, args, kwargs])
@@ -15,6 +15,10 @@ http://localhost:4001/webclient.)
                  The WebClient resource in this module will
                  handle these requests and act as a gateway
                  to sessions connected over the webclient.
+
+Clients polling with `batch=1` get all buffered messages in one response,
+as a JSON list `[[cmdname, args, kwargs], ...]`. Other clients get one
+message per poll.
 """
 import json
 import re
@@ -22,6 +26,7 @@ import time
 import html
 
 from twisted.web import server, resource
+from twisted.internet import reactor
 from twisted.internet.task import LoopingCall
 from django.utils.functional import Promise
 from django.conf import settings
@@ -56,6 +61,11 @@ def jsonify(obj):
     return to_bytes(json.dumps(obj, ensure_ascii=False, cls=LazyEncoder))
 
 
+def _wants_batch(request):
+    "Check if the client polls for all buffered messages at once"
+    return request.args.get(b"batch", [b""])[0] == b"1"
+
+
 #
 # AjaxWebClient resource - this is called by the ajax client
 # using POST requests to /webclientdata.
@@ -74,6 +84,8 @@ class AjaxWebClient(resource.Resource):
     def __init__(self):
         self.requests = {}
         self.databuffer = {}
+        # pending sends of buffered data to batching clients
+        self.flush_calls = {}
 
         self.last_alive = {}
         self.keep_alive = None
@@ -145,16 +157,33 @@ class AjaxWebClient(resource.Resource):
 
         """
         request = self.requests.get(csessid)
-        if request:
+        if request and not _wants_batch(request):
             # we have a request waiting. Return immediately.
             request.write(jsonify(data))
             request.finish()
             del self.requests[csessid]
         else:
-            # no waiting request. Store data in buffer
+            # no waiting request, or one taking a batch. Store data in buffer
             dataentries = self.databuffer.get(csessid, [])
             dataentries.append(jsonify(data))
             self.databuffer[csessid] = dataentries
+            if request and csessid not in self.flush_calls:
+                # return all data of this reactor iteration together
+                self.flush_calls[csessid] = reactor.callLater(0, self.flush, csessid)
+
+    def flush(self, csessid):
+        """
+        Return all buffered data to a waiting batching client.
+
+        Args:
+            csessid (int): Session id.
+
+        """
+        self.flush_calls.pop(csessid, None)
+        request = self.requests.pop(csessid, None)
+        if request:
+            request.write(b"[" + b",".join(self.databuffer.pop(csessid, [])) + b"]")
+            request.finish()
 
     def client_disconnect(self, csessid):
         """
@@ -169,6 +198,8 @@ class AjaxWebClient(resource.Resource):
             del self.requests[csessid]
         if csessid in self.databuffer:
             del self.databuffer[csessid]
+        if csessid in self.flush_calls:
+            self.flush_calls.pop(csessid).cancel()
 
     def mode_init(self, request):
         """
@@ -256,6 +287,9 @@ class AjaxWebClient(resource.Resource):
         if dataentries:
             # we have data that could not be sent earlier (because client was not
             # ready to receive it). Return this buffered data immediately
+            if _wants_batch(request):
+                del self.databuffer[csessid]
+                return b"[" + b",".join(dataentries) + b"]"
             return dataentries.pop(0)
         else:
             # we have no data to send. End the old request and start
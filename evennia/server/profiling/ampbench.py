@@ -0,0 +1,129 @@
+"""
+AMP codec benchmark
+
+Compares the codecs packing the data messages between Portal and
+Server (see `settings.AMP_CODEC`) on a seeded mix of typical session
+traffic: command input, short and long text output, prompts with
+options and OOB messages. Each message is packed, boxed for the wire
+(chunked and compressed), unboxed and unpacked again, like when sent
+over AMP.
+
+Run it from a game directory, or anywhere with the default settings:
+
+    python -m evennia.server.profiling.ampbench --messages 20000 --seed 1
+
+This prints the time per message and the bytes sent on the wire per
+message for each codec as JSON.
+
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# weights of the kinds of traffic, roughly as seen on a busy game
+TRAFFIC = (("input", 30), ("say", 30), ("room", 15), ("prompt", 15), ("oob", 8), ("help", 2))
+
+_WORDS = (
+    "the quick brown fox jumps over a lazy dog while |rred|n and |gGreen|n lights "
+    "blink in the |wtavern|n of https://www.evennia.com north south east west"
+).split()
+
+CODECS = ("evennia.server.portal.amp.PickleAMPCodec", "evennia.server.portal.amp.FastAMPCodec")
+
+
+def _text(rand, nwords):
+    return " ".join(rand.choice(_WORDS) for _ in range(nwords))
+
+
+def make_traffic(nmessages, seed=0):
+    """
+    Make a list of messages on the form sent over AMP.
+
+    Args:
+        nmessages (int): Number of messages.
+        seed (int, optional): Random seed, for reproducible traffic.
+
+    Returns:
+        traffic (list): Tuples `(sessid, kwargs)`.
+
+    """
+    rand = random.Random(seed)
+    kinds, weights = zip(*TRAFFIC)
+    traffic = []
+    for kind in rand.choices(kinds, weights, k=nmessages):
+        sessid = rand.randint(1, 200)
+        if kind == "input":
+            kwargs = {"text": [[_text(rand, rand.randint(1, 4))], {}]}
+        elif kind == "say":
+            kwargs = {"text": [[_text(rand, rand.randint(5, 30))], {"options": {}}]}
+        elif kind == "room":
+            kwargs = {"text": [["\n".join(_text(rand, 15) for _ in range(8))], {"options": {}}]}
+        elif kind == "prompt":
+            kwargs = {"prompt": [["HP: 100 MP: 25 > "], {"options": {"send_prompt": True}}]}
+        elif kind == "oob":
+            kwargs = {"Char.Vitals": [[], {"hp": rand.randint(0, 100), "mp": 25, "options": {}}]}
+        else:
+            kwargs = {"text": [["\n".join(_text(rand, 12) for _ in range(300))], {"options": {}}]}
+        traffic.append((sessid, kwargs))
+    return traffic
+
+
+def run(codec_path, traffic):
+    """
+    Send traffic through a codec and the AMP wire format.
+
+    Args:
+        codec_path (str): Python path to the codec class.
+        traffic (list): Messages from `make_traffic`.
+
+    Returns:
+        result (dict): Microseconds and wire bytes per message.
+
+    """
+    from evennia.server.portal import amp
+    from evennia.utils.utils import class_from_module
+
+    argument = amp.Compressed()
+    old_codec = amp._CODEC
+    amp._CODEC = codec = class_from_module(codec_path)()
+    try:
+        nbytes = 0
+        start = time.perf_counter()
+        for data in traffic:
+            strings, objects = {}, {}
+            argument.toBox(b"packed_data", strings, {"packed_data": codec.dumps(data)}, None)
+            nbytes += sum(len(string) for string in strings.values())
+            argument.fromBox(b"packed_data", strings, objects, None)
+            if codec.loads(objects["packed_data"]) != data:
+                raise RuntimeError("{} did not round-trip {}".format(codec_path, data))
+        elapsed = time.perf_counter() - start
+    finally:
+        amp._CODEC = old_codec
+    return {
+        "us_per_message": round(elapsed / len(traffic) * 1e6, 2),
+        "bytes_per_message": round(nbytes / len(traffic), 1),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the AMP codecs.")
+    parser.add_argument("--messages", type=int, default=20000, help="Number of messages")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the traffic")
+    parser.add_argument(
+        "--codec", action="append", dest="codecs", help="Python path of a codec to compare"
+    )
+    args = parser.parse_args(args)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+    traffic = make_traffic(args.messages, args.seed)
+    results = {path: run(path, traffic) for path in args.codecs or CODECS}
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
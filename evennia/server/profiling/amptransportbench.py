@@ -0,0 +1,201 @@
+"""
+AMP transport benchmark
+
+Compares the throughput of the AMP connection between Server and Portal
+over TCP on localhost (the default) and over a Unix domain socket (see
+`settings.AMP_UNIX_SOCKET`). A client sends the same seeded traffic as
+used by `ampbench` to a listening AMP protocol as `MsgServer2Portal`
+commands, like the Server sends output to the Portal. Up to `window`
+commands are sent before waiting for their answers. The messages are
+packed with the codec set by `settings.AMP_CODEC`.
+
+Run it from a game directory, or anywhere with the default settings:
+
+    python -m evennia.server.profiling.amptransportbench --messages 20000 --seed 1
+
+This prints the messages and wire megabytes per second for each
+transport as JSON.
+
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+from twisted.internet import defer, endpoints, protocol
+
+TRANSPORTS = ("tcp", "unix") if hasattr(socket, "AF_UNIX") else ("tcp",)
+
+_BenchProtocol = None
+
+
+def _get_protocol():
+    """
+    Create the protocol class on first use, so the settings are only
+    needed when running the benchmark.
+
+    """
+    global _BenchProtocol
+    if _BenchProtocol:
+        return _BenchProtocol
+
+    from evennia.server.portal import amp
+
+    class BenchProtocol(amp.AMPMultiConnectionProtocol):
+        """
+        Receives messages like the Portal does, without passing them on
+        to any sessions.
+
+        """
+
+        def __init__(self, *args, **kwargs):
+            super(BenchProtocol, self).__init__(*args, **kwargs)
+            self.lost = defer.Deferred()
+
+        def connectionMade(self):
+            super(BenchProtocol, self).connectionMade()
+            self.factory.connected.callback(self)
+
+        def dataReceived(self, data):
+            self.factory.nbytes += len(data)
+            super(BenchProtocol, self).dataReceived(data)
+
+        def connectionLost(self, reason):
+            super(BenchProtocol, self).connectionLost(reason)
+            self.lost.callback(None)
+
+        @amp.MsgServer2Portal.responder
+        def receive_server2portal(self, packed_data):
+            self.data_in(packed_data)
+            self.factory.nreceived += 1
+            return {}
+
+    _BenchProtocol = BenchProtocol
+    return BenchProtocol
+
+
+def _make_factory(factory_class):
+    factory = factory_class.forProtocol(_get_protocol())
+    factory.noisy = False
+    factory.broadcasts = []
+    factory.connected = defer.Deferred()
+    factory.nbytes = factory.nreceived = 0
+    return factory
+
+
+@defer.inlineCallbacks
+def run(transport, traffic, window=100, reactor=None):
+    """
+    Send traffic over an AMP connection using the given transport.
+
+    Args:
+        transport (str): One of `TRANSPORTS`.
+        traffic (list): Messages from `ampbench.make_traffic`.
+        window (int, optional): Max number of commands waiting for an
+            answer.
+        reactor (IReactorCore, optional): The reactor to use, which must
+            be running. Defaults to the global reactor.
+
+    Returns:
+        deferred (Deferred): Fires with a dict with the messages and wire
+            megabytes per second.
+
+    Raises:
+        ValueError: If the transport is not known.
+
+    """
+    from evennia.server.portal import amp
+
+    if not reactor:
+        from twisted.internet import reactor
+    if transport not in TRANSPORTS:
+        raise ValueError("Unknown transport {}".format(transport))
+
+    tmpdir = tempfile.mkdtemp()
+    server_factory = _make_factory(protocol.ServerFactory)
+    if transport == "unix":
+        path = os.path.join(tmpdir, "amp.sock")
+        port = reactor.listenUNIX(path, server_factory)
+        endpoint = endpoints.UNIXClientEndpoint(reactor, path)
+    else:
+        port = reactor.listenTCP(0, server_factory, interface="127.0.0.1")
+        endpoint = endpoints.TCP4ClientEndpoint(reactor, "127.0.0.1", port.getHost().port)
+    try:
+        client = yield endpoint.connect(_make_factory(protocol.ClientFactory))
+        # the Unix socket is accepted after the client is connected
+        server = yield server_factory.connected
+        try:
+            start = time.perf_counter()
+            pending = []
+            for data in traffic:
+                pending.append(
+                    client.callRemote(amp.MsgServer2Portal, packed_data=client.pack_data(data))
+                )
+                if len(pending) >= window:
+                    yield defer.gatherResults(pending)
+                    pending = []
+            yield defer.gatherResults(pending)
+            elapsed = time.perf_counter() - start
+        finally:
+            client.transport.loseConnection()
+            yield defer.gatherResults([client.lost, server.lost])
+    finally:
+        yield port.stopListening()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if server_factory.nreceived != len(traffic):
+        raise RuntimeError(
+            "{} received {} of {} messages".format(
+                transport, server_factory.nreceived, len(traffic)
+            )
+        )
+    return {
+        "messages_per_second": round(len(traffic) / elapsed),
+        "mb_per_second": round(server_factory.nbytes / elapsed / 1e6, 2),
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the AMP transports.")
+    parser.add_argument("--messages", type=int, default=20000, help="Number of messages")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the traffic")
+    parser.add_argument(
+        "--window", type=int, default=100, help="Max number of messages waiting for an answer"
+    )
+    parser.add_argument(
+        "--transport",
+        action="append",
+        dest="transports",
+        choices=TRANSPORTS,
+        help="Transport to compare",
+    )
+    args = parser.parse_args(args)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+    from twisted.internet import reactor
+    from evennia.server.profiling.ampbench import make_traffic
+
+    traffic = make_traffic(args.messages, args.seed)
+    results = {}
+
+    @defer.inlineCallbacks
+    def _run_all():
+        try:
+            for transport in args.transports or TRANSPORTS:
+                results[transport] = yield run(transport, traffic, args.window, reactor)
+        finally:
+            reactor.stop()
+
+    reactor.callWhenRunning(_run_all)
+    reactor.run()
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
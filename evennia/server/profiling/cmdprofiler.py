@@ -0,0 +1,186 @@
+"""
+Command profiler
+
+This collects timing statistics for every Command class run by the
+cmdhandler: how often it was called, the wall time spent running it
+(`at_pre_cmd` through `at_post_cmd`), the number of database queries it
+caused and the time spent merging cmdsets before it could run.
+
+The profiler is off by default and then only costs the cmdhandler a single
+attribute lookup per command. Turn it on with `COMMAND_PROFILING = True` in
+settings or in-game with `cmdstats/start`. View the statistics with the
+`cmdstats` command or read them from the local-only `/metrics` web resource
+(see `evennia.server.profiling.metrics`).
+
+Note that the wall time of commands that pause (such as by yielding inside
+`func`) includes the time they were paused, and database queries run by
+other code during such pauses are counted against the paused command.
+
+"""
+
+import time
+from django.conf import settings
+from django.db import connection
+from evennia.server.profiling.metrics import METRICS
+
+# valid ways to sort the statistics
+SORT_KEYS = ("calls", "total", "mean", "max", "queries", "merge")
+
+_COMMAND_DURATION = METRICS.histogram(
+    "evennia_command_duration_seconds", "Time spent running a command.", ("command",)
+)
+
+
+class CommandProfiler(object):
+    """
+    Keeps per-Command-class statistics. Use the `COMMAND_PROFILER`
+    singleton rather than creating new instances of this class.
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = None
+        # {cmdclass_path: [calls, total_time, max_time, nqueries, merge_time]}
+        self.stats = {}
+        self.query_count = 0
+
+    def _count_query(self, execute, sql, params, many, context):
+        """
+        Django execute_wrapper counting all database queries.
+
+        """
+        self.query_count += 1
+        return execute(sql, params, many, context)
+
+    def start(self):
+        """
+        Start collecting statistics.
+
+        """
+        if not self.enabled:
+            if self._count_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(self._count_query)
+            self.enabled = True
+            self.started = time.time()
+
+    def stop(self):
+        """
+        Stop collecting statistics. Already collected statistics are kept.
+
+        """
+        self.enabled = False
+        try:
+            connection.execute_wrappers.remove(self._count_query)
+        except ValueError:
+            pass
+
+    def reset(self):
+        """
+        Clear all statistics.
+
+        """
+        self.stats = {}
+        _COMMAND_DURATION.values.clear()
+        if self.enabled:
+            self.started = time.time()
+
+    def record(self, cmd, runtime, merge_time=0.0, nqueries=0):
+        """
+        Store the result of one command execution.
+
+        Args:
+            cmd (Command): The command instance that was run.
+            runtime (float): Seconds spent running the command.
+            merge_time (float, optional): Seconds spent merging cmdsets
+                in order to find the command.
+            nqueries (int, optional): Number of database queries made
+                while running the command.
+
+        """
+        cmdclass = cmd.__class__
+        path = "%s.%s" % (cmdclass.__module__, cmdclass.__name__)
+        _COMMAND_DURATION.observe(runtime, command=path)
+        try:
+            stat = self.stats[path]
+        except KeyError:
+            self.stats[path] = [1, runtime, runtime, nqueries, merge_time]
+        else:
+            stat[0] += 1
+            stat[1] += runtime
+            stat[2] = max(stat[2], runtime)
+            stat[3] += nqueries
+            stat[4] += merge_time
+
+    def get_stats(self, sortby="total"):
+        """
+        Get the collected statistics.
+
+        Args:
+            sortby (str, optional): One of `SORT_KEYS`. Statistics are
+                sorted with the highest value first.
+
+        Returns:
+            stats (list): A list of dicts with keys `command`, `calls`,
+                `total`, `mean`, `max`, `queries` and `merge`. Times
+                are in seconds.
+
+        """
+        stats = [
+            {
+                "command": path,
+                "calls": calls,
+                "total": total,
+                "mean": total / calls,
+                "max": maxtime,
+                "queries": nqueries,
+                "merge": merge_time,
+            }
+            for path, (calls, total, maxtime, nqueries, merge_time) in self.stats.items()
+        ]
+        sortby = sortby if sortby in SORT_KEYS else "total"
+        return sorted(stats, key=lambda stat: stat[sortby], reverse=True)
+
+    def collect(self):
+        """
+        Get the statistics as metric families, for the metrics registry.
+
+        Returns:
+            families (list): See `evennia.server.profiling.metrics.MetricsRegistry.collect`.
+                Empty if nothing was profiled in this process.
+
+        """
+        if not (self.stats or self.query_count):
+            return []
+        families = [
+            (
+                "evennia_db_queries_total",
+                "counter",
+                "Database queries made by the Server's main thread while profiling.",
+                [("evennia_db_queries_total", {}, self.query_count)],
+            )
+        ]
+        for name, ind, mtype, helptext in (
+            ("evennia_command_calls_total", 0, "counter", "Number of times a command was run."),
+            ("evennia_command_seconds_total", 1, "counter", "Time spent running a command."),
+            ("evennia_command_seconds_max", 2, "gauge", "Longest single run of a command."),
+            ("evennia_command_db_queries_total", 3, "counter", "Database queries by a command."),
+            (
+                "evennia_command_cmdset_merge_seconds_total",
+                4,
+                "counter",
+                "Time spent merging cmdsets before running a command.",
+            ),
+        ):
+            samples = [
+                (name, {"command": path}, stat[ind]) for path, stat in sorted(self.stats.items())
+            ]
+            families.append((name, mtype, helptext, samples))
+        return families
+
+
+COMMAND_PROFILER = CommandProfiler()
+METRICS.add_collector(COMMAND_PROFILER.collect)
+
+if settings.COMMAND_PROFILING:
+    COMMAND_PROFILER.start()
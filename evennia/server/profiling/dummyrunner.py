@@ -29,18 +29,44 @@ change which actions by adding a path to
 in your settings. See utils.dummyrunner_actions.py
 for instructions on how to define this module.
 
+Benchmarking:
+
+The dummyrunner can also be used as a reproducible load benchmark.
+Given a `--seed`, every client picks its actions from its own seeded
+random generator, and a `--scenario` selects one of the scripted
+SCENARIOS of the settings module (like "login_storm", "crowded_room",
+"channel_spam" or "movement"). With `--duration` the run stops by
+itself and reports throughput and per-command latency percentiles
+(p50/p95/p99) as JSON, to stdout or to the file given by `--output`.
+Latency is measured from sending a command until the server returns
+the prompt that the settings mixin makes it send after each command.
+Comparing such JSON files between commits is best done against a
+fresh SQLite test database, for example:
+
+    evennia --init benchgame
+    cd benchgame
+    (add the settings mixin to server/conf/settings.py)
+    evennia migrate
+    evennia start
+    evennia --dummyrunner 50 --seed 1 --scenario crowded_room \
+        --duration 60 --output crowded.json
+
 """
 
 
 import sys
+import json
 import time
 import random
+import subprocess
+from collections import deque, defaultdict
 from argparse import ArgumentParser
 from twisted.conch import telnet
 from twisted.internet import reactor, protocol
 from twisted.internet.task import LoopingCall
 
 from django.conf import settings
+import evennia
 from evennia.utils import mod_import, time_format
 
 # Load the dummyrunner settings module
@@ -70,6 +96,10 @@ CHANCE_OF_ACTION = DUMMYRUNNER_SETTINGS.CHANCE_OF_ACTION
 CHANCE_OF_LOGIN = DUMMYRUNNER_SETTINGS.CHANCE_OF_LOGIN
 # Port to use, if not specified on command line
 TELNET_PORT = DUMMYRUNNER_SETTINGS.TELNET_PORT or settings.TELNET_PORTS[0]
+# the prompt the server sends after every command (see settings_mixin)
+PROMPT = getattr(settings, "DUMMYRUNNER_PROMPT", "<dummyrunner>")
+# random seed to use. If `None`, the run will not be reproducible.
+SEED = None
 #
 NLOGGED_IN = 0
 
@@ -113,6 +143,18 @@ ERROR_FEW_ACTIONS = """
     contain at least login- and logout functions.
     """
 
+ERROR_NO_SCENARIO = """
+    Dummyrunner settings error: There is no scenario '{scenario}' in the
+    SCENARIOS dict of the dummyrunner settings module. Available
+    scenarios are: {scenarios}
+    """
+
+WARNING_NO_PROMPTS = """
+    Warning: No prompts were received from the server, so no command
+    latencies could be measured. Make sure the server was started with
+    the dummyrunner settings mixin.
+    """
+
 
 HELPTEXT = """
 DO NOT RUN THIS ON A PRODUCTION SERVER! USE A CLEAN/TESTING DATABASE!
@@ -215,7 +257,125 @@ def makeiter(obj):
     Returns:
         iterable (iterable): An iterable object.
     """
-    return obj if hasattr(obj, "__iter__") else [obj]
+    return obj if hasattr(obj, "__iter__") and not isinstance(obj, str) else [obj]
+
+
+def percentile(values, percent):
+    """
+    Get a percentile using the nearest-rank method.
+
+    Args:
+        values (list): A sorted list of numbers.
+        percent (float): The percentile to get, between 0 and 100.
+
+    Returns:
+        value (float or None): The percentile value, or `None` if `values` is empty.
+
+    """
+    if not values:
+        return None
+    rank = max(int(-(-percent * len(values) // 100)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+class LatencyStats(object):
+    """
+    Collects the latency of all commands sent by the dummy clients,
+    grouped by command name.
+
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.nsent = 0
+        self.starttime = time.time()
+
+    def sent(self):
+        "Register a command being sent."
+        self.nsent += 1
+
+    def add(self, cmdname, latency):
+        """
+        Register the latency of a finished command.
+
+        Args:
+            cmdname (str): The name of the command (its first word).
+            latency (float): The time in seconds from sending the
+                command until the prompt came back.
+
+        """
+        self.latencies[cmdname].append(latency)
+
+    @staticmethod
+    def summarize(latencies):
+        """
+        Summarize a list of latencies.
+
+        Args:
+            latencies (list): Latencies, in seconds.
+
+        Returns:
+            summary (dict): Count and mean, max, p50, p95, p99 in milliseconds.
+
+        """
+        values = sorted(latencies)
+        if not values:
+            return {"count": 0}
+        return {
+            "count": len(values),
+            "mean": 1000.0 * sum(values) / len(values),
+            "max": 1000.0 * values[-1],
+            "p50": 1000.0 * percentile(values, 50),
+            "p95": 1000.0 * percentile(values, 95),
+            "p99": 1000.0 * percentile(values, 99),
+        }
+
+    def report(self, **metadata):
+        """
+        Build the benchmark report.
+
+        Kwargs:
+            metadata: Any extra info (like seed and scenario) to store
+                in the report.
+
+        Returns:
+            report (dict): JSON-serializable benchmark result.
+
+        """
+        runtime = max(time.time() - self.starttime, 1e-6)
+        alllatencies = [lat for lats in self.latencies.values() for lat in lats]
+        report = {
+            "evennia_version": evennia.__version__,
+            "commit": _get_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "runtime": runtime,
+            "commands_sent": self.nsent,
+            "commands_completed": len(alllatencies),
+            "throughput": len(alllatencies) / runtime,
+            "latency": {"all": self.summarize(alllatencies)},
+        }
+        report["latency"].update(
+            (cmdname, self.summarize(lats)) for cmdname, lats in sorted(self.latencies.items())
+        )
+        report.update(metadata)
+        return report
+
+
+STATS = LatencyStats()
+
+
+def _get_commit():
+    "Get the git commit of the Evennia library, if available."
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], cwd=evennia.__path__[0], stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return None
 
 
 # ------------------------------------------------------------
@@ -243,6 +403,9 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         self.istep = 0
         self.exits = []  # exit names created
         self.objs = []  # obj names created
+        # each client has its own random generator so a seeded run
+        # does not depend on the order the clients are stepped in
+        self.random = random.Random(None if SEED is None else "%s-%s" % (SEED, self.cid))
 
         self._connected = False
         self._loggedin = False
@@ -252,6 +415,8 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         self._login = self.factory.actions[0]
         self._logout = self.factory.actions[1]
         self._actions = self.factory.actions[2:]
+        self._pending = deque()  # (cmdname, time sent) awaiting a prompt
+        self._received = ""
 
         reactor.addSystemEventTrigger("before", "shutdown", self.logout)
 
@@ -261,18 +426,52 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         stepping until the server actually responds
 
         Args:
-            data (str): Incoming data.
+            data (bytes): Incoming data.
 
         """
-        if not self._connected and not data.startswith(chr(255)):
+        if not self._connected and not data.startswith(telnet.IAC):
             # wait until we actually get text back (not just telnet
             # negotiation)
             self._connected = True
             # start client tick
             d = LoopingCall(self.step)
             # dissipate exact step by up to +/- 0.5 second
-            timestep = TIMESTEP + (-0.5 + (random.random() * 1.0))
+            timestep = max(0.1, TIMESTEP + (-0.5 + (self.random.random() * 1.0)))
             d.start(timestep, now=True).addErrback(self.error)
+        self.check_prompts(data.decode("utf-8", errors="ignore"))
+
+    def check_prompts(self, text):
+        """
+        Look for prompts in the incoming text, each marking the
+        completion of the oldest command still awaiting a reply.
+
+        Args:
+            text (str): Incoming text.
+
+        """
+        now = time.time()
+        received = self._received + text
+        nprompts = received.count(PROMPT)
+        for _ in range(nprompts):
+            if not self._pending:
+                break
+            cmdname, tsent = self._pending.popleft()
+            STATS.add(cmdname, now - tsent)
+        # keep any partial prompt for the next chunk of data
+        self._received = received.rsplit(PROMPT, 1)[-1][-len(PROMPT) :]
+
+    def send_command(self, cmd):
+        """
+        Send a command to the server, timing it.
+
+        Args:
+            cmd (str): The command to send.
+
+        """
+        cmd = str(cmd)
+        self._pending.append((cmd.split(" ", 1)[0], time.time()))
+        STATS.sent()
+        self.sendLine(cmd.encode("utf-8"))
 
     def connectionLost(self, reason):
         """
@@ -312,7 +511,7 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         self._logging_out = True
         cmd = self._logout(self)
         print("client %s(%s) logout (%s actions)" % (self.key, self.cid, self.istep))
-        self.sendLine(cmd)
+        self.sendLine(str(cmd).encode("utf-8"))
 
     def step(self):
         """
@@ -323,7 +522,7 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         """
         global NLOGGED_IN
 
-        rand = random.random()
+        rand = self.random.random()
 
         if not self._cmdlist:
             # no commands ready. Load some.
@@ -340,14 +539,14 @@ class DummyClient(telnet.StatefulTelnetProtocol):
                     return
             else:
                 # we always pick a cumulatively random function
-                crand = random.random()
+                crand = self.random.random()
                 cfunc = [func for (cprob, func) in self._actions if cprob >= crand][0]
                 self._cmdlist = list(makeiter(cfunc(self)))
 
         # at this point we always have a list of commands
         if rand < CHANCE_OF_ACTION:
             # send to the game
-            self.sendLine(str(self._cmdlist.pop(0)))
+            self.send_command(self._cmdlist.pop(0))
             self.istep += 1
 
 
@@ -365,18 +564,36 @@ class DummyFactory(protocol.ClientFactory):
 # ------------------------------------------------------------
 
 
-def start_all_dummy_clients(nclients):
+def start_all_dummy_clients(nclients, scenario=None, seed=None, duration=None):
     """
     Initialize all clients, connect them and start to step them
 
     Args:
         nclients (int): Number of dummy clients to connect.
+        scenario (str, optional): Name of a scenario in the SCENARIOS dict
+            of the dummyrunner settings. If not given, use the ACTIONS of the
+            settings module.
+        seed (int or str, optional): Seed for the random generators of the
+            clients, for making runs reproducible.
+        duration (float, optional): If given, stop after this many seconds.
 
     """
-    global NCLIENTS
+    global NCLIENTS, SEED, TIMESTEP, CHANCE_OF_ACTION, CHANCE_OF_LOGIN
     NCLIENTS = int(nclients)
+    SEED = seed
     actions = DUMMYRUNNER_SETTINGS.ACTIONS
 
+    if scenario:
+        scenarios = getattr(DUMMYRUNNER_SETTINGS, "SCENARIOS", {})
+        if scenario not in scenarios:
+            print(ERROR_NO_SCENARIO.format(scenario=scenario, scenarios=", ".join(scenarios)))
+            return
+        scenario = scenarios[scenario]
+        actions = scenario["actions"]
+        TIMESTEP = scenario.get("timestep", TIMESTEP)
+        CHANCE_OF_ACTION = scenario.get("chance_of_action", CHANCE_OF_ACTION)
+        CHANCE_OF_LOGIN = scenario.get("chance_of_login", CHANCE_OF_LOGIN)
+
     if len(actions) < 2:
         print(ERROR_FEW_ACTIONS)
         return
@@ -398,6 +615,8 @@ def start_all_dummy_clients(nclients):
     factory = DummyFactory(actions)
     for i in range(NCLIENTS):
         reactor.connectTCP("localhost", TELNET_PORT, factory)
+    if duration:
+        reactor.callLater(float(duration), reactor.stop)
     # start reactor
     reactor.run()
 
@@ -418,17 +637,52 @@ if __name__ == "__main__":
     # parsing command line with default vals
     parser = ArgumentParser(description=HELPTEXT)
     parser.add_argument(
-        "-N", nargs=1, default=1, dest="nclients", help="Number of clients to start"
+        "-N", nargs=1, default=[1], dest="nclients", help="Number of clients to start"
+    )
+    parser.add_argument(
+        "--config", dest="config", default=None, help="Alternative dummyrunner settings file"
+    )
+    parser.add_argument(
+        "--seed", dest="seed", default=None, help="Random seed, for reproducible runs"
+    )
+    parser.add_argument(
+        "--scenario", dest="scenario", default=None, help="Name of benchmark scenario to run"
+    )
+    parser.add_argument(
+        "--duration", dest="duration", type=float, default=None, help="Stop after this many seconds"
+    )
+    parser.add_argument(
+        "--output", dest="output", default=None, help="Write JSON results to this file"
     )
 
     args = parser.parse_args()
 
+    if args.config:
+        DUMMYRUNNER_SETTINGS = mod_import(args.config)
+        TIMESTEP = DUMMYRUNNER_SETTINGS.TIMESTEP
+        CHANCE_OF_ACTION = DUMMYRUNNER_SETTINGS.CHANCE_OF_ACTION
+        CHANCE_OF_LOGIN = DUMMYRUNNER_SETTINGS.CHANCE_OF_LOGIN
+
     print(INFO_STARTING.format(N=args.nclients[0]))
 
     # run the dummyrunner
     t0 = time.time()
-    start_all_dummy_clients(nclients=args.nclients[0])
+    start_all_dummy_clients(
+        nclients=args.nclients[0], scenario=args.scenario, seed=args.seed, duration=args.duration
+    )
     ttot = time.time() - t0
 
     # output runtime
     print("... dummy client runner stopped after %s." % time_format(ttot, style=3))
+
+    report = STATS.report(
+        nclients=NCLIENTS, scenario=args.scenario or "default", seed=args.seed, duration=ttot
+    )
+    if not report["commands_completed"]:
+        print(WARNING_NO_PROMPTS)
+    if args.output:
+        with open(args.output, "w") as fil:
+            json.dump(report, fil, indent=2, sort_keys=True)
+        print("Benchmark results written to %s." % args.output)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
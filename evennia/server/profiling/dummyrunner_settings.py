@@ -49,6 +49,12 @@ TIMESTEP with a chance given by CHANCE_OF_ACTION by in the order given
 (no randomness) and allows for setting up a more complex chain of
 commands (such as creating an account and logging in).
 
+SCENARIOS is a dict of named, scripted benchmark scenarios, selected
+with the dummyrunner's `--scenario` option. Each scenario is a dict
+with an "actions" tuple on the same form as ACTIONS and optional
+"timestep", "chance_of_action" and "chance_of_login" keys overriding the
+global settings above for that scenario.
+
 """
 # Dummy runner settings
 
@@ -204,6 +210,16 @@ def c_socialize(client):
     return cmds
 
 
+def c_says(client):
+    "talks in the current location"
+    return ("say Hello from %s!" % client.key, "emote waves.", "look")
+
+
+def c_chats(client):
+    "spams the default public channel"
+    return ("pub Hello from %s!" % client.key, "pub Testing ... %s" % client.counter())
+
+
 def c_moves(client):
     "moves to a previously created room, using the stored exits"
     cmds = client.exits  # try all exits - finally one will work
@@ -285,3 +301,39 @@ ACTIONS = (c_login, c_logout, (0.01, c_digs), (0.39, c_looks), (0.2, c_help), (0
 # ACTIONS = (c_login,
 #           c_logout,
 #           (1.0, c_digs))
+
+
+# Benchmark scenarios
+#
+# These are used with the --scenario option of the dummyrunner. Combine
+# with --seed to get a reproducible sequence of actions between runs.
+
+SCENARIOS = {
+    # all clients connect and create accounts at the same time
+    "login_storm": {
+        "actions": (c_login_nodig, c_logout, (1.0, c_looks)),
+        "timestep": 1,
+        "chance_of_action": 1.0,
+        "chance_of_login": 1.0,
+    },
+    # everyone stays in the same (start) location, talking and looking
+    "crowded_room": {
+        "actions": (c_login_nodig, c_logout, (0.6, c_says), (0.4, c_looks)),
+        "timestep": 1,
+        "chance_of_action": 1.0,
+    },
+    # heavy channel use
+    "channel_spam": {
+        "actions": (c_login_nodig, c_logout, (0.9, c_chats), (0.1, c_looks)),
+        "timestep": 1,
+        "chance_of_action": 1.0,
+    },
+    # moving back and forth between dug rooms
+    "movement": {
+        "actions": (c_login, c_logout, (0.8, c_moves), (0.2, c_looks)),
+        "timestep": 1,
+        "chance_of_action": 1.0,
+    },
+    # the default ACTIONS profile above
+    "default": {"actions": ACTIONS},
+}
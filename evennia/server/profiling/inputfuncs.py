@@ -0,0 +1,34 @@
+"""
+Dummyrunner inputfuncs
+
+This module is added to `INPUT_FUNC_MODULES` by the dummyrunner settings
+mixin. It overrides the default `text` inputfunc to send a prompt back
+to the client once each command has finished executing. The dummyrunner
+uses this prompt to measure the latency of every command it sends.
+
+Don't use this on a production server!
+
+"""
+
+from django.conf import settings
+from evennia.server import inputfuncs
+
+_PROMPT = getattr(settings, "DUMMYRUNNER_PROMPT", "<dummyrunner>")
+
+
+def text(session, *args, **kwargs):
+    """
+    Run the default text inputfunc, then send the dummyrunner prompt
+    when the command has completed (successfully or not).
+
+    Args:
+        session (Session): The active Session to receive the input.
+        text (str): First arg is used as text-command input. Other
+            arguments are ignored.
+
+    """
+    deferred = inputfuncs.text(session, *args, **kwargs)
+    if deferred is None:
+        session.msg(prompt=_PROMPT)
+    else:
+        deferred.addBoth(lambda _: session.msg(prompt=_PROMPT))
@@ -0,0 +1,422 @@
+"""
+Metrics
+
+A small registry of runtime metrics for the Server and Portal, served in
+the Prometheus text exposition format from the local-only `/metrics` url
+on the Server's webserver port (`WEBSERVER_PORTS`, default
+http://127.0.0.1:4005/metrics). Every sample is labeled with the process
+(`server` or `portal`) it comes from; the Portal's metrics are fetched over
+AMP when the page is requested.
+
+Metrics are created with the `METRICS` registry and updated where the
+measured thing happens:
+
+```python
+from evennia.server.profiling.metrics import METRICS
+
+_MY_COUNTER = METRICS.counter("mygame_fights_total", "Number of fights started.", ("room",))
+
+_MY_COUNTER.inc(room="arena")
+```
+
+Counters only ever grow - use `rate()` in your monitoring to get per-second
+values. Gauges may be given a `func` to calculate their value only when the
+metrics are requested.
+
+Command and database-query metrics are only collected when the command
+profiler is active (see `COMMAND_PROFILING`).
+
+"""
+
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from twisted.application import service
+from twisted.internet import defer
+from twisted.internet.task import LoopingCall
+
+# upper bounds of histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    """
+    Format a sample value for the text exposition.
+
+    """
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(labels):
+    """
+    Format a label dict for the text exposition.
+
+    """
+    if not labels:
+        return ""
+    return "{%s}" % ",".join(
+        '%s="%s"' % (key, str(val).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, val in labels.items()
+    )
+
+
+class _Metric(object):
+    """
+    Base class for metrics.
+
+    """
+
+    mtype = "untyped"
+
+    def __init__(self, name, helptext, labelnames=(), func=None):
+        """
+        Args:
+            name (str): Name of metric, like `evennia_amp_messages_total`.
+            helptext (str): Short description of the metric.
+            labelnames (tuple, optional): Names of labels separating the
+                values of this metric.
+            func (callable, optional): If given, called without arguments
+                whenever the metric is collected. It should return a number,
+                or a dict `{(labelvalue, ...): number}` when `labelnames`
+                are given.
+
+        """
+        self.name = name
+        self.helptext = helptext
+        self.labelnames = tuple(labelnames)
+        self.func = func
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(labelname, "")) for labelname in self.labelnames)
+
+    def samples(self):
+        """
+        Get the current samples of this metric.
+
+        Returns:
+            samples (list): A list of `(samplename, {label: value}, value)`.
+
+        """
+        values = self.values
+        if self.func:
+            values = self.func()
+            if not isinstance(values, dict):
+                values = {(): values}
+        return [
+            (self.name, dict(zip(self.labelnames, key)), value)
+            for key, value in sorted(values.items())
+        ]
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up.
+
+    """
+
+    mtype = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        Increase the counter.
+
+        Args:
+            amount (int or float, optional): Amount to increase with.
+            **labels (str): Label values.
+
+        """
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down.
+
+    """
+
+    mtype = "gauge"
+
+    def set(self, value, **labels):
+        """
+        Set the gauge.
+
+        Args:
+            value (int or float): The new value.
+            **labels (str): Label values.
+
+        """
+        self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """
+    Counts observed values into buckets, for percentiles.
+
+    """
+
+    mtype = "histogram"
+
+    def __init__(self, name, helptext, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            name (str): Name of metric, like `evennia_command_duration_seconds`.
+            helptext (str): Short description of the metric.
+            labelnames (tuple, optional): Names of labels separating the
+                values of this metric.
+            buckets (tuple, optional): Sorted upper bounds of the buckets.
+
+        """
+        super().__init__(name, helptext, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        Record an observed value.
+
+        Args:
+            value (int or float): The value, like a duration in seconds.
+            **labels (str): Label values.
+
+        """
+        key = self._key(labels)
+        try:
+            counts, total = self.values[key]
+        except KeyError:
+            counts, total = [0] * (len(self.buckets) + 1), 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.values[key] = (counts, total + value)
+
+    def samples(self):
+        """
+        Get the current samples of this metric.
+
+        Returns:
+            samples (list): A list of `(samplename, {label: value}, value)`,
+                with the buckets' counts being cumulative.
+
+        """
+        samples = []
+        for key, (counts, total) in sorted(self.values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    (self.name + "_bucket", dict(labels, le=_format_value(bound)), cumulative)
+                )
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry(object):
+    """
+    Keeps track of all metrics in the process. Use the `METRICS`
+    singleton rather than creating new instances of this class.
+
+    """
+
+    def __init__(self):
+        self.metrics = OrderedDict()
+        self.collectors = []
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        if name not in self.metrics:
+            self.metrics[name] = metric_class(name, *args, **kwargs)
+        return self.metrics[name]
+
+    def counter(self, name, helptext, labelnames=(), func=None):
+        """
+        Get or create a Counter. See `_Metric` for the arguments.
+
+        """
+        return self._register(Counter, name, helptext, labelnames, func=func)
+
+    def gauge(self, name, helptext, labelnames=(), func=None):
+        """
+        Get or create a Gauge. See `_Metric` for the arguments.
+
+        """
+        return self._register(Gauge, name, helptext, labelnames, func=func)
+
+    def histogram(self, name, helptext, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Get or create a Histogram. See `Histogram` for the arguments.
+
+        """
+        return self._register(Histogram, name, helptext, labelnames, buckets=buckets)
+
+    def add_collector(self, collector):
+        """
+        Add a callable producing whole metric families on demand.
+
+        Args:
+            collector (callable): Called without arguments when metrics are
+                collected. Should return a list of families on the same form
+                as returned by `collect`.
+
+        """
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def collect(self, process=None):
+        """
+        Collect all metrics.
+
+        Args:
+            process (str, optional): If given, this is added as a `process`
+                label to all samples.
+
+        Returns:
+            families (list): A list of `(name, mtype, helptext, samples)`
+                where samples are `[(samplename, {label: value}, value), ...]`.
+
+        """
+        families = [
+            (metric.name, metric.mtype, metric.helptext, metric.samples())
+            for metric in self.metrics.values()
+        ]
+        for collector in self.collectors:
+            families.extend(collector())
+        if process:
+            families = [
+                (
+                    name,
+                    mtype,
+                    helptext,
+                    [
+                        (sname, dict(labels, process=process), value)
+                        for sname, labels, value in samples
+                    ],
+                )
+                for name, mtype, helptext, samples in families
+            ]
+        return families
+
+
+def format_metrics(*familylists):
+    """
+    Render metrics in the Prometheus text exposition format.
+
+    Args:
+        *familylists (list): Lists of families, as returned by `MetricsRegistry.collect`.
+            Same-name families from several lists (such as from different processes)
+            are rendered together.
+
+    Returns:
+        text (str): The metrics as text.
+
+    """
+    merged = OrderedDict()
+    for families in familylists:
+        for name, mtype, helptext, samples in families:
+            if name in merged:
+                merged[name][2].extend(samples)
+            else:
+                merged[name] = (mtype, helptext, list(samples))
+    lines = []
+    for name, (mtype, helptext, samples) in merged.items():
+        lines.append("# HELP %s %s" % (name, helptext))
+        lines.append("# TYPE %s %s" % (name, mtype))
+        for samplename, labels, value in samples:
+            lines.append("%s%s %s" % (samplename, _format_labels(labels), _format_value(value)))
+    return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def collect(process=None):
+    """
+    Collect this process' metrics. This is also called over AMP by the
+    Server to get the Portal's metrics.
+
+    Args:
+        process (str, optional): Added as a `process` label to all samples.
+
+    Returns:
+        families (list): See `MetricsRegistry.collect`.
+
+    """
+    return METRICS.collect(process=process)
+
+
+def collect_all():
+    """
+    Collect the metrics of both Server and Portal. Called on the Server.
+
+    Returns:
+        deferred (Deferred): Fires with the metrics as text. If the Portal
+            cannot be reached, only the Server's metrics are included.
+
+    """
+    from evennia.server.sessionhandler import SESSIONS
+
+    server_families = collect(process="server")
+    amp_protocol = SESSIONS.server.amp_protocol if SESSIONS.server else None
+    if not amp_protocol:
+        return defer.succeed(format_metrics(server_families))
+
+    def _portal_failed(failure):
+        from evennia.utils import logger
+
+        logger.log_err("Could not collect the Portal metrics: %s" % failure.getErrorMessage())
+        return []
+
+    return (
+        defer.maybeDeferred(amp_protocol.send_FunctionCall, __name__, "collect", process="portal")
+        .addErrback(_portal_failed)
+        .addCallback(lambda portal_families: format_metrics(server_families, portal_families or []))
+    )
+
+
+class ReactorLagMonitor(service.Service):
+    """
+    Measures how late the reactor is in running a repeating call. A
+    busy reactor (a long-running command, a slow database query) delays
+    all other events, making the game feel unresponsive.
+
+    """
+
+    name = "EvenniaReactorLagMonitor"
+
+    def __init__(self, interval=1.0):
+        """
+        Args:
+            interval (float): How often to measure, in seconds.
+
+        """
+        self.interval = interval
+        self.last = None
+        self.task = None
+        self.lag = METRICS.gauge(
+            "evennia_reactor_lag_last_seconds", "How late the reactor was for the last timed call."
+        )
+        self.lags = METRICS.histogram(
+            "evennia_reactor_lag_seconds", "How late the reactor was for timed calls."
+        )
+
+    def _measure(self):
+        now = time.time()
+        if self.last is not None:
+            lag = max(0.0, now - self.last - self.interval)
+            self.lag.set(lag)
+            self.lags.observe(lag)
+        self.last = now
+
+    def startService(self):
+        super().startService()
+        self.last = None
+        self.task = LoopingCall(self._measure)
+        self.task.start(self.interval, now=True)
+
+    def stopService(self):
+        super().stopService()
+        if self.task and self.task.running:
+            self.task.stop()
@@ -7,6 +7,7 @@ running dummyrunner, like this:
 Note that these mixin-settings are not suitable for production
 servers!
 """
+from evennia.settings_default import INPUT_FUNC_MODULES as _INPUT_FUNC_MODULES
 
 # the dummyrunner will check this variable to make sure
 # the mixin is present
@@ -17,3 +18,8 @@ DUMMYRUNNER_MIXIN = True
 PASSWORD_HASHERS = ("django.contrib.auth.hashers.MD5PasswordHasher",)
 # make dummy clients able to test all commands
 PERMISSION_ACCOUNT_DEFAULT = "Developer"
+# the server sends this prompt after every finished command. The
+# dummyrunner uses it to measure the latency of each command. Note that
+# this replaces any custom INPUT_FUNC_MODULES set before the mixin.
+DUMMYRUNNER_PROMPT = "<dummyrunner>"
+INPUT_FUNC_MODULES = _INPUT_FUNC_MODULES + ["evennia.server.profiling.inputfuncs"]
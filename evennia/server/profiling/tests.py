@@ -1,6 +1,13 @@
 from django.test import TestCase
 from mock import Mock, patch, mock_open
+from twisted.internet import defer
+from twisted.trial.unittest import TestCase as TwistedTestCase
+from . import ampbench, amptransportbench, dummyrunner, tracing
+from .cmdprofiler import CommandProfiler
+from .metrics import MetricsRegistry, format_metrics
 from .dummyrunner_settings import (
+    SCENARIOS,
+    c_chats,
     c_creates_button,
     c_creates_obj,
     c_digs,
@@ -14,6 +21,7 @@ from .dummyrunner_settings import (
     c_moves,
     c_moves_n,
     c_moves_s,
+    c_says,
     c_socialize,
 )
 
@@ -139,6 +147,257 @@ class TestDummyrunnerSettings(TestCase):
     def test_c_move_s(self):
         self.assertEqual(c_moves_s(self.client), "south")
 
+    def test_c_says(self):
+        self.client.key = "Dummy-1"
+        self.assertEqual(c_says(self.client), ("say Hello from Dummy-1!", "emote waves.", "look"))
+
+    def test_c_chats(self):
+        self.client.key = "Dummy-1"
+        self.assertEqual(c_chats(self.client), ("pub Hello from Dummy-1!", "pub Testing ... 1"))
+
+    def test_scenarios(self):
+        for name, scenario in SCENARIOS.items():
+            self.assertTrue(len(scenario["actions"]) > 2, name)
+
+
+class TestDummyrunner(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(dummyrunner.percentile(values, 50), 50)
+        self.assertEqual(dummyrunner.percentile(values, 95), 95)
+        self.assertEqual(dummyrunner.percentile(values, 99), 99)
+        self.assertEqual(dummyrunner.percentile([3], 99), 3)
+        self.assertEqual(dummyrunner.percentile([], 50), None)
+
+    def test_latency_stats(self):
+        stats = dummyrunner.LatencyStats()
+        for latency in (0.1, 0.2, 0.3, 0.4):
+            stats.sent()
+            stats.add("look", latency)
+        stats.add("say", 1.0)
+        report = stats.report(seed="1", scenario="test")
+        self.assertEqual(report["seed"], "1")
+        self.assertEqual(report["commands_sent"], 4)
+        self.assertEqual(report["commands_completed"], 5)
+        self.assertEqual(report["latency"]["look"]["count"], 4)
+        self.assertAlmostEqual(report["latency"]["look"]["p50"], 200.0)
+        self.assertAlmostEqual(report["latency"]["look"]["max"], 400.0)
+        self.assertAlmostEqual(report["latency"]["all"]["p99"], 1000.0)
+
+    @patch("evennia.server.profiling.dummyrunner.reactor", new=Mock())
+    @patch("evennia.server.profiling.dummyrunner.STATS")
+    def test_client_prompts(self, mock_stats):
+        client = dummyrunner.DummyClient()
+        client.factory = Mock(actions=[Mock(), Mock()])
+        client.transport = Mock()
+        client.connectionMade()
+        client.send_command("look here")
+        client.send_command("say foo")
+        prompt = dummyrunner.PROMPT
+        client.check_prompts("You see nothing.\n" + prompt[:3])
+        mock_stats.add.assert_not_called()
+        client.check_prompts(prompt[3:] + "You say foo." + prompt)
+        self.assertEqual([call[0][0] for call in mock_stats.add.call_args_list], ["look", "say"])
+
+    @patch("evennia.server.profiling.dummyrunner.reactor", new=Mock())
+    @patch("evennia.server.profiling.dummyrunner.idcounter", new=Mock(return_value="1"))
+    @patch("evennia.server.profiling.dummyrunner.SEED", new="1")
+    def test_seeded_clients(self):
+        rands = []
+        for _ in range(2):
+            client = dummyrunner.DummyClient()
+            client.factory = Mock(actions=[Mock(), Mock()])
+            client.connectionMade()
+            rands.append([client.random.random() for _ in range(5)])
+        self.assertEqual(rands[0], rands[1])
+
+
+class TestTracing(TestCase):
+    def setUp(self):
+        tracing.clear_traces()
+
+    def tearDown(self):
+        tracing.clear_traces()
+
+    @patch("evennia.server.profiling.tracing._SAMPLE_RATE", new=0.0)
+    def test_start_trace_disabled(self):
+        self.assertEqual(tracing.start_trace(), None)
+
+    @patch("evennia.server.profiling.tracing._SAMPLE_RATE", new=1.0)
+    def test_start_trace(self):
+        trace_id = tracing.start_trace()
+        self.assertTrue(trace_id)
+        self.assertNotEqual(trace_id, tracing.start_trace())
+
+    @patch("evennia.server.profiling.tracing._BUFFER_SIZE", new=2)
+    def test_ring_buffer(self):
+        for trace_id in ("a", "b", "c"):
+            tracing.stamp(trace_id, "portal.data_in")
+        tracing.stamp("c", "portal.amp_send")
+        traces = tracing.get_traces()
+        self.assertEqual([trace[0] for trace in traces], ["b", "c"])
+        self.assertEqual([hop[0] for hop in traces[1][1]], ["portal.data_in", "portal.amp_send"])
+        self.assertEqual([trace[0] for trace in tracing.get_traces(1)], ["c"])
+
+    def test_active(self):
+        session = Mock(spec=[])
+        self.assertEqual(tracing.get_active(session), None)
+        tracing.set_active(session, "a")
+        self.assertEqual(tracing.get_active(session), "a")
+        self.assertEqual(tracing.get_active(None), None)
+
+    def test_merge_and_chrome_trace(self):
+        portal = [("a", [("portal.data_in", 1.0), ("portal.protocol_write", 1.5)])]
+        server = [("a", [("server.cmdhandler", 1.2)]), ("b", [("server.cmdhandler", 0.5)])]
+        traces = tracing.merge_traces(portal, server)
+        self.assertEqual([trace[0] for trace in traces], ["b", "a"])
+        self.assertEqual(
+            [hop[0] for hop in traces[1][1]],
+            ["portal.data_in", "server.cmdhandler", "portal.protocol_write"],
+        )
+        events = tracing.to_chrome_trace(traces)["traceEvents"]
+        spans = [event for event in events if event["ph"] == "X"]
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(spans[0]["name"], "portal.data_in -> server.cmdhandler")
+        self.assertAlmostEqual(spans[0]["dur"], 0.2e6)
+        processes = [event["args"]["name"] for event in events if event["name"] == "process_name"]
+        self.assertEqual(sorted(processes), ["portal", "server"])
+
+    def test_fetch_traces_portal_failed(self):
+        tracing.stamp("a", "server.cmdhandler")
+        amp_protocol = Mock()
+        amp_protocol.send_FunctionCall.side_effect = TypeError("bad argument")
+        with patch(
+            "evennia.server.sessionhandler.SESSIONS.server", Mock(amp_protocol=amp_protocol)
+        ):
+            with patch("evennia.utils.logger.log_err") as mock_log_err:
+                result = []
+                tracing.fetch_traces().addCallback(result.append)
+        self.assertEqual([trace[0] for trace in result[0]], ["a"])
+        mock_log_err.assert_called_once()
+
+
+class TestCommandProfiler(TestCase):
+    def setUp(self):
+        self.profiler = CommandProfiler()
+
+    def tearDown(self):
+        self.profiler.stop()
+
+    def test_record(self):
+        cmd = Mock()
+        self.profiler.record(cmd, 0.5, merge_time=0.1, nqueries=2)
+        self.profiler.record(cmd, 1.5, merge_time=0.1, nqueries=4)
+        stat = self.profiler.get_stats()[0]
+        self.assertEqual(stat["command"], "mock.mock.Mock")
+        self.assertEqual(stat["calls"], 2)
+        self.assertEqual(stat["total"], 2.0)
+        self.assertEqual(stat["mean"], 1.0)
+        self.assertEqual(stat["max"], 1.5)
+        self.assertEqual(stat["queries"], 6)
+        self.assertAlmostEqual(stat["merge"], 0.2)
+        self.assertIn(
+            'evennia_command_calls_total{command="mock.mock.Mock"} 2',
+            format_metrics(self.profiler.collect()),
+        )
+        self.profiler.reset()
+        self.assertEqual(self.profiler.get_stats(), [])
+
+    def test_count_queries(self):
+        from evennia.objects.models import ObjectDB
+
+        self.profiler.start()
+        list(ObjectDB.objects.all())
+        self.assertEqual(self.profiler.query_count, 1)
+        self.profiler.stop()
+        list(ObjectDB.objects.all())
+        self.assertEqual(self.profiler.query_count, 1)
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge(self):
+        counter = self.registry.counter("test_total", "A counter.", ("direction",))
+        self.assertEqual(self.registry.counter("test_total", "Again."), counter)
+        counter.inc(direction="in")
+        counter.inc(10, direction="in")
+        counter.inc(direction='o"ut')
+        self.registry.gauge("test_func", "A gauge.", func=lambda: 3)
+        text = format_metrics(self.registry.collect(process="server"))
+        self.assertIn("# HELP test_total A counter.\n# TYPE test_total counter\n", text)
+        self.assertIn('test_total{direction="in",process="server"} 11\n', text)
+        self.assertIn('test_total{direction="o\\"ut",process="server"} 1\n', text)
+        self.assertIn('test_func{process="server"} 3\n', text)
+
+    def test_histogram(self):
+        histogram = self.registry.histogram("test_seconds", "A histogram.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        text = format_metrics(self.registry.collect())
+        self.assertIn('test_seconds_bucket{le="0.1"} 2\n', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 3\n', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn("test_seconds_sum 2.65\n", text)
+        self.assertIn("test_seconds_count 4\n", text)
+
+    def test_merge_processes(self):
+        self.registry.counter("test_total", "A counter.").inc()
+        text = format_metrics(
+            self.registry.collect(process="server"), self.registry.collect(process="portal")
+        )
+        self.assertEqual(text.count("# TYPE test_total counter"), 1)
+        self.assertIn('test_total{process="portal"} 1', text)
+
+    @patch("evennia.server.profiling.metrics.METRICS")
+    def test_reactor_lag(self, mock_metrics):
+        from .metrics import ReactorLagMonitor
+
+        monitor = ReactorLagMonitor(interval=1.0)
+        with patch("evennia.server.profiling.metrics.time") as mock_time:
+            mock_time.time.return_value = 10.0
+            monitor._measure()
+            mock_time.time.return_value = 11.5
+            monitor._measure()
+        monitor.lag.set.assert_called_with(0.5)
+        monitor.lags.observe.assert_called_once_with(0.5)
+
+    @patch("evennia.server.profiling.metrics.METRICS")
+    def test_collect_all_over_amp(self, mock_metrics):
+        from evennia.utils.test_resources import connect_amp
+        from . import metrics
+
+        mock_metrics.collect = self.registry.collect
+        self.registry.gauge("test_func", "A gauge.", func=lambda: 3)
+        server, portal, pump = connect_amp()
+        with patch("evennia.server.sessionhandler.SESSIONS.server", Mock(amp_protocol=server)):
+            result = []
+            metrics.collect_all().addCallback(result.append)
+        pump.flush()
+        text = result[0]
+        self.assertIn('test_func{process="server"} 3\n', text)
+        self.assertIn('test_func{process="portal"} 3\n', text)
+
+    @patch("evennia.server.profiling.metrics.METRICS")
+    def test_collect_all_portal_failed(self, mock_metrics):
+        from . import metrics
+
+        mock_metrics.collect = self.registry.collect
+        self.registry.gauge("test_func", "A gauge.", func=lambda: 3)
+        amp_protocol = Mock()
+        amp_protocol.send_FunctionCall.side_effect = TypeError("bad argument")
+        with patch(
+            "evennia.server.sessionhandler.SESSIONS.server", Mock(amp_protocol=amp_protocol)
+        ):
+            with patch("evennia.utils.logger.log_err") as mock_log_err:
+                result = []
+                metrics.collect_all().addCallback(result.append)
+        text = result[0]
+        self.assertIn('test_func{process="server"} 3\n', text)
+        self.assertNotIn('process="portal"', text)
+        mock_log_err.assert_called_once()
+
 
 class TestMemPlot(TestCase):
     @patch.object(memplot, "_idmapper")
@@ -160,3 +419,26 @@ class TestMemPlot(TestCase):
         handle = mocked_open()
         handle.write.assert_called_with("100.0, 0.001, 0.001, 9\n")
         script.stop()
+
+
+class TestAMPBench(TestCase):
+    def test_run(self):
+        traffic = ampbench.make_traffic(50, seed=1)
+        self.assertEqual(traffic, ampbench.make_traffic(50, seed=1))
+        for codec in ampbench.CODECS:
+            result = ampbench.run(codec, traffic)
+            self.assertGreater(result["bytes_per_message"], 0)
+
+
+class TestAMPTransportBench(TwistedTestCase):
+    def test_run(self):
+        traffic = ampbench.make_traffic(50, seed=1)
+        deferreds = []
+        for transport in amptransportbench.TRANSPORTS:
+            deferred = amptransportbench.run(transport, traffic, window=10)
+            deferred.addCallback(lambda result: self.assertGreater(result["mb_per_second"], 0))
+            deferreds.append(deferred)
+        return defer.gatherResults(deferreds)
+
+    def test_unknown_transport(self):
+        return self.assertFailure(amptransportbench.run("carrier-pigeon", []), ValueError)
@@ -0,0 +1,297 @@
+"""
+Message tracing
+
+This follows a sampled subset of incoming messages on their full round-trip
+through Evennia, time-stamping them at every hop:
+
+    portal.data_in -> portal.amp_send -> server.amp_receive ->
+    server.cmdhandler -> server.cmdset_merge -> server.cmd_parse ->
+    server.msg -> server.amp_send -> portal.amp_receive ->
+    portal.protocol_write ... -> server.cmd_func
+
+Tracing is turned off by default. Set `MESSAGE_TRACE_SAMPLE_RATE` to a value
+between 0 and 1 to trace that fraction of all incoming messages. The Portal
+decides if a message should be traced and tags it with a trace-id. Only this
+id travels across the AMP connection; each process keeps its own time stamps
+in a fixed-size ring buffer (`MESSAGE_TRACE_BUFFER_SIZE` traces) and the two
+halves are merged by id when the traces are inspected. Server output sent to
+the traced session while the traced input is being handled carries the same
+id back to the Portal. Note that output from commands that pause (such as
+by yielding inside `func`) will only be traced up until the first pause.
+
+Inspect traces in-game with the `traces` command, or dump them as a
+Chrome trace-event JSON file (load it in chrome://tracing or
+https://ui.perfetto.dev) with `traces/dump`.
+
+"""
+
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+
+_SAMPLE_RATE = float(settings.MESSAGE_TRACE_SAMPLE_RATE)
+_BUFFER_SIZE = max(1, int(settings.MESSAGE_TRACE_BUFFER_SIZE))
+
+# the key carrying the trace-id in the kwargs sent across AMP
+TRACE_KEY = "_trace"
+
+# {trace_id: [(hop, timestamp), ...]}, oldest trace first
+_TRACES = OrderedDict()
+
+
+def start_trace():
+    """
+    Decide if a new incoming message should be traced.
+
+    Returns:
+        trace_id (str or None): A new, unique trace-id if the message
+            was sampled, otherwise `None`.
+
+    """
+    if _SAMPLE_RATE <= 0 or random.random() >= _SAMPLE_RATE:
+        return None
+    return uuid.uuid4().hex[:16]
+
+
+def stamp(trace_id, hop):
+    """
+    Time-stamp a traced message as it passes a hop.
+
+    Args:
+        trace_id (str): The id of the trace.
+        hop (str): Name of the point the message just reached, on the
+            form `process.location`, like `server.cmdhandler`.
+
+    """
+    try:
+        _TRACES[trace_id].append((hop, time.time()))
+    except KeyError:
+        _TRACES[trace_id] = [(hop, time.time())]
+        while len(_TRACES) > _BUFFER_SIZE:
+            _TRACES.popitem(last=False)
+
+
+def set_active(session, trace_id):
+    """
+    Mark a trace as belonging to the input currently being processed
+    for a Session. Output sent to this Session will carry the trace along.
+
+    Args:
+        session (Session): The session that sent the input.
+        trace_id (str or None): The trace-id or `None` if the current
+            input is not traced.
+
+    """
+    session.trace_id = trace_id
+
+
+def get_active(session):
+    """
+    Get the trace of the input currently being processed for a Session.
+
+    Args:
+        session (Session or None): The session to check.
+
+    Returns:
+        trace_id (str or None): The active trace-id, if any.
+
+    """
+    return getattr(session, "trace_id", None)
+
+
+def get_traces(num=None):
+    """
+    Get the traces stored in this process. This is also called
+    over AMP by the Server to get the Portal's half of the traces.
+
+    Args:
+        num (int, optional): Only return the `num` latest traces.
+
+    Returns:
+        traces (list): A list `[(trace_id, [(hop, timestamp), ...]), ...]`,
+            oldest trace first.
+
+    """
+    traces = [(trace_id, list(hops)) for trace_id, hops in _TRACES.items()]
+    if num is not None:
+        traces = traces[-num:] if num > 0 else []
+    return traces
+
+
+def clear_traces():
+    """
+    Empty this process' trace buffer.
+
+    Returns:
+        nclear (int): The number of traces removed.
+
+    """
+    nclear = len(_TRACES)
+    _TRACES.clear()
+    return nclear
+
+
+def merge_traces(*tracelists):
+    """
+    Merge the partial traces from several processes.
+
+    Args:
+        *tracelists (list): Lists of traces as returned by `get_traces`.
+
+    Returns:
+        traces (list): A list `[(trace_id, [(hop, timestamp), ...]), ...]`
+            with each trace's hops sorted by time and the traces sorted
+            by their first hop.
+
+    """
+    merged = {}
+    for tracelist in tracelists:
+        for trace_id, hops in tracelist:
+            merged.setdefault(trace_id, []).extend(tuple(hop) for hop in hops)
+    traces = [(trace_id, sorted(hops, key=lambda hop: hop[1])) for trace_id, hops in merged.items()]
+    return sorted(traces, key=lambda trace: trace[1][0][1] if trace[1] else 0)
+
+
+def _call_portal(functionname):
+    """
+    Call a function of this module in the Portal.
+
+    Args:
+        functionname (str): Name of the function to call.
+
+    Returns:
+        deferred (Deferred): Fires with the result of the call, or with
+            `None` if the Portal could not be reached.
+
+    """
+    from twisted.internet import defer
+    from evennia.server.sessionhandler import SESSIONS
+
+    amp_protocol = SESSIONS.server.amp_protocol if SESSIONS.server else None
+    if not amp_protocol:
+        return defer.succeed(None)
+
+    def _failed(failure):
+        from evennia.utils import logger
+
+        logger.log_err(
+            "Could not call %s in the Portal: %s" % (functionname, failure.getErrorMessage())
+        )
+
+    return defer.maybeDeferred(amp_protocol.send_FunctionCall, __name__, functionname).addErrback(
+        _failed
+    )
+
+
+def clear_all_traces():
+    """
+    Clear the traces of both Server and Portal. Called on the Server.
+
+    Returns:
+        nclear (int): The number of Server traces that were cleared.
+
+    """
+    _call_portal("clear_traces")
+    return clear_traces()
+
+
+def fetch_traces(num=None):
+    """
+    Gather the traces from both Server and Portal. Called on the Server.
+
+    Args:
+        num (int, optional): Only return the `num` latest traces.
+
+    Returns:
+        deferred (Deferred): Fires with the merged traces (see `merge_traces`).
+            If the Portal cannot be reached, only the Server's traces are
+            included.
+
+    """
+    server_traces = get_traces()
+
+    def _merge(portal_traces):
+        traces = merge_traces(server_traces, portal_traces or [])
+        if num is not None:
+            traces = traces[-num:] if num > 0 else []
+        return traces
+
+    return _call_portal("get_traces").addCallback(_merge)
+
+
+def to_chrome_trace(traces):
+    """
+    Convert traces to the Chrome trace-event format.
+
+    Args:
+        traces (list): Merged traces, as returned from `merge_traces`.
+
+    Returns:
+        trace_events (dict): A JSON-serializable dict. Each trace becomes
+            its own thread, with one span per hop-to-hop leg and instant
+            events marking the hops themselves. The process is taken from
+            the hop-name prefix (`portal` or `server`).
+
+    """
+    events = []
+    pids = {}
+    threads = set()
+    for tid, (trace_id, hops) in enumerate(traces):
+        for ihop, (hop, timestamp) in enumerate(hops):
+            process = hop.split(".", 1)[0]
+            pid = pids.setdefault(process, len(pids))
+            if (pid, tid) not in threads:
+                threads.add((pid, tid))
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": tid,
+                        "args": {"name": trace_id},
+                    }
+                )
+            ts = timestamp * 1e6
+            events.append(
+                {
+                    "name": hop,
+                    "ph": "i",
+                    "s": "t",
+                    "ts": ts,
+                    "pid": pid,
+                    "tid": tid,
+                    "cat": trace_id,
+                }
+            )
+            if ihop + 1 < len(hops):
+                nexthop, nexttime = hops[ihop + 1]
+                events.append(
+                    {
+                        "name": "%s -> %s" % (hop, nexthop),
+                        "ph": "X",
+                        "ts": ts,
+                        "dur": (nexttime - timestamp) * 1e6,
+                        "pid": pid,
+                        "tid": tid,
+                        "cat": trace_id,
+                    }
+                )
+    for process, pid in pids.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def dump_chrome_trace(traces, filename):
+    """
+    Write traces to a Chrome trace-event JSON file.
+
+    Args:
+        traces (list): Merged traces, as returned from `merge_traces`.
+        filename (str): Path to the file to write.
+
+    """
+    with open(filename, "w") as fil:
+        json.dump(to_chrome_trace(traces), fil)
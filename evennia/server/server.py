@@ -12,7 +12,7 @@ import sys
 import os
 
 from twisted.web import static
-from twisted.application import internet, service
+from twisted.application import service
 from twisted.internet import reactor, defer
 from twisted.internet.task import LoopingCall
 from twisted.python.log import ILogObserver
@@ -37,6 +37,7 @@ from evennia.utils.utils import get_evennia_version, mod_import, make_iter
 from evennia.utils import logger
 from evennia.comms import channelhandler
 from evennia.server.sessionhandler import SESSIONS
+from evennia.server.profiling.metrics import METRICS, ReactorLagMonitor
 
 from django.utils.translation import gettext as _
 
@@ -107,6 +108,26 @@ _GAMETIME_MODULE = None
 _IDLE_TIMEOUT = settings.IDLE_TIMEOUT
 
 
+def _sessions_per_protocol():
+    """
+    Metric callback counting the sessions connected with each protocol.
+    """
+    counts = {}
+    for session in SESSIONS.values():
+        key = (session.protocol_key,)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _idmapper_cache_size():
+    """
+    Metric callback counting the cached database entities of each type.
+    """
+    from evennia.utils.idmapper.models import cache_size
+
+    return {(name,): num for name, num in cache_size()[1].items()}
+
+
 def _server_maintenance():
     """
     This maintenance function handles repeated checks and updates that
@@ -196,6 +217,20 @@ class Evennia(object):
 
         self.start_time = time.time()
 
+        # runtime metrics, see evennia.server.profiling.metrics
+        METRICS.gauge(
+            "evennia_sessions",
+            "Connected sessions per protocol.",
+            ("protocol",),
+            func=_sessions_per_protocol,
+        )
+        METRICS.gauge(
+            "evennia_idmapper_cache_size",
+            "Cached database entities per type.",
+            ("model",),
+            func=_idmapper_cache_size,
+        )
+
         # initialize channelhandler
         channelhandler.CHANNELHANDLER.update()
 
@@ -371,6 +406,12 @@ class Evennia(object):
 
         # call correct server hook based on start file value
         if mode == "reload":
+            # fill the caches before the sessions resume
+            from evennia.server.warmstart import load_snapshot
+
+            nloaded = load_snapshot()
+            if nloaded:
+                logger.log_msg("Warm start: loaded %i objects in use before the reload." % nloaded)
             logger.log_msg("Server successfully reloaded.")
             self.at_server_reload_start()
         elif mode == "reset":
@@ -417,12 +458,18 @@ class Evennia(object):
             ServerConfig.objects.conf("server_restart_mode", "reload")
             yield [o.at_server_reload() for o in ObjectDB.get_all_cached_instances()]
             yield [p.at_server_reload() for p in AccountDB.get_all_cached_instances()]
+            # Scripts on the shared timer are not paused; their timers are
+            # saved by the script scheduler instead
             yield [
-                (s.pause(manual_pause=False), s.at_server_reload())
+                (s.shared_timer or s.pause(manual_pause=False), s.at_server_reload())
                 for s in ScriptDB.get_all_cached_instances()
                 if s.id and (s.is_active or s.attributes.has("_manual_pause"))
             ]
             yield self.sessions.all_sessions_portal_sync()
+            # record the objects in use, to load them quickly on start
+            from evennia.server.warmstart import save_snapshot
+
+            save_snapshot()
             self.at_server_reload_stop()
             # only save monitor state on reload, not on shutdown/reset
             from evennia.scripts.monitorhandler import MONITOR_HANDLER
@@ -445,7 +492,8 @@ class Evennia(object):
                 yield ObjectDB.objects.clear_all_sessids()
             yield [
                 (
-                    s.pause(manual_pause=s.attributes.get("_manual_pause", False)),
+                    s.shared_timer
+                    or s.pause(manual_pause=s.attributes.get("_manual_pause", False)),
                     s.at_server_shutdown(),
                 )
                 for s in ScriptDB.get_all_cached_instances()
@@ -458,12 +506,26 @@ class Evennia(object):
 
         TICKER_HANDLER.save()
 
+        # as should the timers of the Scripts on the shared timer
+        from evennia.scripts.scheduler import SCRIPT_SCHEDULER
+
+        SCRIPT_SCHEDULER.save()
+
+        # and the current nodes of persistent menus
+        from evennia.utils.evmenu import save_menus
+
+        save_menus()
+
         # always called, also for a reload
         self.at_server_stop()
 
         if hasattr(self, "web_root"):  # not set very first start
             yield self.web_root.empty_threadpool()
 
+        # stop the worker processes of the process pool, if it was used
+        if "evennia.utils.procpool" in sys.modules:
+            sys.modules["evennia.utils.procpool"].PROCPOOL.shutdown()
+
         if not _reactor_stopping:
             # kill the server
             self.shutdown_complete = True
@@ -523,6 +585,11 @@ class Evennia(object):
         # (this also starts any that didn't yet start)
         ScriptDB.objects.validate(init_mode=mode)
 
+        # resume the Scripts on the shared timer, which validate skips
+        from evennia.scripts.scheduler import SCRIPT_SCHEDULER
+
+        SCRIPT_SCHEDULER.restore()
+
         # start the task handler
         from evennia.scripts.taskhandler import TASK_HANDLER
 
@@ -627,6 +694,9 @@ if "--nodaemon" not in sys.argv:
 # and is where we store all the other services.
 EVENNIA = Evennia(application)
 
+# measure how responsive the reactor is, for the runtime metrics
+EVENNIA.services.addService(ReactorLagMonitor())
+
 if AMP_ENABLED:
 
     # The AMP protocol handles the communication between
@@ -637,12 +707,17 @@ if AMP_ENABLED:
     if AMP_INTERFACE != "127.0.0.1":
         ifacestr = "-%s" % AMP_INTERFACE
 
-    INFO_DICT["amp"] = "amp %s: %s" % (ifacestr, AMP_PORT)
-
     from evennia.server import amp_client
+    from evennia.server.portal import amp
+
+    unix_socket = amp.get_unix_socket()
+    if unix_socket:
+        INFO_DICT["amp"] = "amp: %s" % unix_socket
+    else:
+        INFO_DICT["amp"] = "amp %s: %s" % (ifacestr, AMP_PORT)
 
     factory = amp_client.AMPClientFactory(EVENNIA)
-    amp_service = internet.TCPClient(AMP_HOST, AMP_PORT, factory)
+    amp_service = factory.make_service(AMP_HOST, AMP_PORT, unix_socket=unix_socket)
     amp_service.setName("ServerAMPClient")
     EVENNIA.services.addService(amp_service)
 
@@ -656,6 +731,7 @@ if WEBSERVER_ENABLED:
         Website,
         LockableThreadPool,
         PrivateStaticRoot,
+        MetricsResource,
     )
 
     # start a thread pool and define the root url (/) as a wsgi resource
@@ -670,6 +746,8 @@ if WEBSERVER_ENABLED:
     web_root.putChild(b"media", PrivateStaticRoot(settings.MEDIA_ROOT))
     # point our static resources to url /static
     web_root.putChild(b"static", PrivateStaticRoot(settings.STATIC_ROOT))
+    # runtime statistics at /metrics, only for requests from localhost
+    web_root.putChild(b"metrics", MetricsResource())
     EVENNIA.web_root = web_root
 
     if WEB_PLUGINS_MODULE:
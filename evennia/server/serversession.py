@@ -21,6 +21,7 @@ _GA = object.__getattribute__
 _SA = object.__setattr__
 _ObjectDB = None
 _ANSI = None
+_EVMENU = None
 
 # i18n
 from django.utils.translation import gettext as _
@@ -238,6 +239,11 @@ class ServerSession(Session):
         Hook called by sessionhandler when disconnecting this session.
 
         """
+        global _EVMENU
+        if not _EVMENU:
+            from evennia.utils import evmenu as _EVMENU
+        # don't wait with saving the state of persistent menus
+        _EVMENU.save_menus()
         if self.logged_in:
             account = self.account
             if self.puppet:
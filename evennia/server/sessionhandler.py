@@ -27,6 +27,7 @@ from evennia.utils.utils import (
 from evennia.server.signals import SIGNAL_ACCOUNT_POST_LOGIN, SIGNAL_ACCOUNT_POST_LOGOUT
 from evennia.server.signals import SIGNAL_ACCOUNT_POST_FIRST_LOGIN, SIGNAL_ACCOUNT_POST_LAST_LOGOUT
 from evennia.utils.inlinefuncs import parse_inlinefunc
+from evennia.server.profiling import tracing
 from codecs import decode as codecs_decode
 
 _INLINEFUNC_ENABLED = settings.INLINEFUNC_ENABLED
@@ -40,6 +41,9 @@ _OOB_HANDLER = None
 
 _ERR_BAD_UTF8 = "Your client sent an incorrect UTF-8 sequence."
 
+# send-kwarg values that need no converting for the AMP wire
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
 
 class DummySession(object):
     sessid = 0
@@ -189,6 +193,11 @@ class SessionHandler(dict):
                 send-safe entities (strings or numbers), and inlinefuncs have been
                 applied.
 
+        Notes:
+            Plain texts and `[text or [texts], {kwargs}]` with only `str`, number,
+            bool or `None` values (the common case of most outgoing text and of
+            most client input) are passed on without walking them recursively.
+
         """
         options = kwargs.pop("options", None) or {}
         raw = options.get("raw", False)
@@ -236,8 +245,54 @@ class SessionHandler(dict):
             else:
                 return data
 
+        parse_inline = _INLINEFUNC_ENABLED and not raw and isinstance(self, ServerSessionHandler)
+
+        def _text(data):
+            "Helper function to convert a plain text"
+            if type(data) is bytes:
+                data = _utf8(data)
+            if parse_inline:
+                data = str(parse_inlinefunc(data, strip=strip_inlinefunc, session=session))
+            return data
+
+        def _clean(data):
+            """
+            Helper function for the common case of data being a plain text or
+            [text or [texts], {kwargs}] with plain values. Returns None for
+            other data, which must be validated.
+
+            """
+            dtype = type(data)
+            if dtype is str or dtype is bytes:
+                return [[_text(data)], {}]
+            if (dtype is list or dtype is tuple) and len(data) == 2 and type(data[1]) is dict:
+                args, dkwargs = data
+                atype = type(args)
+                if atype is str or atype is bytes:
+                    args = [_text(args)]
+                elif (atype is list or atype is tuple) and all(type(arg) is str for arg in args):
+                    args = [_text(arg) for arg in args]
+                else:
+                    return None
+                if all(type(val) in _PLAIN_TYPES for val in dkwargs.values()):
+                    return [
+                        args,
+                        {
+                            dkey: _text(val) if type(val) is str else val
+                            for dkey, val in dkwargs.items()
+                        },
+                    ]
+            return None
+
         rkwargs = {}
         for key, data in kwargs.items():
+            if data and type(key) is str:
+                # fast path, skipping validation of already plain data
+                cleaned = _clean(data)
+                if cleaned:
+                    cleaned[1]["options"] = options
+                    rkwargs[key] = cleaned
+                    continue
             key = _validate(key)
             if not data:
                 if key == "text":
@@ -796,8 +851,14 @@ class ServerSessionHandler(SessionHandler):
             The outdata will be scrubbed for sending across
             the wire here.
         """
+        trace_id = tracing.get_active(session)
+        if trace_id:
+            tracing.stamp(trace_id, "server.msg")
+
         # clean output for sending
         kwargs = self.clean_senddata(session, kwargs)
+        if trace_id:
+            kwargs[tracing.TRACE_KEY] = trace_id
 
         # send across AMP
         self.server.amp_protocol.send_MsgServer2Portal(session, **kwargs)
@@ -7,6 +7,8 @@ import pickle
 from model_mommy import mommy
 from unittest import TestCase
 from mock import MagicMock, patch
+from django.test import override_settings
+from twisted.application import internet
 from twisted.trial.unittest import TestCase as TwistedTestCase
 from evennia.server import amp_client
 from evennia.server.portal import amp_server
@@ -124,3 +126,50 @@ class TestAMPClientRecv(_TestAMP):
         self.server.sessions.portal_disconnect_all = MagicMock()
         self.amp_client.dataReceived(wire_data)
         self.server.sessions.portal_disconnect_all.assert_called()
+
+
+class TestAMPTransport(_TestAMP):
+    """Test choosing the transport between Portal and Server"""
+
+    def test_get_unix_socket(self):
+        with override_settings(AMP_UNIX_SOCKET=None):
+            self.assertIsNone(amp.get_unix_socket())
+        with override_settings(AMP_UNIX_SOCKET="server/amp.sock", GAME_DIR="/game"):
+            self.assertEqual(amp.get_unix_socket(), "/game/server/amp.sock")
+        with override_settings(AMP_UNIX_SOCKET="/tmp/amp.sock", GAME_DIR="/game"):
+            self.assertEqual(amp.get_unix_socket(), "/tmp/amp.sock")
+
+    def test_server_services(self):
+        services = self.amp_server_factory.make_services(4006, "127.0.0.1")
+        self.assertEqual(len(services), 1)
+        self.assertIsInstance(services[0], internet.TCPServer)
+        self.assertEqual(services[0].args, (4006, self.amp_server_factory))
+
+        tcp, unix = self.amp_server_factory.make_services(
+            4006, "127.0.0.1", unix_socket="/game/server/amp.sock"
+        )
+        self.assertIsInstance(tcp, internet.TCPServer)
+        self.assertIsInstance(unix, internet.UNIXServer)
+        self.assertEqual(unix.args, ("/game/server/amp.sock", self.amp_server_factory))
+        self.assertTrue(unix.kwargs["wantPID"])
+
+    def test_client_service(self):
+        service = self.amp_client_factory.make_service("localhost", 4006)
+        self.assertIsInstance(service, internet.TCPClient)
+        self.assertEqual(service.args, ("localhost", 4006, self.amp_client_factory))
+
+        service = self.amp_client_factory.make_service(
+            "localhost", 4006, unix_socket="/game/server/amp.sock"
+        )
+        self.assertIsInstance(service, internet.UNIXClient)
+        self.assertEqual(service.args, ("/game/server/amp.sock", self.amp_client_factory))
+
+    def test_tcp_nodelay(self):
+        transport = MagicMock()
+        self.amp_client.makeConnection(transport)
+        transport.setTcpNoDelay.assert_called_with(True)
+
+        transport = MagicMock()
+        transport.setTcpNoDelay.side_effect = OSError
+        self.amp_server.makeConnection(transport)
+        self.assertIn(self.amp_server, self.amp_server_factory.broadcasts)
@@ -5,6 +5,8 @@ Testing various individual functionalities in the server package.
 
 """
 import unittest
+from mock import Mock
+from twisted.web.server import NOT_DONE_YET
 from django.test import TestCase
 
 from evennia.server.validators import EvenniaPasswordValidator
@@ -13,6 +15,7 @@ from evennia.utils.test_resources import EvenniaTest
 from django.test.runner import DiscoverRunner
 
 from evennia.server.throttle import Throttle
+from evennia.server.webserver import MetricsResource
 
 from ..deprecations import check_errors
 
@@ -124,3 +127,52 @@ class ThrottleTest(EvenniaTest):
 
         # There should only be (cache_size * num_ips) total in the Throttle cache
         self.assertEqual(sum([len(cache[x]) for x in cache.keys()]), throttle.cache_size * len(ips))
+
+
+class TestMetricsResource(TestCase):
+    def test_local_only(self):
+        request = Mock()
+        request.notifyFinish.return_value.called = False
+        request.getClientAddress.return_value.host = "127.0.0.1"
+        self.assertEqual(MetricsResource().render_GET(request), NOT_DONE_YET)
+        self.assertTrue(request.write.call_args[0][0].endswith(b"\n"))
+        request.finish.assert_called_once()
+        request.getClientAddress.return_value.host = "10.0.0.2"
+        self.assertEqual(MetricsResource().render_GET(request), b"Forbidden")
+        request.setResponseCode.assert_called_with(403)
+
+
+class TestCleanSenddata(EvenniaTest):
+    def test_clean_senddata(self):
+        from evennia.server.sessionhandler import SESSIONS
+
+        options = {"screenreader": True}
+        self.session.protocol_flags["ENCODING"] = "utf-8"
+        self.assertEqual(
+            SESSIONS.clean_senddata(
+                self.session,
+                {
+                    "text": "Hello",
+                    "prompt": ("HP: 10", {"type": "prompt", "width": 80}),
+                    "input": [["look"], {}],
+                    "raw": "caf\xe9".encode("utf-8"),
+                    "options": options,
+                },
+            ),
+            {
+                "text": [["Hello"], {"options": options}],
+                "prompt": [["HP: 10"], {"type": "prompt", "width": 80, "options": options}],
+                "input": [["look"], {"options": options}],
+                "raw": [["caf\xe9"], {"options": options}],
+            },
+        )
+        # other data is validated as before
+        self.assertEqual(
+            SESSIONS.clean_senddata(
+                self.session, {"text": ("Look at", {"target": self.obj1}), "foo": {"a": (1, 2)}}
+            ),
+            {
+                "text": [["Look at"], {"target": "Obj", "options": {}}],
+                "foo": [[], {"a": [1, 2], "options": {}}],
+            },
+        )
@@ -0,0 +1,38 @@
+"""
+Tests for the warm start after a reload.
+
+"""
+from evennia.accounts.models import AccountDB
+from evennia.objects.models import ObjectDB
+from evennia.server import warmstart
+from evennia.server.models import ServerConfig
+from evennia.utils.idmapper.models import flush_cache
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestWarmstart(EvenniaTest):
+    def test_snapshot(self):
+        if not self.session.puppet:
+            self.account.puppet_object(self.session, self.char1)
+        self.room1.tags.add("indoors", category="climate")
+        self.obj1.aliases.add("thing")
+        warmstart.save_snapshot()
+        snapshot = ServerConfig.objects.conf("warmstart_snapshot")
+        self.assertEqual(snapshot["accounts"], [self.account.id])
+        self.assertEqual(snapshot["objects"][:2], [self.char1.id, self.room1.id])
+        self.assertEqual(
+            set(snapshot["objects"]), set(obj.id for obj in [self.room1] + self.room1.contents)
+        )
+
+        flush_cache()
+        self.assertEqual(warmstart.load_snapshot(), len(snapshot["objects"]) + 1)
+        self.assertFalse(ServerConfig.objects.conf("warmstart_snapshot"))
+        room = ObjectDB.get_cached_instance(self.room1.id)
+        obj = ObjectDB.get_cached_instance(self.obj1.id)
+        self.assertTrue(AccountDB.get_cached_instance(self.account.id))
+        with self.assertNumQueries(0):
+            self.assertEqual(room.db.desc, "room_desc")
+            self.assertEqual(room.db.missing, None)
+            self.assertEqual(room.tags.get(category="climate"), "indoors")
+            self.assertIn("thing", obj.aliases.all())
+            self.assertFalse(obj.permissions.get("Developer"))
@@ -0,0 +1,107 @@
+"""
+Warm start
+
+A reload starts a new Server process with an empty idmapper cache. Right
+after it, the first `look`, contents listing or Attribute access of every
+reconnected player fetches its objects from the database one by one,
+making the game lag for seconds.
+
+To avoid this, the Server records the objects in use when reloading: the
+characters puppeted by connected players, their accounts, the rooms the
+characters are in and the contents of those rooms. When starting up again,
+these are loaded back in a few batched queries together with all their
+Attributes and Tags, filling the idmapper and Attribute/Tag handler caches
+before the players' sessions are resumed.
+
+The max number of recorded objects is set by `settings.WARMSTART_MAX_OBJECTS`.
+
+"""
+
+from django.conf import settings
+from evennia.server.models import ServerConfig
+from evennia.utils import logger
+
+_MAX_OBJECTS = settings.WARMSTART_MAX_OBJECTS
+_SNAPSHOT_KEY = "warmstart_snapshot"
+# stay below the max number of query parameters of SQLite
+_BATCH_SIZE = 500
+
+
+def _prefetch(dbmodel, ids):
+    """
+    Load entities into the idmapper cache with all their Attributes and Tags.
+
+    Args:
+        dbmodel (Model): The database model, like `ObjectDB`.
+        ids (list): The ids of the entities to load.
+
+    Returns:
+        entities (list): The loaded entities.
+
+    """
+    from evennia.typeclasses.models import prefetch_handlers
+
+    ids = list(ids)
+    entities = []
+    for istart in range(0, len(ids), _BATCH_SIZE):
+        entities.extend(dbmodel.objects.filter(id__in=ids[istart : istart + _BATCH_SIZE]))
+    prefetch_handlers(entities)
+    return entities
+
+
+def save_snapshot():
+    """
+    Record the objects and accounts in use by connected sessions. This is
+    called by the Server when reloading.
+
+    """
+    from evennia.server.sessionhandler import SESSIONS
+
+    if _MAX_OBJECTS <= 0:
+        return
+    objids, accountids = [], set()
+    # characters and accounts first, so they are kept if the limit is reached
+    locations = []
+    for session in SESSIONS.values():
+        account = session.get_account()
+        if account:
+            accountids.add(account.id)
+        puppet = session.get_puppet()
+        if puppet:
+            objids.append(puppet.id)
+            if puppet.location:
+                locations.append(puppet.location)
+    for location in locations:
+        objids.append(location.id)
+        objids.extend(obj.id for obj in location.contents)
+    # remove duplicates, keeping the order
+    objids = list(dict.fromkeys(objids))[:_MAX_OBJECTS]
+    ServerConfig.objects.conf(
+        _SNAPSHOT_KEY, value={"objects": objids, "accounts": list(accountids)}
+    )
+
+
+def load_snapshot():
+    """
+    Load the objects and accounts recorded by `save_snapshot` into the
+    caches. This is called by the Server when starting after a reload.
+
+    Returns:
+        nloaded (int): The number of loaded objects and accounts.
+
+    """
+    from evennia.objects.models import ObjectDB
+    from evennia.accounts.models import AccountDB
+
+    snapshot = ServerConfig.objects.conf(_SNAPSHOT_KEY)
+    if not snapshot:
+        return 0
+    ServerConfig.objects.conf(_SNAPSHOT_KEY, delete=True)
+    try:
+        nloaded = len(_prefetch(AccountDB, snapshot["accounts"]))
+        nloaded += len(_prefetch(ObjectDB, snapshot["objects"]))
+    except Exception:
+        # the caches are only warmed; the game works without it
+        logger.log_trace("Warm start: could not load the recorded objects.")
+        return 0
+    return nloaded
@@ -31,6 +31,7 @@ from evennia.utils import logger
 
 _UPSTREAM_IPS = settings.UPSTREAM_IPS
 _DEBUG = settings.DEBUG
+_LOCAL_IPS = ("127.0.0.1", "::1")
 
 
 class LockableThreadPool(threadpool.ThreadPool):
@@ -291,3 +292,45 @@ class PrivateStaticRoot(static.File):
 
     def directoryListing(self):
         return resource.ForbiddenResource()
+
+
+class MetricsResource(resource.Resource):
+    """
+    Serves runtime statistics in the Prometheus text exposition format.
+    This is only available to requests coming from localhost; the
+    Portal's webserver proxy will not relay requests to it.
+
+    """
+
+    isLeaf = True
+
+    def render_GET(self, request):
+        """
+        Render the metrics of Server and Portal.
+
+        Args:
+            request (Request): Incoming request.
+
+        Returns:
+            result (bytes or char): An error if the request is not coming
+                from localhost, otherwise an indicator that the request is
+                not yet finished.
+
+        """
+        if request.getClientAddress().host not in _LOCAL_IPS:
+            request.setResponseCode(http.FORBIDDEN)
+            return b"Forbidden"
+
+        from evennia.server.profiling.metrics import collect_all
+
+        finished = request.notifyFinish()
+        finished.addErrback(lambda f: None)
+
+        def _render(text):
+            if not finished.called:
+                request.setHeader(b"Content-Type", b"text/plain; version=0.0.4; charset=utf-8")
+                request.write(text.encode("utf-8"))
+                request.finish()
+
+        collect_all().addCallback(_render)
+        return NOT_DONE_YET
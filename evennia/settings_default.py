@@ -102,6 +102,11 @@ WEBSOCKET_CLIENT_INTERFACE = "0.0.0.0"
 # the client will itself figure out this url based on the server's hostname.
 # e.g. ws://external.example.com or wss://external.example.com:443
 WEBSOCKET_CLIENT_URL = None
+# Compress the websocket traffic with the permessage-deflate extension, if the
+# browser supports it (all modern ones do). This saves bandwidth at some cost of
+# cpu in the Portal. Messages are also batched if the client asks for it, and
+# sent as MessagePack if the optional `msgpack` package is installed.
+WEBSOCKET_CLIENT_DEFLATE = True
 # This determine's whether Evennia's custom admin page is used, or if the
 # standard Django admin is used.
 EVENNIA_ADMIN = True
@@ -113,6 +118,17 @@ EVENNIA_ADMIN = True
 AMP_HOST = "localhost"
 AMP_PORT = 4006
 AMP_INTERFACE = "127.0.0.1"
+# Python path to the class packing and compressing the data messages sent over
+# AMP. See `evennia.server.portal.amp` for the available codecs. Portal and Server
+# can read the messages of all of them, so changing this only needs a reload.
+AMP_CODEC = "evennia.server.portal.amp.FastAMPCodec"
+# Path to a Unix domain socket for the AMP connection between Portal and Server.
+# If set, the Server connects to the Portal over this socket instead of over TCP,
+# skipping the overhead of the TCP stack. A relative path is relative to the game
+# dir, like "server/amp.sock". The Portal still also listens on AMP_PORT, which is
+# used by the launcher. This only works with Portal and Server on the same machine
+# and is not available on Windows, where TCP is always used.
+AMP_UNIX_SOCKET = None
 
 
 # Path to the lib directory containing the bulk of the codebase's code.
@@ -209,6 +225,13 @@ SCREENREADER_REGEX_STRIP = r"\+-+|\+$|\+~|--+|~~+|==+"
 # be necessary (use @server to see how many objects are in the idmapper
 # cache at any time). Setting this to None disables the cache cap.
 IDMAPPER_CACHE_MAXSIZE = 200  # (MB)
+# On a reload, the Server records the objects its connected players are
+# using (their characters, accounts and the rooms they are in with all
+# their contents) and loads them back, with their Attributes and Tags, in a
+# few batched queries before the players' sessions are resumed. This avoids
+# a lag spike of one-by-one database lookups right after the reload. This
+# is the max number of objects to record. Set to 0 to turn this off.
+WARMSTART_MAX_OBJECTS = 5000
 # This determines how many connections per second the Portal should
 # accept, as a DoS countermeasure. If the rate exceeds this number, incoming
 # connections will be queued to this rate, so none will be lost.
@@ -231,11 +254,35 @@ MAX_CHAR_LIMIT = 6000
 MAX_CHAR_LIMIT_WARNING = (
     "You entered a string that was too long. " "Please break it up into multiple parts."
 )
+# When a client doesn't read its output as fast as it's sent (a stalled
+# connection, a client busy on a spammy channel), the Portal holds back
+# the output in a queue rather than buffering it without limit. This is
+# the max approximate size in bytes of that queue per Session. When it's
+# full, queued OOB messages (anything but text and prompts) are dropped
+# first, then PORTAL_OUTPUT_QUEUE_OVERFLOW decides: "disconnect" cuts the
+# connection, "drop" drops the oldest queued text. Queued prompts are
+# always collapsed to the latest one. Set the size to 0 to not queue.
+PORTAL_OUTPUT_QUEUE_SIZE = 512 * 1024
+PORTAL_OUTPUT_QUEUE_OVERFLOW = "disconnect"
 # If this is true, errors and tracebacks from the engine will be
 # echoed as text in-game as well as to the log. This can speed up
 # debugging. OBS: Showing full tracebacks to regular users could be a
 # security problem -turn this off in a production game!
 IN_GAME_ERRORS = True
+# Message tracing follows a sample of all incoming messages on their way
+# Portal -> Server -> Portal, time-stamping them at each step. This is the
+# fraction (0..1) of messages to trace; 0 turns tracing off. Look at the
+# traces with the `traces` command. Only use this for profiling, tracing
+# every message (1.0) adds noticeable overhead.
+MESSAGE_TRACE_SAMPLE_RATE = 0.0
+# How many message traces the Portal and Server will each keep in memory.
+# When this is exceeded, the oldest traces will be discarded.
+MESSAGE_TRACE_BUFFER_SIZE = 500
+# Collect per-command timing and database-query statistics in the command
+# handler. View them with the `cmdstats` command (which can also turn
+# profiling on and off without a reload) or from the local-only /metrics
+# url on the Server's webserver port.
+COMMAND_PROFILING = False
 
 ######################################################################
 # Evennia Database config
@@ -278,6 +325,21 @@ ATTRIBUTE_STORED_MODEL_RENAME = [
     (("players", "playerdb"), ("accounts", "accountdb")),
     (("typeclasses", "defaultplayer"), ("typeclasses", "defaultaccount")),
 ]
+# The process pool runs CPU-heavy functions given to `run_async(...,
+# use_procpool=True)` in separate worker processes. This is the max number
+# of worker processes (0 disables the pool, so such functions run in
+# threads instead), the max number of functions waiting for a free worker
+# and the default time in seconds a function may run before it's failed
+# and the pool is restarted.
+PROCPOOL_MAX_WORKERS = 2
+PROCPOOL_MAX_QUEUE = 100
+PROCPOOL_TIMEOUT = 30
+# Game code can run slow database queries in a thread pool of their own
+# (see evennia.utils.dbpool), separate from the webserver's. Set the
+# minimum and maximum number of threads as (min, max) (must be > 0) and
+# the max number of queries waiting for a free thread.
+DB_THREADPOOL_LIMITS = (1, 5)
+DB_THREADPOOL_MAX_QUEUE = 200
 
 
 ######################################################################
@@ -448,6 +510,12 @@ COMMAND_DEFAULT_MSG_ALL_SESSIONS = False
 COMMAND_DEFAULT_HELP_CATEGORY = "general"
 # The default lockstring of a command.
 COMMAND_DEFAULT_LOCKS = ""
+# By default every Exit puts a cmdset with a command of its own name on
+# itself, so a room with many exits merges many cmdsets for every command
+# entered. If set, each location instead gets a single exit cmdset which
+# looks up the Exit to traverse by name. Customizations of
+# `DefaultExit.create_exit_cmdset` are not used in this mode.
+EXIT_DISPATCH = False
 # The Channel Handler is responsible for managing all available channels. By
 # default it builds the current channels into a channel-cmdset that it feeds
 # to the cmdhandler. Overloading this can completely change how Channels
@@ -650,6 +718,12 @@ CLIENT_DEFAULT_HEIGHT = 45
 # (excluding webclient with separate help popups). If continuous scroll
 # is preferred, change 'HELP_MORE' to False. EvMORE uses CLIENT_DEFAULT_HEIGHT
 HELP_MORE = True
+# Persistent EvMenus save which node the user is on, so the menu can be
+# restarted there after a reload. To avoid a database write for every
+# menu choice, these saves are combined to at most one every this many
+# seconds (menus are always saved when a session disconnects and before
+# the server reloads or shuts down). Set to 0 to save on every choice.
+EVMENU_PERSISTENT_SAVE_INTERVAL = 10
 # Set rate limits per-IP on account creations and login attempts
 CREATION_THROTTLE_LIMIT = 2
 CREATION_THROTTLE_TIMEOUT = 10 * 60
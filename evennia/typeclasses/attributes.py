@@ -247,12 +247,25 @@ class AttributeHandler(object):
             for conn in getattr(self.obj, self._m2m_fieldname).through.objects.filter(**query)
         ]
 
-    def _fullcache(self):
-        """Cache all attributes of this object"""
+    def _fullcache(self, attrs=None, categories=None):
+        """
+        Cache all attributes of this object.
+
+        Args:
+            attrs (list, optional): All Attributes of this object, if already
+                fetched (like in bulk for many objects). Otherwise they are
+                queried for.
+            categories (list, optional): Only cache the Attributes of these
+                categories (None meaning no category) and mark these categories
+                as fully cached, rather than the whole handler. If given, `attrs`
+                need only contain the Attributes of these categories.
+
+        """
         if not _TYPECLASS_AGGRESSIVE_CACHE:
             return
-        attrs = self._query_all()
-        self._cache = dict(
+        if attrs is None:
+            attrs = self._query_all()
+        cache = dict(
             (
                 "%s-%s"
                 % (
@@ -263,7 +276,24 @@ class AttributeHandler(object):
             )
             for attr in attrs
         )
-        self._cache_complete = True
+        if categories is None:
+            self._cache = cache
+            self._cache_complete = True
+            return
+        catkeys = ["-%s" % (category.lower() if category else None) for category in categories]
+        # drop what was cached for these categories, including known misses
+        self._cache = dict(
+            (cachekey, attr)
+            for cachekey, attr in self._cache.items()
+            if not any(cachekey.endswith(catkey) for catkey in catkeys)
+        )
+        self._cache.update(
+            (cachekey, attr)
+            for cachekey, attr in cache.items()
+            if any(cachekey.endswith(catkey) for catkey in catkeys)
+        )
+        for catkey in catkeys:
+            self._catcache[catkey] = True
 
     def _getcache(self, key=None, category=None):
         """
@@ -298,6 +328,8 @@ class AttributeHandler(object):
                 cachefound = True
             except KeyError:
                 attr = None
+                # a fully cached handler (or category) knows this Attribute does not exist
+                cachefound = self._cache_complete or "-%s" % category in self._catcache
 
             if attr and (not hasattr(attr, "pk") and attr.pk is None):
                 # clear out Attributes deleted from elsewhere. We must search this anew.
@@ -337,7 +369,7 @@ class AttributeHandler(object):
             # assume the cache to be complete unless we have queried
             # for this category before
             catkey = "-%s" % category
-            if _TYPECLASS_AGGRESSIVE_CACHE and catkey in self._catcache:
+            if _TYPECLASS_AGGRESSIVE_CACHE and (catkey in self._catcache or self._cache_complete):
                 return [attr for key, attr in self._cache.items() if key.endswith(catkey) and attr]
             else:
                 # we have to query to make this category up-date in the cache
@@ -356,7 +388,7 @@ class AttributeHandler(object):
                 if _TYPECLASS_AGGRESSIVE_CACHE:
                     for attr in attrs:
                         if attr.pk:
-                            cachekey = "%s-%s" % (attr.db_key, category)
+                            cachekey = "%s-%s" % (to_str(attr.db_key).lower(), category)
                             self._cache[cachekey] = attr
                     # mark category cache as up-to-date
                     self._catcache[catkey] = True
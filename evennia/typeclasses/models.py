@@ -25,7 +25,7 @@ This module also contains the Managers for the respective models; inherit from
 these to create custom managers.
 
 """
-from django.db.models import signals
+from django.db.models import signals, Q
 
 from django.db.models.base import ModelBase
 from django.db import models
@@ -44,10 +44,16 @@ from evennia.server.signals import SIGNAL_TYPED_OBJECT_POST_RENAME
 
 from evennia.typeclasses import managers
 from evennia.locks.lockhandler import LockHandler
-from evennia.utils.utils import is_iter, inherits_from, lazy_property, class_from_module
+from evennia.utils.utils import (
+    is_iter,
+    inherits_from,
+    lazy_property,
+    class_from_module,
+    make_iter,
+)
 from evennia.utils.logger import log_trace
 
-__all__ = ("TypedObject",)
+__all__ = ("TypedObject", "prefetch_handlers")
 
 TICKER_HANDLER = None
 
@@ -996,3 +1002,115 @@ class TypedObject(SharedMemoryModel):
 
     # Used by Django Sites/Admin
     get_absolute_url = web_get_detail_url
+
+
+# ------------------------------------------------------------
+#
+# Bulk handler caching
+#
+# ------------------------------------------------------------
+
+# stay below the max number of query parameters of SQLite
+_PREFETCH_BATCH_SIZE = 500
+# the tagtypes of the TagHandler, AliasHandler and PermissionHandler
+_TAG_HANDLERS = ((None, "tags"), ("alias", "aliases"), ("permission", "permissions"))
+
+
+def _needs_prefetch(handler, catkeys):
+    "Check if a handler's cache is missing any of the wanted categories"
+    if handler._cache_complete:
+        return False
+    return catkeys is None or any(catkey not in handler._catcache for catkey in catkeys)
+
+
+def _category_query(field, categories):
+    "Build a query for Attributes/Tags of the given categories, if any"
+    query = Q()
+    if categories is None:
+        return query
+    named = [category for category in categories if category]
+    if named:
+        query |= Q(**{"%s__db_category__in" % field: named})
+    if len(named) < len(categories):
+        query |= Q(**{"%s__db_category__isnull" % field: True})
+    return query
+
+
+def prefetch_handlers(objs, attributes=True, tags=True, categories=None):
+    """
+    Load the Attributes and Tags of many entities at once, filling the
+    caches of their handlers. Iterating over the entities and reading
+    `obj.db.desc` or `obj.tags.get(...)` will then not hit the database
+    for each entity.
+
+    Args:
+        objs (list): Typeclassed entities, like Objects or Accounts. Entities
+            whose handlers are already fully cached are skipped.
+        attributes (bool, optional): Load the Attributes.
+        tags (bool, optional): Load the Tags, aliases and permissions.
+        categories (list, optional): Only load Attributes and Tags of these
+            categories. Use None in the list for no category. If not given,
+            all Attributes and Tags are loaded.
+
+    Notes:
+        This needs one query for the Attributes and one for the Tags per
+        500 entities of the same database model. Nothing is done if
+        `settings.TYPECLASS_AGGRESSIVE_CACHE` is off.
+
+    """
+    if not _TYPECLASS_AGGRESSIVE_CACHE or not (attributes or tags):
+        return
+    if categories is not None:
+        categories = [category.strip().lower() if category else None for category in categories]
+        catkeys = ["-%s" % category for category in categories]
+    else:
+        catkeys = None
+
+    # group by database model, since each has its own through-tables
+    bymodel = {}
+    for obj in make_iter(objs):
+        if not obj.pk:
+            continue
+        attr_needed = attributes and _needs_prefetch(obj.attributes, catkeys)
+        tags_needed = tags and any(
+            _needs_prefetch(getattr(obj, handlername), catkeys) for _, handlername in _TAG_HANDLERS
+        )
+        if attr_needed or tags_needed:
+            bymodel.setdefault(obj.__dbclass__, []).append((obj, attr_needed, tags_needed))
+
+    for dbmodel, entries in bymodel.items():
+        modelname = dbmodel.__name__.lower()
+        idfield = "%s_id" % modelname
+        for istart in range(0, len(entries), _PREFETCH_BATCH_SIZE):
+            batch = entries[istart : istart + _PREFETCH_BATCH_SIZE]
+            attrs, tagobjs = {}, {}
+            attr_ids = [obj.id for obj, attr_needed, _ in batch if attr_needed]
+            tag_ids = [obj.id for obj, _, tags_needed in batch if tags_needed]
+            if attr_ids:
+                for conn in dbmodel.db_attributes.through.objects.filter(
+                    _category_query("attribute", categories),
+                    **{
+                        "%s__id__in" % modelname: attr_ids,
+                        "attribute__db_model__iexact": modelname,
+                        "attribute__db_attrtype": None,
+                    },
+                ).select_related("attribute"):
+                    attrs.setdefault(getattr(conn, idfield), []).append(conn.attribute)
+            if tag_ids:
+                for conn in dbmodel.db_tags.through.objects.filter(
+                    Q(tag__db_tagtype__isnull=True)
+                    | Q(tag__db_tagtype__in=("alias", "permission")),
+                    _category_query("tag", categories),
+                    **{"%s__id__in" % modelname: tag_ids, "tag__db_model": modelname},
+                ).select_related("tag"):
+                    tagobjs.setdefault((getattr(conn, idfield), conn.tag.db_tagtype), []).append(
+                        conn.tag
+                    )
+            for obj, attr_needed, tags_needed in batch:
+                if attr_needed:
+                    obj.attributes._fullcache(attrs.get(obj.id, []), categories=categories)
+                if tags_needed:
+                    for tagtype, handlername in _TAG_HANDLERS:
+                        getattr(obj, handlername)._fullcache(
+                            tagobjs.get((obj.id, tagtype), []), categories=categories
+                        )
@@ -136,12 +136,25 @@ class TagHandler(object):
             for conn in getattr(self.obj, self._m2m_fieldname).through.objects.filter(**query)
         ]
 
-    def _fullcache(self):
-        "Cache all tags of this object"
+    def _fullcache(self, tags=None, categories=None):
+        """
+        Cache all tags of this object.
+
+        Args:
+            tags (list, optional): All Tags of this object (of this handler's
+                tagtype), if already fetched (like in bulk for many objects).
+                Otherwise they are queried for.
+            categories (list, optional): Only cache the Tags of these categories
+                (None meaning no category) and mark these categories as fully
+                cached, rather than the whole handler. If given, `tags` need
+                only contain the Tags of these categories.
+
+        """
         if not _TYPECLASS_AGGRESSIVE_CACHE:
             return
-        tags = self._query_all()
-        self._cache = dict(
+        if tags is None:
+            tags = self._query_all()
+        cache = dict(
             (
                 "%s-%s"
                 % (
@@ -152,7 +165,24 @@ class TagHandler(object):
             )
             for tag in tags
         )
-        self._cache_complete = True
+        if categories is None:
+            self._cache = cache
+            self._cache_complete = True
+            return
+        catkeys = ["-%s" % (category.lower() if category else None) for category in categories]
+        # drop what was cached for these categories, including known misses
+        self._cache = dict(
+            (cachekey, tag)
+            for cachekey, tag in self._cache.items()
+            if not any(cachekey.endswith(catkey) for catkey in catkeys)
+        )
+        self._cache.update(
+            (cachekey, tag)
+            for cachekey, tag in cache.items()
+            if any(cachekey.endswith(catkey) for catkey in catkeys)
+        )
+        for catkey in catkeys:
+            self._catcache[catkey] = True
 
     def _getcache(self, key=None, category=None):
         """
@@ -188,6 +218,11 @@ class TagHandler(object):
                 del self._cache[cachekey]
             if tag:
                 return [tag]  # return cached entity
+            elif _TYPECLASS_AGGRESSIVE_CACHE and (
+                self._cache_complete or "-%s" % category in self._catcache
+            ):
+                # a fully cached handler (or category) knows this Tag does not exist
+                return []
             else:
                 query = {
                     "%s__id" % self._model: self._objid,
@@ -207,7 +242,7 @@ class TagHandler(object):
             # assume the cache to be complete unless we have queried
             # for this category before
             catkey = "-%s" % category
-            if _TYPECLASS_AGGRESSIVE_CACHE and catkey in self._catcache:
+            if _TYPECLASS_AGGRESSIVE_CACHE and (catkey in self._catcache or self._cache_complete):
                 return [tag for key, tag in self._cache.items() if key.endswith(catkey)]
             else:
                 # we have to query to make this category up-date in the cache
@@ -225,7 +260,7 @@ class TagHandler(object):
                 ]
                 if _TYPECLASS_AGGRESSIVE_CACHE:
                     for tag in tags:
-                        cachekey = "%s-%s" % (tag.db_key, category)
+                        cachekey = "%s-%s" % (to_str(tag.db_key).lower(), category)
                         self._cache[cachekey] = tag
                     # mark category cache as up-to-date
                     self._catcache[catkey] = True
@@ -3,6 +3,7 @@ Unit tests for typeclass base system
 
 """
 from django.test import override_settings
+from evennia.typeclasses.models import prefetch_handlers
 from evennia.utils.test_resources import EvenniaTest
 from mock import patch
 
@@ -100,3 +101,47 @@ class TestTypedObjectManager(EvenniaTest):
         self.assertEqual(self._manager("get_by_tag", category=["category5", "category4"]), [])
         self.assertEqual(self._manager("get_by_tag", category="category1"), [self.obj1, self.obj2])
         self.assertEqual(self._manager("get_by_tag", category="category6"), [self.obj1, self.obj2])
+
+
+class TestPrefetchHandlers(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.obj1.db.desc = "A thing."
+        self.obj1.attributes.add("strength", 10, category="stats")
+        self.obj2.tags.add("heavy", category="weight")
+        self.obj2.aliases.add("thingy")
+        for obj in (self.obj1, self.obj2):
+            obj.attributes.reset_cache()
+            obj.tags.reset_cache()
+            obj.aliases.reset_cache()
+            obj.permissions.reset_cache()
+
+    def test_prefetch(self):
+        with self.assertNumQueries(2):
+            prefetch_handlers([self.obj1, self.obj2])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.obj1.db.desc, "A thing.")
+            self.assertEqual(self.obj1.attributes.get("strength", category="stats"), 10)
+            self.assertEqual(self.obj2.db.desc, None)
+            self.assertEqual(self.obj2.tags.get(category="weight"), "heavy")
+            self.assertEqual(self.obj1.tags.get("heavy", category="weight"), None)
+            self.assertIn("thingy", self.obj2.aliases.all())
+            # already cached
+            prefetch_handlers([self.obj1, self.obj2])
+
+    def test_prefetch_categories(self):
+        with self.assertNumQueries(1):
+            prefetch_handlers([self.obj1, self.obj2], tags=False, categories=[None])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.obj1.db.desc, "A thing.")
+            self.assertEqual(self.obj2.db.desc, None)
+            self.assertEqual(self.obj2.attributes.get(category=None), None)
+            prefetch_handlers([self.obj1, self.obj2], tags=False, categories=[None])
+        # other categories are still looked up
+        self.assertEqual(self.obj1.attributes.get("strength", category="stats"), 10)
+
+    def test_contents(self):
+        self.room1.contents_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.obj1.db.desc, "A thing.")
+            self.assertEqual(self.obj2.tags.get(category="weight"), "heavy")
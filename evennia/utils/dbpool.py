@@ -0,0 +1,219 @@
+"""
+Database thread pool
+
+Slow database queries block the reactor and so the whole game. This runs
+them in a thread pool of their own instead, separate from the one of the
+webserver, so heavy web traffic can't starve game queries and vice versa.
+The results are returned as Deferreds:
+
+```python
+from evennia.utils import dbpool
+
+def _found(objs, caller):
+    caller.msg("Found %i treasures." % len(objs))
+
+dbpool.get_by_tag("treasure", category="loot").addCallback(_found, caller)
+```
+
+Any function can be run in the pool with `DB_POOL.run(func, *args, **kwargs)`.
+Querysets returned from it are evaluated in the thread, so the database
+is not hit again when using the result.
+
+The pool has at most `DB_THREADPOOL_LIMITS[1]` threads, with at most
+`DB_THREADPOOL_MAX_QUEUE` more calls waiting for one. Calls beyond that
+fail with a `DBPoolError` rather than queue up without end. The number
+of running and waiting calls and how long calls waited are available as
+metrics (see `evennia.server.profiling.metrics`).
+
+Note that the functions run in another thread, so they should only read
+from the database and not change any game state. Some databases, notably
+SQLite, serialize all access, so a bigger pool won't make things faster
+with them.
+
+"""
+
+import time
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models.query import QuerySet
+from twisted.internet import defer, reactor, threads
+from twisted.python import threadpool
+from evennia.server.profiling.metrics import METRICS
+
+_OBJECTDB = None
+
+
+class DBPoolError(RuntimeError):
+    """
+    The database thread pool could not run a function.
+
+    """
+
+    pass
+
+
+class DBPool(object):
+    """
+    A bounded pool of threads for database queries. Use the `DB_POOL`
+    singleton rather than creating new instances of this class.
+
+    """
+
+    def __init__(self, minthreads=1, maxthreads=5, max_queue=200):
+        """
+        Args:
+            minthreads (int, optional): Number of threads kept ready.
+            maxthreads (int, optional): Max number of threads.
+            max_queue (int, optional): Max number of calls waiting for a free thread.
+
+        """
+        self.minthreads = max(1, minthreads)
+        self.maxthreads = max(self.minthreads, maxthreads)
+        self.max_queue = max(0, max_queue)
+        self.threadpool = None
+        # calls submitted but not finished, and calls running
+        self.pending = 0
+        self.running = 0
+        self._lock = threading.Lock()
+
+        self.tasks = METRICS.gauge(
+            "evennia_db_pool_tasks",
+            "Calls in the database thread pool, by state.",
+            ("state",),
+            func=lambda: {("running",): self.running, ("queued",): self.pending - self.running,},
+        )
+        self.rejected = METRICS.counter(
+            "evennia_db_pool_rejected_total", "Calls rejected because the pool was full."
+        )
+        self.waits = METRICS.histogram(
+            "evennia_db_pool_wait_seconds", "How long calls waited for a database thread."
+        )
+
+    def _get_threadpool(self):
+        if not self.threadpool:
+            self.threadpool = threadpool.ThreadPool(
+                self.minthreads, self.maxthreads, name="EvenniaDBPool"
+            )
+            self.threadpool.start()
+            reactor.addSystemEventTrigger("during", "shutdown", self.stop)
+        return self.threadpool
+
+    def _call(self, queued, func, args, kwargs):
+        """
+        Run a function in a pool thread, evaluating querysets it returns.
+
+        """
+        with self._lock:
+            self.running += 1
+        reactor.callFromThread(self.waits.observe, time.time() - queued)
+        # the thread keeps its database connection between calls, but we
+        # replace it if it's broken or older than settings.CONN_MAX_AGE
+        close_old_connections()
+        try:
+            result = func(*args, **kwargs)
+            if isinstance(result, QuerySet):
+                result = list(result)
+            return result
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _done(self, result):
+        self.pending -= 1
+        return result
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run a function in a database thread.
+
+        Args:
+            func (callable): The function to run.
+            *args (any): Arguments to `func`.
+            **kwargs (any): Keyword arguments to `func`.
+
+        Returns:
+            deferred (Deferred): Fires with the return of `func` (with
+                querysets evaluated to lists) or fails with its exception.
+                Fails with `DBPoolError` if the pool is full.
+
+        """
+        if self.pending >= self.maxthreads + self.max_queue:
+            self.rejected.inc()
+            return defer.fail(
+                DBPoolError("The database thread pool is full (%i calls pending)." % self.pending)
+            )
+        self.pending += 1
+        deferred = threads.deferToThreadPool(
+            reactor, self._get_threadpool(), self._call, time.time(), func, args, kwargs
+        )
+        return deferred.addBoth(self._done)
+
+    def stop(self):
+        """
+        Stop the pool's threads, after they finish their current calls.
+
+        """
+        pool, self.threadpool = self.threadpool, None
+        if pool:
+            pool.stop()
+
+
+DB_POOL = DBPool(
+    minthreads=settings.DB_THREADPOOL_LIMITS[0],
+    maxthreads=settings.DB_THREADPOOL_LIMITS[1],
+    max_queue=settings.DB_THREADPOOL_MAX_QUEUE,
+)
+
+
+def _get_manager(manager):
+    global _OBJECTDB
+    if manager:
+        return manager
+    if not _OBJECTDB:
+        from evennia.objects.models import ObjectDB as _OBJECTDB
+    return _OBJECTDB.objects
+
+
+def search_object(*args, **kwargs):
+    """
+    Search for Objects in a database thread. Takes the arguments of
+    `ObjectDB.objects.search_object`.
+
+    Returns:
+        deferred (Deferred): Fires with a list of matching Objects.
+
+    """
+    return DB_POOL.run(_get_manager(None).search_object, *args, **kwargs)
+
+
+def get_by_tag(*args, manager=None, **kwargs):
+    """
+    Find entities by Tag in a database thread. Takes the arguments of
+    the `get_by_tag` manager method.
+
+    Kwargs:
+        manager (TypedObjectManager, optional): The manager to use, like
+            `AccountDB.objects`. Defaults to `ObjectDB.objects`.
+
+    Returns:
+        deferred (Deferred): Fires with a list of tagged entities.
+
+    """
+    return DB_POOL.run(_get_manager(manager).get_by_tag, *args, **kwargs)
+
+
+def get_by_attribute(*args, manager=None, **kwargs):
+    """
+    Find entities by Attribute in a database thread. Takes the arguments
+    of the `get_by_attribute` manager method.
+
+    Kwargs:
+        manager (TypedObjectManager, optional): The manager to use, like
+            `AccountDB.objects`. Defaults to `ObjectDB.objects`.
+
+    Returns:
+        deferred (Deferred): Fires with a list of entities with the Attribute.
+
+    """
+    return DB_POOL.run(_get_manager(manager).get_by_attribute, *args, **kwargs)
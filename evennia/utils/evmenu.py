@@ -28,7 +28,10 @@ It is `False` by default. Note that if using persistent mode, every
 node and callback in the menu must be possible to be *pickled*, this
 excludes e.g. callables that are class methods or functions defined
 dynamically or as part of another function. In non-persistent mode
-no such restrictions exist.
+no such restrictions exist. To avoid a database write for every menu
+choice, the node the user is on is saved at most once every
+`settings.EVMENU_PERSISTENT_SAVE_INTERVAL` seconds, as well as when a
+session disconnects and before the server reloads or shuts down.
 
 The menu is defined in a module (this can be the same module as the
 command definition too) with function definitions:
@@ -169,11 +172,13 @@ import inspect
 
 from inspect import isfunction, getargspec
 from django.conf import settings
+from twisted.internet import reactor
 from evennia import Command, CmdSet
 from evennia.utils import logger
 from evennia.utils.evtable import EvTable
 from evennia.utils.ansi import strip_ansi
 from evennia.utils.utils import mod_import, make_iter, pad, to_str, m_len, is_iter, dedent, crop
+from evennia.utils.utils import class_from_module
 from evennia.commands import cmdhandler
 
 # read from protocol NAWS later?
@@ -184,6 +189,11 @@ _MAX_TEXT_WIDTH = settings.CLIENT_DEFAULT_WIDTH
 _CMD_NOMATCH = cmdhandler.CMD_NOMATCH
 _CMD_NOINPUT = cmdhandler.CMD_NOINPUT
 
+_SAVE_INTERVAL = settings.EVMENU_PERSISTENT_SAVE_INTERVAL
+# persistent menus whose current node is not yet saved
+_UNSAVED_MENUS = set()
+_SAVE_TASK = None
+
 # Return messages
 
 # i18n
@@ -224,6 +234,23 @@ class EvMenuError(RuntimeError):
     pass
 
 
+def save_menus():
+    """
+    Save the current node of all persistent menus not yet saved. This
+    is called regularly while persistent menus are used, as well as when a
+    session disconnects and before the server reloads or shuts down.
+
+    """
+    global _SAVE_TASK
+    if _SAVE_TASK and _SAVE_TASK.active():
+        _SAVE_TASK.cancel()
+    _SAVE_TASK = None
+    menus = list(_UNSAVED_MENUS)
+    _UNSAVED_MENUS.clear()
+    for menu in menus:
+        menu._save_node()
+
+
 # -------------------------------------------------------------
 #
 # Menu command and command set
@@ -256,12 +283,15 @@ class CmdEvMenuNode(Command):
                     startnode, startnode_input = startnode_tuple
                 except ValueError:  # old form of startnode store
                     startnode, startnode_input = startnode_tuple, ""
+                MenuClass, menudata, calldict = saved_options
+                if isinstance(MenuClass, str):
+                    # compact record of a menu module
+                    MenuClass, menudata = class_from_module(MenuClass), (menudata,)
                 if startnode:
-                    saved_options[2]["startnode"] = startnode
-                    saved_options[2]["startnode_input"] = startnode_input
-                MenuClass = saved_options[0]
+                    calldict["startnode"] = startnode
+                    calldict["startnode_input"] = startnode_input
                 # this will create a completely new menu call
-                MenuClass(caller, *saved_options[1], **saved_options[2])
+                MenuClass(caller, *menudata, **calldict)
                 return True
             return None
 
@@ -397,7 +427,9 @@ class EvMenu(object):
                 with caution - if your menu is buggy you may end up in a state
                 you can't get out of! Also note that persistent mode requires
                 that all formatters, menu nodes and callables are possible to
-                *pickle*. When the server is reloaded, the latest node shown will be completely
+                *pickle*. A menu given by its module or python path is saved as just
+                the paths and non-default options, while a dict menu has to be saved in
+                full. When the server is reloaded, the latest node shown will be completely
                 re-run with the same input arguments - so be careful if you are counting
                 up some persistent counter or similar - the counter may be run twice if
                 reload happens on the node that does that. Note that if `debug` is True,
@@ -440,6 +472,8 @@ class EvMenu(object):
         self._menutree = self._parse_menudata(menudata)
         self._persistent = persistent if not debug else False
         self._quitting = False
+        # the (nodename, (raw_string, kwargs)) to restart from after a reload
+        self._saved_node = (startnode, startnode_input)
 
         if startnode not in self._menutree:
             raise EvMenuError("Start node '%s' not in menu tree!" % startnode)
@@ -522,9 +556,27 @@ class EvMenu(object):
                 "persistent": persistent,
             }
             calldict.update(kwargs)
+            if inspect.ismodule(menudata):
+                # modules can't be pickled, but are found again by their path
+                menudata = menudata.__name__
+            if isinstance(menudata, str):
+                # a compact (menu class path, menu path, non-default options) record
+                defaults = inspect.signature(self.__class__.__init__).parameters
+                saved = (
+                    "%s.%s" % (self.__class__.__module__, self.__class__.__name__),
+                    menudata,
+                    dict(
+                        (key, val)
+                        for key, val in calldict.items()
+                        if key not in defaults or defaults[key].default != val
+                    ),
+                )
+            else:
+                # a menu tree dict can only be restored by saving all of it
+                saved = (self.__class__, (menudata,), calldict)
             try:
-                caller.attributes.add("_menutree_saved", (self.__class__, (menudata,), calldict))
-                caller.attributes.add("_menutree_saved_startnode", (startnode, startnode_input))
+                caller.attributes.add("_menutree_saved", saved)
+                caller.attributes.add("_menutree_saved_startnode", self._saved_node)
             except Exception as err:
                 caller.msg(_ERROR_PERSISTENT_SAVING.format(error=err), session=self._session)
                 logger.log_trace(_TRACE_PERSISTENT_SAVING)
@@ -814,9 +866,11 @@ class EvMenu(object):
             return
 
         if self._persistent:
-            self.caller.attributes.add(
-                "_menutree_saved_startnode", (nodename, (raw_string, kwargs))
-            )
+            self._saved_node = (nodename, (raw_string, dict(kwargs)))
+            if _SAVE_INTERVAL > 0:
+                self._schedule_save()
+            else:
+                self._save_node()
 
         # validation of the node return values
         helptext = ""
@@ -896,6 +950,29 @@ class EvMenu(object):
         if goto:
             self.goto(goto, raw_string, **(goto_kwargs if goto_kwargs else {}))
 
+    def _schedule_save(self):
+        """
+        Have the current node saved with the next coalesced save.
+
+        """
+        global _SAVE_TASK
+        _UNSAVED_MENUS.add(self)
+        if not (_SAVE_TASK and _SAVE_TASK.active()):
+            _SAVE_TASK = reactor.callLater(_SAVE_INTERVAL, save_menus)
+
+    def _save_node(self):
+        """
+        Save the current node of a persistent menu to the database, for
+        restarting the menu there after a reload.
+
+        """
+        _UNSAVED_MENUS.discard(self)
+        if self._persistent and not self._quitting:
+            try:
+                self.caller.attributes.add("_menutree_saved_startnode", self._saved_node)
+            except Exception:
+                logger.log_trace(_TRACE_PERSISTENT_SAVING)
+
     def close_menu(self):
         """
         Shutdown menu; occurs when reaching the end node or using the quit command.
@@ -905,6 +982,7 @@ class EvMenu(object):
             self._quitting = True
             self.caller.cmdset.remove(EvMenuCmdSet)
             del self.caller.ndb._menutree
+            _UNSAVED_MENUS.discard(self)
             if self._persistent:
                 self.caller.attributes.remove("_menutree_saved")
                 self.caller.attributes.remove("_menutree_saved_startnode")
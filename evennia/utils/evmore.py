@@ -26,8 +26,25 @@ and justify_kwargs are kwargs to pass to utils.utils.justify in order to change
 of the text. The remaining **kwargs will be passed on to the
 caller.msg() construct every time the page is updated.
 
+Large results should not be made into one big text before paging them.
+Instead pass a Django queryset, a Django Paginator or a generator together
+with a `page_formatter`. Only the rows of the page being shown are fetched
+and formatted, so the first page of even a very long listing is shown
+immediately:
+
+    def _format_page(objs):
+        table = EvTable("dbref", "name")
+        for obj in objs:
+            table.add_row(obj.dbref, obj.key)
+        return str(table)
+
+    EvMore(caller, ObjectDB.objects.all(), page_formatter=_format_page)
+
 """
+from itertools import islice
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models.query import QuerySet
 from evennia import Command, CmdSet
 from evennia.commands import cmdhandler
 from evennia.utils.utils import justify, make_iter
@@ -117,6 +134,20 @@ class CmdSetMore(CmdSet):
         self.add(CmdMoreLook())
 
 
+def _format_rows(rows):
+    """
+    Default page formatter, showing the `repr` of each row on its own line.
+
+    Args:
+        rows (list): The rows of the page.
+
+    Returns:
+        text (str): The page text.
+
+    """
+    return "\n".join(str(repr(row)) for row in rows)
+
+
 class EvMore(object):
     """
     The main pager object
@@ -132,6 +163,8 @@ class EvMore(object):
         justify_kwargs=None,
         exit_on_lastpage=False,
         exit_cmd=None,
+        page_formatter=None,
+        page_overhead=0,
         **kwargs,
     ):
 
@@ -147,6 +180,13 @@ class EvMore(object):
                 - If `EvTable`, the EvTable will be paginated with the same
                    setting on each page if it is too long. The table
                    decorations will be considered in the size of the page.
+                - If a Django `QuerySet`, `Paginator` or an iterator (like a
+                   generator), rows are fetched lazily, one page at a time,
+                   and each page is formatted with `page_formatter`. A
+                   queryset is paged with LIMIT/OFFSET, or by primary key
+                   if it's ordered by it (unordered querysets are). The
+                   number of pages of an iterator is not known until it has
+                   been read to its end.
                 - Otherwise `text` is converted to an iterator, where each step is
                    expected to be a line in the final display. Each line
                    will be run through repr() (so one could pass a list of objects).
@@ -168,6 +208,14 @@ class EvMore(object):
                 the caller when the more page exits. Note that this will be using whatever
                 cmdset the user had *before* the evmore pager was activated (so none of
                 the evmore commands will be available when this is run).
+            page_formatter (callable, optional): Used with lazily fetched `text`. Called
+                as `page_formatter(rows)` with the list of rows on a page, this should
+                return the text of the page. The default shows the repr() of each row
+                on its own line.
+            page_overhead (int, optional): Used with lazily fetched `text`. The number of
+                lines `page_formatter` adds to a page besides one line per row, like the
+                header and borders of a table. This is taken off the rows per page, so
+                the formatted page still fits the screen.
             kwargs (any, optional): These will be passed on to the `caller.msg` method.
 
         Examples:
@@ -179,10 +227,7 @@ class EvMore(object):
             pages = Paginator(query, 10)  # 10 objs per page
             EvMore(caller, pages)   # will repr() each object per line, 10 to a page
 
-            multi_page_table = [ [[..],[..]], ...]
-            EvMore(caller, multi_page_table, use_evtable=True,
-                   evtable_args=("Header1", "Header2"),
-                   evtable_kwargs={"align": "r", "border": "tablecols"})
+            EvMore(caller, query, page_formatter=lambda objs: "\n".join(obj.key for obj in objs))
 
         """
         self._caller = caller
@@ -190,6 +235,12 @@ class EvMore(object):
         self._pages = []
         self._npages = 1
         self._npos = 0
+        # lazily fetched data
+        self._data = None
+        self._page_formatter = page_formatter or _format_rows
+        self._page_cache = (None, None)
+        # if all pages are known (False for an iterator not yet read to its end)
+        self._exhausted = True
         self.exit_on_lastpage = exit_on_lastpage
         self.exit_cmd = exit_cmd
         self._exit_msg = "Exited |wmore|n pager."
@@ -220,11 +271,19 @@ class EvMore(object):
             text = str(text)
             justify_kwargs = None  # enforce
 
-        if not isinstance(text, str):
+        if isinstance(text, (QuerySet, Paginator)) or (
+            not isinstance(text, str) and hasattr(text, "__next__")
+        ):
+            # lazy paging, limit the number of rows per page like for text
+            self._init_lazy(text, max(1, min(10000 // max(1, width), height) - page_overhead))
+        elif not isinstance(text, str):
             # not a string - pre-set pages of some form
             text = "\n".join(str(repr(element)) for element in make_iter(text))
 
-        if "\f" in text:
+        if self._data is not None:
+            # rows are fetched as their pages are displayed
+            pass
+        elif "\f" in text:
             # we use \f to indicate the user wants to enforce their line breaks
             # on their own. If so, we do no automatic line-breaking/justification
             # at all.
@@ -269,8 +328,79 @@ class EvMore(object):
             # goto top of the text
             self.page_top()
 
+    def _init_lazy(self, data, height):
+        """
+        Prepare to fetch rows lazily.
+
+        Args:
+            data (QuerySet, Paginator or iterator): The rows to page.
+            height (int): Number of rows per page (not used for a
+                `Paginator`, which decides this itself).
+
+        """
+        self._height = height
+        self._lastpks = {}
+        self._keyset = False
+        if isinstance(data, Paginator):
+            self._npages = data.num_pages
+        elif isinstance(data, QuerySet):
+            if data.query.can_filter():
+                if not data.ordered:
+                    data = data.order_by("pk")
+                # with a primary-key order, later pages can be found from where
+                # the previous page ended rather than with an ever larger OFFSET
+                self._keyset = list(data.query.order_by) in (["pk"], ["id"])
+            # else a sliced queryset, which can't be reordered or filtered,
+            # only sliced further with OFFSET
+            nrows = data.count()
+            self._npages = max(1, nrows // height + (1 if nrows % height else 0))
+        else:
+            # an iterator; its formatted pages are kept as they are read
+            self._exhausted = False
+        self._data = data
+        if not isinstance(data, (QuerySet, Paginator)):
+            self._read_pages(0)
+
+    def _read_pages(self, pos=None):
+        """
+        Read pages from an iterator. To know if there is a next page, this
+        always reads one page beyond `pos`.
+
+        Args:
+            pos (int, optional): Read up to (and one page beyond) this page.
+                If not given, read the iterator to its end.
+
+        """
+        while not self._exhausted and (pos is None or len(self._pages) <= pos + 1):
+            rows = list(islice(self._data, self._height))
+            if rows:
+                self._pages.append(self._page_formatter(rows))
+            if len(rows) < self._height:
+                self._exhausted = True
+        self._npages = max(1, len(self._pages))
+
     def _get_page(self, pos):
-        return self._pages[pos]
+        if self._data is None:
+            return self._pages[pos]
+        if not isinstance(self._data, (QuerySet, Paginator)):
+            self._read_pages(pos)
+            return self._pages[pos] if self._pages else ""
+        cachepos, text = self._page_cache
+        if cachepos == pos:
+            return text
+        if isinstance(self._data, Paginator):
+            rows = list(self._data.page(pos + 1).object_list)
+        else:
+            lastpk = self._lastpks.get(pos - 1)
+            if lastpk is not None:
+                rows = list(self._data.filter(pk__gt=lastpk)[: self._height])
+            else:
+                rows = list(self._data[pos * self._height : (pos + 1) * self._height])
+            if self._keyset and rows and getattr(rows[-1], "pk", None) is not None:
+                self._lastpks[pos] = rows[-1].pk
+        text = self._page_formatter(rows)
+        self._page_cache = (pos, text)
+        return text
 
     def display(self, show_footer=True):
         """
@@ -279,7 +409,10 @@ class EvMore(object):
         pos = self._npos
         text = self._get_page(pos)
         if show_footer:
-            page = _DISPLAY.format(text=text, pageno=pos + 1, pagemax=self._npages)
+            pagemax = self._npages
+            if not self._exhausted:
+                pagemax = "?"
+            page = _DISPLAY.format(text=text, pageno=pos + 1, pagemax=pagemax)
         else:
             page = text
         # check to make sure our session is still valid
@@ -303,6 +436,8 @@ class EvMore(object):
         """
         Display the bottom page.
         """
+        if not self._exhausted:
+            self._read_pages()
         self._npos = self._npages - 1
         self.display()
 
@@ -316,6 +451,8 @@ class EvMore(object):
             self.page_quit()
         else:
             self._npos += 1
+            # this makes sure we know if a lazily read iterator has more pages
+            self._get_page(self._npos)
             if self.exit_on_lastpage and self._npos >= (self._npages - 1):
                 self.display(show_footer=False)
                 self.page_quit(quiet=True)
@@ -352,6 +489,8 @@ def msg(
     justify=False,
     justify_kwargs=None,
     exit_on_lastpage=True,
+    page_formatter=None,
+    page_overhead=0,
     **kwargs,
 ):
     """
@@ -366,6 +505,8 @@ def msg(
             - If `EvTable`, the EvTable will be paginated with the same
                 setting on each page if it is too long. The table
                 decorations will be considered in the size of the page.
+            - If a Django `QuerySet`, `Paginator` or an iterator, rows are
+              fetched one page at a time and formatted with `page_formatter`.
             - Otherwise `text` is converted to an iterator, where each step is
               is expected to be a line in the final display, and each line
               will be run through repr().
@@ -380,12 +521,10 @@ def msg(
             be valid keyword arguments to the utils.justify() function. If False,
             no justification will be done.
         exit_on_lastpage (bool, optional): Immediately exit pager when reaching the last page.
-        use_evtable (bool, optional): If True, each page will be rendered as an
-            EvTable. For this to work, `text` must be an iterable, where each element
-            is the table (list of list) to render on that page.
-        evtable_args (tuple, optional): The args to use for EvTable on each page.
-        evtable_kwargs (dict, optional): The kwargs to use for EvTable on each
-            page (except `table`, which is supplied by EvMore per-page).
+        page_formatter (callable, optional): Formats the rows of a lazily fetched
+            page into text. See `EvMore`.
+        page_overhead (int, optional): Lines added to each page by `page_formatter`
+            besides the rows. See `EvMore`.
         kwargs (any, optional): These will be passed on
             to the `caller.msg` method.
 
@@ -398,5 +537,7 @@ def msg(
         justify=justify,
         justify_kwargs=justify_kwargs,
         exit_on_lastpage=exit_on_lastpage,
+        page_formatter=page_formatter,
+        page_overhead=page_overhead,
         **kwargs,
     )
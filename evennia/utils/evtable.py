@@ -111,6 +111,7 @@ table string.
 
 """
 
+from collections import OrderedDict
 from django.conf import settings
 from textwrap import TextWrapper
 from copy import deepcopy, copy
@@ -119,6 +120,41 @@ from evennia.utils.ansi import ANSIString
 
 _DEFAULT_WIDTH = settings.CLIENT_DEFAULT_WIDTH
 
+# max number of formatted cell layouts to remember
+_MAX_LAYOUTS = 2000
+# {layout key: formatted lines}, least recently used first
+_LAYOUTS = OrderedDict()
+
+# the EvCell properties that affect how its data is formatted
+_LAYOUT_PROPERTIES = (
+    "width",
+    "height",
+    "pad_left",
+    "pad_right",
+    "pad_top",
+    "pad_bottom",
+    "hpad_char",
+    "vpad_char",
+    "hfill_char",
+    "vfill_char",
+    "crop_string",
+    "enforce_size",
+    "border_left",
+    "border_right",
+    "border_top",
+    "border_bottom",
+    "border_left_char",
+    "border_right_char",
+    "border_top_char",
+    "border_bottom_char",
+    "corner_top_left_char",
+    "corner_top_right_char",
+    "corner_bottom_left_char",
+    "corner_bottom_right_char",
+    "align",
+    "valign",
+)
+
 
 def _to_ansi(obj):
     """
@@ -134,6 +170,52 @@ def _to_ansi(obj):
         return ANSIString(obj)
 
 
+def _is_plain(text):
+    """
+    Check if a text has no ANSI- or MXP markup (and nothing that could be
+    mistaken for it when combined with other text).
+
+    Args:
+        text (str or ANSIString): The text to check.
+
+    Returns:
+        is_plain (bool): If `text` can be handled as a normal string.
+
+    """
+    if isinstance(text, ANSIString):
+        if text._raw_string != text._clean_string:
+            return False
+        text = text._clean_string
+    elif not isinstance(text, str):
+        return False
+    return "|" not in text and "\x1b" not in text
+
+
+def _plain_to_ansi(text):
+    """
+    Convert a plain text (see `_is_plain`) to ANSIString without parsing it.
+
+    Args:
+        text (str): Text without markup.
+
+    Returns:
+        ansistring (ANSIString): The same as `ANSIString(text)`.
+
+    """
+    return ANSIString(text, code_indexes=[], char_indexes=list(range(len(text))), clean_string=text)
+
+
+def _layout_value(value):
+    """
+    Get a value for use in a layout cache key. ANSIStrings compare by their
+    clean text only, so they are keyed on their raw string.
+
+    """
+    if isinstance(value, ANSIString):
+        return (ANSIString, value._raw_string)
+    return value
+
+
 _whitespace = "\t\n\x0b\x0c\r "
 
 
@@ -485,11 +567,57 @@ class EvCell(object):
 
     def _reformat(self):
         """
-        Apply all EvCells' formatting operations.
+        Apply all EvCells' formatting operations. The result is cached on
+        the cell's data and formatting properties, so re-formatting a cell
+        the same way (such as when a table is displayed again) is only done
+        once.
+
+        Returns:
+            lines (list): The formatted lines of the cell.
 
         """
-        data = self._border(self._pad(self._valign(self._align(self._fit_width(self.data)))))
-        return data
+        key = (self.__class__, tuple(_layout_value(line) for line in self.data)) + tuple(
+            _layout_value(getattr(self, prop)) for prop in _LAYOUT_PROPERTIES
+        )
+        try:
+            lines = _LAYOUTS[key]
+        except KeyError:
+            lines = _LAYOUTS[key] = self._format()
+            if len(_LAYOUTS) > _MAX_LAYOUTS:
+                _LAYOUTS.popitem(last=False)
+        except TypeError:
+            # some property was set to an unhashable value
+            return self._format()
+        else:
+            _LAYOUTS.move_to_end(key)
+        return list(lines)
+
+    def _format(self):
+        """
+        Format the cell's data. Data without markup that needs no wrapping
+        is handled as normal strings until the borders are added, which
+        gives the same result as handling them as ANSIStrings, only faster.
+
+        Returns:
+            lines (list): The formatted lines of the cell.
+
+        """
+        data = self.data
+        width = self.width
+        if all(
+            _is_plain(text)
+            for text in (
+                self.hpad_char,
+                self.vpad_char,
+                self.hfill_char,
+                self.vfill_char,
+                self.crop_string,
+            )
+        ) and all(_is_plain(line) and not 0 < width < len(line) for line in data):
+            data = [line._clean_string for line in data]
+            data = self._pad(self._valign(self._align(self._fit_width(data))))
+            return self._border([_plain_to_ansi(line) for line in data])
+        return self._border(self._pad(self._valign(self._align(self._fit_width(data)))))
 
     def _split_lines(self, text):
         """
@@ -740,7 +868,7 @@ class EvCell(object):
             natural_height (int): Height of cell.
 
         """
-        return len(self.formatted)  # if self.formatted else 0
+        return len(self.get())
 
     def get_width(self):
         """
@@ -750,7 +878,7 @@ class EvCell(object):
             natural_width (int): Width of cell.
 
         """
-        return m_len(self.formatted[0])  # if self.formatted else 0
+        return m_len(self.get()[0])
 
     def replace_data(self, data, **kwargs):
         """
@@ -892,8 +1020,9 @@ class EvCell(object):
             if self.height <= 0 < self.raw_height:
                 raise Exception("Cell height too small, no room for data.")
 
-        # reformat (to new sizes, padding, header and borders)
-        self.formatted = self._reformat()
+        # the cell is reformatted (to new sizes, padding, header and borders)
+        # the next time it is used
+        self.formatted = None
 
     def get(self):
         """
@@ -903,6 +1032,19 @@ class EvCell(object):
         self.formatted = self._reformat()
         return self.formatted
 
+    def __deepcopy__(self, memo):
+        """
+        Apart from its lists of lines, a cell only holds immutable values,
+        so copying those lists is enough (and much faster than a full
+        deepcopy). This is done every time a table is balanced.
+
+        """
+        cell = copy(self)
+        cell.data = list(self.data)
+        if self.formatted is not None:
+            cell.formatted = list(self.formatted)
+        return cell
+
     def __repr__(self):
         self.formatted = self._reformat()
         return str(ANSIString("<EvCel %s>" % self.formatted))
@@ -1511,10 +1653,10 @@ class EvTable(object):
         self.cwidth = sum(cwidths)
         self.cheight = sum(cheights)
 
-    def _generate_lines(self):
+    def _generate_cell_lines(self):
         """
-        Generates lines across all columns
-        (each cell may contain multiple lines)
+        Generates lines across all columns, as lists of each
+        cell's part of the line (each cell may contain multiple lines).
         This will also balance the table.
         """
         self._balance()
@@ -1524,7 +1666,16 @@ class EvTable(object):
             cell_data = [cell.get() for cell in cell_row]
             cell_height = min(len(lines) for lines in cell_data)
             for iline in range(cell_height):
-                yield ANSIString("").join(_to_ansi(celldata[iline] for celldata in cell_data))
+                yield [celldata[iline] for celldata in cell_data]
+
+    def _generate_lines(self):
+        """
+        Generates lines across all columns
+        (each cell may contain multiple lines)
+        This will also balance the table.
+        """
+        for parts in self._generate_cell_lines():
+            yield ANSIString("").join(_to_ansi(parts))
 
     def add_header(self, *args, **kwargs):
         """
@@ -1723,8 +1874,11 @@ class EvTable(object):
 
     def __str__(self):
         """print table (this also balances it)"""
-        # h = "12345678901234567890123456789012345678901234567890123456789012345678901234567890"
-        return str(str(ANSIString("\n").join([line for line in self._generate_lines()])))
+        # joining the raw strings gives the same result as ANSIString-joins, only faster
+        return "\n".join(
+            "".join(str(ANSIString(part)) for part in parts)
+            for parts in self._generate_cell_lines()
+        )
 
 
 def _test():
@@ -16,10 +16,10 @@ from twisted.internet.reactor import callFromThread
 from django.core.exceptions import ObjectDoesNotExist, FieldError
 from django.db.models.signals import post_save
 from django.db.models.base import Model, ModelBase
-from django.db.models.signals import pre_delete, post_migrate
+from django.db.models.signals import pre_delete, post_migrate, m2m_changed
 from django.db.utils import DatabaseError
 from evennia.utils import logger
-from evennia.utils.utils import dbref, get_evennia_pids, to_str
+from evennia.utils.utils import dbref, to_str
 
 from .manager import SharedMemoryManager
 
@@ -30,17 +30,12 @@ _SA = object.__setattr__
 _DA = object.__delattr__
 _MONITOR_HANDLER = None
 
-# References to db-updated objects are stored here so the
-# main process can be informed to re-cache itself.
-PROC_MODIFIED_COUNT = 0
-PROC_MODIFIED_OBJS = WeakValueDictionary()
-
-# get info about the current process and thread; determine if our
-# current pid is different from the server PID (i.e.  # if we are in a
-# subprocess or not)
-_SELF_PID = os.getpid()
-_SERVER_PID, _PORTAL_PID = get_evennia_pids()
-_IS_SUBPROCESS = (_SERVER_PID and _PORTAL_PID) and _SELF_PID not in (_SERVER_PID, _PORTAL_PID)
+# Rows modified in a process-pool worker are stored here as
+# {(model_label, pk): deleted} so the main process can be informed
+# to re-cache itself (see evennia.utils.procpool).
+_IS_SUBPROCESS = False
+PROC_MODIFIED_OBJS = {}
+
 _IS_MAIN_THREAD = threading.currentThread().getName() == "MainThread"
 
 
@@ -410,6 +405,8 @@ class SharedMemoryModel(Model, metaclass=SharedMemoryModelBase):
         Delete the object, clearing cache.
 
         """
+        if _IS_SUBPROCESS:
+            PROC_MODIFIED_OBJS[(self._meta.concrete_model._meta.label, self.pk)] = True
         self.flush_from_cache()
         self._is_deleted = True
         super().delete(*args, **kwargs)
@@ -429,13 +426,6 @@ class SharedMemoryModel(Model, metaclass=SharedMemoryModelBase):
         if not _MONITOR_HANDLER:
             from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITOR_HANDLER
 
-        if _IS_SUBPROCESS:
-            # we keep a store of objects modified in subprocesses so
-            # we know to update their caches in the central process
-            global PROC_MODIFIED_COUNT, PROC_MODIFIED_OBJS
-            PROC_MODIFIED_COUNT += 1
-            PROC_MODIFIED_OBJS[PROC_MODIFIED_COUNT] = self
-
         if _IS_MAIN_THREAD:
             # in main thread - normal operation
             try:
@@ -460,6 +450,11 @@ class SharedMemoryModel(Model, metaclass=SharedMemoryModelBase):
             # delete the object (an example are Scripts that start and die immediately)
             return
 
+        if _IS_SUBPROCESS:
+            # we keep a store of objects modified in subprocesses so
+            # we know to update their caches in the central process
+            PROC_MODIFIED_OBJS.setdefault((self._meta.concrete_model._meta.label, self.pk), False)
+
         # update field-update hooks and eventual OOB watchers
         new = False
         if "update_fields" in kwargs and kwargs["update_fields"]:
@@ -566,6 +561,43 @@ def update_cached_instance(sender, instance, **kwargs):
 post_save.connect(update_cached_instance)
 
 
+def _track_m2m_changed(sender, instance, action, **kwargs):
+    """
+    Record the owner of a changed many-to-many relation (like the
+    Attributes or Tags of an object) as modified.
+
+    """
+    if action.startswith("post_") and isinstance(instance, SharedMemoryModel) and instance.pk:
+        PROC_MODIFIED_OBJS.setdefault(
+            (instance._meta.concrete_model._meta.label, instance.pk), False
+        )
+
+
+def track_modified_objs():
+    """
+    Start recording the rows saved and deleted in this process. This is
+    called in process-pool workers, which report the rows back to the main
+    process so it can update its cache.
+
+    """
+    global _IS_SUBPROCESS
+    _IS_SUBPROCESS = True
+    m2m_changed.connect(_track_m2m_changed, dispatch_uid="idmapper_track_m2m")
+
+
+def pop_modified_objs():
+    """
+    Get and clear the rows recorded as modified since the last call.
+
+    Returns:
+        modified (list): A list of `(model_label, pk, deleted)`.
+
+    """
+    modified = [(label, pk, deleted) for (label, pk), deleted in PROC_MODIFIED_OBJS.items()]
+    PROC_MODIFIED_OBJS.clear()
+    return modified
+
+
 LAST_FLUSH = None
 
 
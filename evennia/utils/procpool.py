@@ -0,0 +1,273 @@
+"""
+Process pool
+
+This runs CPU-heavy functions - pathfinding, map generation, combat
+simulation, text generation - in separate worker processes, so that they
+neither block the reactor nor compete with it for Python's GIL. Use it
+through `run_async`:
+
+```python
+from evennia.utils.utils import run_async
+from world.maps import generate_map
+
+run_async(generate_map, 100, 100, use_procpool=True, at_return=_map_done)
+```
+
+or directly, getting a Deferred back:
+
+```python
+from evennia.utils.procpool import PROCPOOL
+
+deferred = PROCPOOL.run(generate_map, 100, 100, timeout=10)
+```
+
+Since the function runs in another process, it and all its arguments and
+return values must be possible to *pickle*. This means the function must
+be defined at the top level of a module (not be a method or a function
+defined inside another function) and that arguments should be plain data
+like strings, numbers, lists and dicts rather than typeclassed entities
+(pass a dbref and search for it instead).
+
+The pool is bounded: it runs at most `PROCPOOL_MAX_WORKERS` functions at
+the same time and queues at most `PROCPOOL_MAX_QUEUE` more. A function
+not done within its timeout (`PROCPOOL_TIMEOUT` by default) fails with a
+`ProcPoolTimeout`. The pool's worker processes are then stopped and
+replaced, which means any other functions running at the time fail too.
+
+Workers set up Django on their own and have their own database
+connections. Database rows a worker saves or deletes are reported back to
+the Server, which updates or flushes its cached copies of them, so the
+Server does not keep using stale data. Note that SQLite handles writes
+from several processes poorly; use another database if the workers write
+much.
+
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from twisted.internet import defer, reactor
+from evennia.utils import logger
+
+# handlers on typeclassed entities caching Attributes and Tags
+_CACHING_HANDLERS = ("attributes", "tags", "aliases", "permissions")
+
+
+class ProcPoolError(RuntimeError):
+    """
+    The process pool could not run a function.
+
+    """
+
+    pass
+
+
+class ProcPoolTimeout(ProcPoolError):
+    """
+    A function did not finish within its timeout.
+
+    """
+
+    pass
+
+
+def _init_worker():
+    """
+    Set up a new worker process.
+
+    """
+    import django
+    import evennia
+
+    django.setup()
+    evennia._init()
+    from evennia.utils.idmapper.models import track_modified_objs
+
+    track_modified_objs()
+
+
+def _run_task(func, args, kwargs):
+    """
+    Run a function in a worker process.
+
+    Returns:
+        result (tuple): The return of the function and the rows it
+            modified, as returned by `pop_modified_objs`. If the function
+            raises an exception, the modified rows are stored on that
+            exception as `procpool_modified`.
+
+    """
+    from evennia.utils.idmapper.models import pop_modified_objs
+
+    pop_modified_objs()
+    try:
+        result = func(*args, **kwargs)
+    except Exception as err:
+        err.procpool_modified = pop_modified_objs()
+        raise
+    return result, pop_modified_objs()
+
+
+def update_cache(modified):
+    """
+    Update the idmapper cache with rows modified by another process.
+    Cached instances of saved rows have their fields re-read from the database and
+    instances of deleted rows are flushed from the cache.
+
+    Args:
+        modified (list): A list of `(model_label, pk, deleted)`.
+
+    """
+    for label, pk, deleted in modified:
+        try:
+            model = apps.get_model(label)
+            instance = model.__dbclass__.__instance_cache__.get(pk)
+        except (LookupError, AttributeError):
+            # not a cached model
+            continue
+        if not instance:
+            continue
+        if deleted:
+            instance.flush_from_cache(force=True)
+            continue
+        # refresh_from_db would get the cached instance itself back, so
+        # the fields are read as values
+        fields = instance._meta.concrete_fields
+        row = model.objects.filter(pk=pk).values(*(field.attname for field in fields)).first()
+        if not row:
+            instance.flush_from_cache(force=True)
+            continue
+        for field in fields:
+            value = row[field.attname]
+            if field.is_relation and getattr(instance, field.attname) != value:
+                # make the foreign key be looked up again
+                if field.is_cached(instance):
+                    field.delete_cached_value(instance)
+            instance.__dict__[field.attname] = value
+        for handlername in _CACHING_HANDLERS:
+            # only reset handlers already used (they are lazy properties)
+            handler = instance.__dict__.get(handlername)
+            if handler and hasattr(handler, "reset_cache"):
+                handler.reset_cache()
+
+
+class ProcPool(object):
+    """
+    A bounded pool of worker processes. Use the `PROCPOOL` singleton
+    rather than creating new instances of this class.
+
+    """
+
+    def __init__(self, max_workers=2, max_queue=100, timeout=30):
+        """
+        Args:
+            max_workers (int, optional): Max number of worker processes.
+            max_queue (int, optional): Max number of functions waiting for a
+                free worker.
+            timeout (int or float, optional): Default timeout, in seconds.
+
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self.executor = None
+        # number of functions running or waiting to run
+        self.pending = 0
+
+    def _get_executor(self):
+        if not self.executor:
+            # spawned workers share no state (like database connections) with us
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self.executor
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        """
+        Run a function in a worker process.
+
+        Args:
+            func (callable): A function defined at the top level of a module.
+            *args (any): Arguments to `func`. Must be possible to pickle.
+            timeout (int or float, optional): Seconds to wait for `func` to
+                finish, if not using the pool's default. 0 means no timeout.
+            **kwargs (any): Keyword arguments to `func`. Must be possible to pickle.
+
+        Returns:
+            deferred (Deferred): Fires with the return of `func` or fails with
+                its exception. Fails with `ProcPoolError` if the pool is full
+                and with `ProcPoolTimeout` if `func` does not finish in time.
+
+        """
+        if self.pending >= self.max_workers + self.max_queue:
+            return defer.fail(
+                ProcPoolError("The process pool is full (%i functions pending)." % self.pending)
+            )
+        try:
+            future = self._get_executor().submit(_run_task, func, args, kwargs)
+        except Exception as err:
+            # a broken pool (a worker died) or a shut-down pool is replaced next time
+            self.shutdown()
+            return defer.fail(ProcPoolError("Could not start %s: %s" % (func, err)))
+        self.pending += 1
+
+        deferred = defer.Deferred()
+        timeout = self.timeout if timeout is None else timeout
+        timeout_call = (
+            reactor.callLater(timeout, self._timeout, deferred, func) if timeout else None
+        )
+
+        def _done(future):
+            if deferred.called:
+                # timed out already
+                return
+            self.pending -= 1
+            if timeout_call and timeout_call.active():
+                timeout_call.cancel()
+            err = future.exception()
+            if err:
+                update_cache(getattr(err, "procpool_modified", ()))
+                deferred.errback(err)
+            else:
+                result, modified = future.result()
+                update_cache(modified)
+                deferred.callback(result)
+
+        # the future's callbacks are called in another thread
+        future.add_done_callback(lambda future: reactor.callFromThread(_done, future))
+        return deferred
+
+    def _timeout(self, deferred, func):
+        """
+        Fail a function that did not finish in time. Its worker can't be
+        stopped alone, so the pool is replaced.
+
+        """
+        if deferred.called:
+            return
+        self.pending -= 1
+        logger.log_err("ProcPool: %s timed out. Restarting the process pool." % func)
+        self.shutdown()
+        deferred.errback(ProcPoolTimeout("%s did not finish in time." % func))
+
+    def shutdown(self):
+        """
+        Stop all worker processes. Functions still running fail. The pool
+        starts new workers when it's used again.
+
+        """
+        executor, self.executor = self.executor, None
+        if executor:
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False)
+
+
+PROCPOOL = ProcPool(
+    max_workers=settings.PROCPOOL_MAX_WORKERS,
+    max_queue=settings.PROCPOOL_MAX_QUEUE,
+    timeout=settings.PROCPOOL_TIMEOUT,
+)
@@ -62,6 +62,28 @@ def unload_module(module):
         del sys.modules[modulename]
 
 
+def connect_amp():
+    """
+    Connect two AMP protocols in memory, like the Server and Portal.
+
+    Returns:
+        server, portal, pump (tuple): The two connected protocols and the
+            `IOPump` moving data between them. Call `pump.flush()` to
+            deliver what was sent.
+
+    """
+    from twisted.test import iosim
+    from evennia.server.portal import amp
+
+    def _make():
+        proto = amp.AMPMultiConnectionProtocol()
+        proto.factory = Mock(broadcasts=[])
+        return proto
+
+    portal, server, pump = iosim.connectedServerAndClient(_make, _make)
+    return server, portal, pump
+
+
 def _mock_deferlater(reactor, timedelay, callback, *args, **kwargs):
     callback(*args, **kwargs)
     return Deferred()
@@ -0,0 +1,49 @@
+"""
+Unit tests for the database thread pool. The calls are run in the main
+thread here, since the reactor is not running.
+
+"""
+from mock import patch
+from twisted.internet import defer
+from evennia.objects.models import ObjectDB
+from evennia.utils import dbpool
+from evennia.utils.test_resources import EvenniaTest
+
+
+def _defer_now(reactor, pool, func, *args, **kwargs):
+    return defer.maybeDeferred(func, *args, **kwargs)
+
+
+@patch("evennia.utils.dbpool.reactor.callFromThread", lambda func, *args: func(*args))
+@patch("evennia.utils.dbpool.threads.deferToThreadPool", _defer_now)
+@patch("evennia.utils.dbpool.DBPool._get_threadpool", lambda self: None)
+class TestDBPool(EvenniaTest):
+    def _result(self, deferred):
+        results = []
+        deferred.addBoth(results.append)
+        return results[0]
+
+    def test_run(self):
+        pool = dbpool.DBPool(maxthreads=1, max_queue=1)
+        result = self._result(pool.run(ObjectDB.objects.filter, db_key="Obj"))
+        # querysets are evaluated in the thread
+        self.assertEqual(result, [self.obj1])
+        self.assertEqual((pool.pending, pool.running), (0, 0))
+        result = self._result(pool.run(ObjectDB.objects.get, db_key="Nothing"))
+        self.assertTrue(result.check(ObjectDB.DoesNotExist))
+        self.assertEqual(pool.pending, 0)
+
+    def test_full(self):
+        pool = dbpool.DBPool(maxthreads=1, max_queue=1)
+        pool.pending = 2
+        result = self._result(pool.run(ObjectDB.objects.all))
+        self.assertTrue(result.check(dbpool.DBPoolError))
+        self.assertEqual(pool.pending, 2)
+
+    def test_helpers(self):
+        self.obj1.tags.add("treasure", category="loot")
+        self.obj2.attributes.add("weight", 10)
+        self.assertEqual(self._result(dbpool.search_object("Obj")), [self.obj1])
+        self.assertEqual(self._result(dbpool.get_by_tag("treasure", category="loot")), [self.obj1])
+        self.assertEqual(self._result(dbpool.get_by_attribute("weight", value=10)), [self.obj2])
+        self.assertEqual(self._result(dbpool.get_by_tag("treasure", manager=ObjectDB.objects)), [])
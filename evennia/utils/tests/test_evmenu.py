@@ -21,7 +21,7 @@ import copy
 from django.test import TestCase
 from evennia.utils import evmenu
 from evennia.utils import ansi
-from mock import MagicMock
+from mock import MagicMock, patch
 
 
 class TestEvMenu(TestCase):
@@ -221,6 +221,10 @@ class TestEvMenu(TestCase):
             self.menu.close_menu = MagicMock()
             self.pmenu.close_menu = MagicMock()
 
+    def tearDown(self):
+        # save (and stop waiting to save) persistent menus
+        evmenu.save_menus()
+
     def test_menu_structure(self):
         if self.menu:
             self._test_menutree(self.menu)
@@ -262,3 +266,50 @@ class TestEvMenuExample(TestEvMenu):
     def test_kwargsave(self):
         self.assertTrue(hasattr(self.menu, "testval"))
         self.assertTrue(hasattr(self.menu, "testval2"))
+
+    def test_persistent_save(self):
+        self.caller2.attributes.add.assert_any_call(
+            "_menutree_saved_startnode", ("test_start_node", "")
+        )
+        self.caller2.attributes.add.reset_mock()
+        self.pmenu.goto("test_view_node", "")
+        self.pmenu.goto("test_start_node", "back")
+        # node changes are saved together, later
+        self.caller2.attributes.add.assert_not_called()
+        self.assertIn(self.pmenu, evmenu._UNSAVED_MENUS)
+        evmenu.save_menus()
+        self.caller2.attributes.add.assert_called_once_with(
+            "_menutree_saved_startnode", ("test_start_node", ("back", {}))
+        )
+        self.assertFalse(evmenu._UNSAVED_MENUS)
+
+    def test_persistent_record(self):
+        # a menu module is saved by path, with only the non-default options
+        self.caller2.attributes.add.assert_any_call(
+            "_menutree_saved",
+            (
+                "evennia.utils.evmenu.EvMenu",
+                "evennia.utils.evmenu",
+                {
+                    "startnode": "test_start_node",
+                    "persistent": True,
+                    "testval": "val",
+                    "testval2": "val2",
+                },
+            ),
+        )
+
+    def test_persistent_restore(self):
+        caller = MagicMock()
+        caller.ndb._menutree = None
+        caller.attributes.get.side_effect = {
+            "_menutree_saved": ("evennia.utils.evmenu.EvMenu", "evennia.utils.evmenu", {"a": 1}),
+            "_menutree_saved_startnode": ("test_view_node", ""),
+        }.get
+        cmd = evmenu.CmdEvMenuNode()
+        cmd.caller = caller
+        with patch("evennia.utils.evmenu.EvMenu") as menuclass:
+            cmd.func()
+        menuclass.assert_called_with(
+            caller, "evennia.utils.evmenu", a=1, startnode="test_view_node", startnode_input=""
+        )
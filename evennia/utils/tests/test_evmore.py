@@ -0,0 +1,95 @@
+"""
+Unit tests for the EvMore pager
+
+"""
+from mock import MagicMock
+from django.core.paginator import Paginator
+from evennia.objects.models import ObjectDB
+from evennia.utils import evmore
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestEvMore(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        # 4 rows per page
+        self.session.protocol_flags["SCREENHEIGHT"] = {0: 8}
+        self.char1.msg = MagicMock()
+
+    def _last_text(self):
+        return self.char1.msg.call_args[1]["text"]
+
+    def test_queryset(self):
+        nobjs = ObjectDB.objects.count()
+        more = evmore.EvMore(
+            self.char1,
+            ObjectDB.objects.all(),
+            session=self.session,
+            page_formatter=lambda objs: ",".join(obj.key for obj in objs),
+        )
+        self.assertEqual(more._npages, nobjs // 4 + (1 if nobjs % 4 else 0))
+        self.assertTrue(more._keyset)
+        keys = [obj.key for obj in ObjectDB.objects.order_by("pk")]
+        self.assertIn(",".join(keys[:4]), self._last_text())
+        more.page_next()
+        # the second page was found from where the first page ended
+        self.assertEqual(list(more._lastpks), [0, 1])
+        self.assertIn(",".join(keys[4:8]), self._last_text())
+        more.page_end()
+        self.assertIn("[%i/%i]" % (more._npages, more._npages), self._last_text())
+        more.page_quit()
+
+    def test_sliced_queryset(self):
+        keys = [obj.key for obj in ObjectDB.objects.order_by("pk")][1:7]
+        more = evmore.EvMore(
+            self.char1,
+            ObjectDB.objects.order_by("pk")[1:7],
+            session=self.session,
+            page_formatter=lambda objs: ",".join(obj.key for obj in objs),
+        )
+        # can't be filtered by primary key, so is paged by OFFSET
+        self.assertFalse(more._keyset)
+        self.assertEqual(more._npages, 2)
+        more.page_next()
+        self.assertIn(",".join(keys[4:]), self._last_text())
+        more.page_quit()
+
+    def test_page_overhead(self):
+        more = evmore.EvMore(
+            self.char1,
+            ObjectDB.objects.all(),
+            session=self.session,
+            page_formatter=lambda objs: "header\n" + "\n".join(obj.key for obj in objs),
+            page_overhead=1,
+        )
+        # 3 rows and the header fill the 4 lines of a page
+        self.assertEqual(len(self._last_text().split("\n")[:-1]), 4)
+        more.page_quit()
+
+    def test_paginator(self):
+        nobjs = ObjectDB.objects.count()
+        more = evmore.EvMore(
+            self.char1, Paginator(ObjectDB.objects.order_by("pk"), 2), session=self.session
+        )
+        self.assertEqual(more._npages, nobjs // 2 + (1 if nobjs % 2 else 0))
+        more.page_quit()
+
+    def test_iterator(self):
+        rows = (str(num) for num in range(10))
+        more = evmore.EvMore(
+            self.char1, rows, session=self.session, page_formatter=lambda rows: "-".join(rows)
+        )
+        # only the first page and the one after it were read
+        self.assertEqual(more._pages, ["0-1-2-3", "4-5-6-7"])
+        self.assertIn("[1/?]", self._last_text())
+        more.page_end()
+        self.assertEqual(more._pages, ["0-1-2-3", "4-5-6-7", "8-9"])
+        self.assertIn("8-9", self._last_text())
+        self.assertIn("[3/3]", self._last_text())
+        more.page_quit()
+
+    def test_short_iterator(self):
+        evmore.EvMore(self.char1, iter(["a", "b"]), session=self.session)
+        # a single page is passed straight through
+        self.assertEqual(self._last_text(), "'a'\n'b'")
+        self.assertEqual(self.char1.ndb._more, None)
@@ -0,0 +1,53 @@
+"""
+Unit tests for the EvTable table generator
+
+"""
+from django.test import TestCase
+from evennia.utils import evtable
+from evennia.utils.ansi import ANSIString
+
+
+class TestEvTable(TestCase):
+    def test_table(self):
+        table = evtable.EvTable("|wKey|n", "Value", border="cells")
+        table.add_row("a", "b")
+        self.assertEqual(
+            str(table),
+            "+-----+-------+\n"
+            "|\x1b[0m \x1b[1m\x1b[37mKey\x1b[0m \x1b[0m|\x1b[0m Value \x1b[0m|\n"
+            "+~~~~~+~~~~~~~+\n"
+            "|\x1b[0m a   \x1b[0m|\x1b[0m b     \x1b[0m|\n"
+            "+-----+-------+",
+        )
+        self.assertEqual(str(table), str(ANSIString("\n").join(table.get())))
+
+    def test_plain_cell(self):
+        # plain and ANSI data are formatted the same way
+        plain = evtable.EvCell("Some text", width=14, border_width=1, align="r")
+        ansi = evtable.EvCell("|rSome|n text", width=14, border_width=1, align="r")
+        self.assertEqual(
+            [ANSIString(line).clean() for line in plain.get()],
+            ["+------------+", "|  Some text |", "+------------+"],
+        )
+        self.assertEqual(
+            [ANSIString(line).clean() for line in plain.get()],
+            [ANSIString(line).clean() for line in ansi.get()],
+        )
+        short = evtable.EvCell("abc", border_width=1)
+        self.assertEqual(
+            [str(line) for line in short.get()], ["+-----+", "|\x1b[0m abc \x1b[0m|", "+-----+"],
+        )
+
+    def test_layout_cache(self):
+        cell = evtable.EvCell("|rred|n", width=7)
+        lines = cell.get()
+        self.assertEqual(cell.get(), lines)
+        self.assertIsNot(cell.get(), lines)
+        # ANSIStrings with the same text but other colors are not mixed up
+        other = evtable.EvCell("|bred|n", width=7)
+        self.assertNotEqual(str(other), str(cell))
+        cell.reformat(align="r")
+        self.assertEqual(cell.formatted, None)
+        self.assertEqual(cell.get()[0].clean(), "   red ")
+        self.assertEqual(cell.get_width(), 7)
+        self.assertEqual(cell.get_height(), 1)
@@ -0,0 +1,78 @@
+"""
+Unit tests for the process pool. The worker functions are run in-process
+here; no worker processes are started.
+
+"""
+from mock import patch
+from django.db.models.signals import m2m_changed
+from django.test import override_settings
+from evennia.objects.models import ObjectDB
+from evennia.utils import procpool, utils
+from evennia.utils.idmapper import models as idmapper_models
+from evennia.utils.test_resources import EvenniaTest
+
+
+def _rename(dbref, key):
+    obj = ObjectDB.objects.get(id=dbref)
+    obj.key = key
+    obj.attributes.add("renamed", True)
+    return obj.key
+
+
+def _fail():
+    raise ValueError("failed")
+
+
+class TestProcPool(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        idmapper_models.track_modified_objs()
+
+    def tearDown(self):
+        idmapper_models._IS_SUBPROCESS = False
+        m2m_changed.disconnect(dispatch_uid="idmapper_track_m2m")
+        idmapper_models.pop_modified_objs()
+        super().tearDown()
+
+    def test_run_task(self):
+        result, modified = procpool._run_task(_rename, (self.obj1.id, "Renamed"), {})
+        self.assertEqual(result, "Renamed")
+        labels = set((label, deleted) for label, _, deleted in modified)
+        self.assertIn(("objects.ObjectDB", False), labels)
+        self.assertIn(("typeclasses.Attribute", False), labels)
+        # the owner of the new Attribute was recorded too
+        self.assertIn(("objects.ObjectDB", self.obj1.id, False), modified)
+
+        with self.assertRaises(ValueError) as cm:
+            procpool._run_task(_fail, (), {})
+        self.assertEqual(cm.exception.procpool_modified, [])
+
+        dbid = self.obj2.id
+        self.obj2.delete()
+        self.assertIn(("objects.ObjectDB", dbid, True), idmapper_models.pop_modified_objs())
+
+    def test_update_cache(self):
+        self.obj1.attributes.get("renamed")
+        ObjectDB.objects.filter(id=self.obj1.id).update(db_key="Changed")
+        self.obj1.db_attributes.create(db_key="renamed", db_value=True, db_model="objectdb")
+        self.assertEqual(self.obj1.key, "Obj")
+        self.assertEqual(self.obj1.db.renamed, None)
+        procpool.update_cache([("objects.ObjectDB", self.obj1.id, False)])
+        self.assertEqual(self.obj1.key, "Changed")
+        self.assertEqual(self.obj1.db.renamed, True)
+        procpool.update_cache([("objects.ObjectDB", self.obj1.id, True)])
+        self.assertNotIn(self.obj1.id, ObjectDB.__instance_cache__)
+
+    def test_full(self):
+        pool = procpool.ProcPool(max_workers=1, max_queue=0)
+        pool.pending = 1
+        errors = []
+        pool.run(_rename, self.obj1.id, "Renamed").addErrback(errors.append)
+        self.assertTrue(errors[0].check(procpool.ProcPoolError))
+        self.assertEqual(pool.executor, None)
+
+    @override_settings(PROCPOOL_MAX_WORKERS=0)
+    @patch("evennia.utils.utils.threads.deferToThread")
+    def test_run_async_fallback(self, mock_defer):
+        utils.run_async(_fail, use_procpool=True, procpool_timeout=1)
+        mock_defer.assert_called_with(_fail)
@@ -200,3 +200,18 @@ class TestText2Html(TestCase):
                 + "!"
             ),
         )
+
+    def test_parse_html_cache(self):
+        text = "|rcached|n text"
+        with mock.patch.object(
+            text2html.HTML_PARSER, "parse", wraps=text2html.HTML_PARSER.parse
+        ) as mock_parse:
+            result = text2html.parse_html(text)
+            self.assertEqual(result, text2html.parse_html(text))
+            self.assertEqual(mock_parse.call_count, 1)
+            self.assertNotEqual(result, text2html.parse_html(text, strip_ansi=True))
+            self.assertEqual(mock_parse.call_count, 2)
+            # an ANSIString equals its clean string, but must not share its result
+            self.assertNotEqual(
+                text2html.parse_html(ansi.ANSIString(text)), text2html.parse_html("cached text")
+            )
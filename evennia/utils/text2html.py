@@ -9,6 +9,7 @@ snippet #577349 on http://code.activestate.com.
 """
 
 import re
+from collections import OrderedDict
 from html import escape as html_escape
 from .ansi import *
 
@@ -18,6 +19,10 @@ from .ansi import *
 XTERM256_FG = "\033[38;5;%sm"
 XTERM256_BG = "\033[48;5;%sm"
 
+# converted strings, shared by all sessions receiving the same text
+_PARSE_CACHE = OrderedDict()
+_PARSE_CACHE_SIZE = 2000
+
 
 class TextToHTMLparser(object):
     """
@@ -365,5 +370,20 @@ HTML_PARSER = TextToHTMLparser()
 def parse_html(string, strip_ansi=False, parser=HTML_PARSER):
     """
     Parses a string, replace ANSI markup with html
+
+    Results are cached, so text sent to many webclient sessions (like a
+    room description or a channel message) is only converted once.
     """
-    return parser.parse(string, strip_ansi=strip_ansi)
+    if not isinstance(string, str):
+        return parser.parse(string, strip_ansi=strip_ansi)
+    # str() gives the raw string of an ANSIString, which compares by its clean string
+    cachekey = (str(string), strip_ansi, parser)
+    if cachekey in _PARSE_CACHE:
+        _PARSE_CACHE.move_to_end(cachekey)
+        return _PARSE_CACHE[cachekey]
+
+    result = parser.parse(string, strip_ansi=strip_ansi)
+    _PARSE_CACHE[cachekey] = result
+    if len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
+        _PARSE_CACHE.popitem(last=False)
+    return result
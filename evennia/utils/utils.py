@@ -1092,8 +1092,6 @@ def delay(timedelay, callback, *args, **kwargs):
 
 
 _PPOOL = None
-_PCMD = None
-_PROC_ERR = "A process has ended with a probable error condition: process ended by signal 9."
 
 
 def run_async(to_execute, *args, **kwargs):
@@ -1103,8 +1101,8 @@ def run_async(to_execute, *args, **kwargs):
     Args:
         to_execute (callable): If this is a callable, it will be
             executed with *args and non-reserved *kwargs as arguments.
-            The callable will be executed using ProcPool, or in a thread
-            if ProcPool is not available.
+            The callable will be executed in a thread, or in a separate
+            process if `use_procpool` is set.
 
     Kwargs:
         at_return (callable): Should point to a callable with one
@@ -1116,6 +1114,15 @@ def run_async(to_execute, *args, **kwargs):
             if there is an error in to_execute.
         at_err_kwargs (dict): This dictionary will be used as keyword
             arguments to the at_err errback.
+        use_procpool (bool): Run `to_execute` in a worker process of the
+            process pool (see `evennia.utils.procpool`) rather than in a
+            thread. This is for CPU-heavy work. `to_execute` must then be
+            a function defined at the top level of a module and it and
+            all its arguments and return values must be possible to pickle.
+            Falls back to a thread if the pool is disabled
+            (`settings.PROCPOOL_MAX_WORKERS = 0`).
+        procpool_timeout (int or float): Seconds to wait for the process
+            pool to finish `to_execute`, if not `settings.PROCPOOL_TIMEOUT`.
 
     Notes:
         All other `*args` and `**kwargs` will be passed on to
@@ -1141,9 +1148,16 @@ def run_async(to_execute, *args, **kwargs):
     errback = kwargs.pop("at_err", None)
     callback_kwargs = kwargs.pop("at_return_kwargs", {})
     errback_kwargs = kwargs.pop("at_err_kwargs", {})
-
-    if callable(to_execute):
-        # no process pool available, fall back to old deferToThread mechanism.
+    use_procpool = kwargs.pop("use_procpool", False)
+    procpool_timeout = kwargs.pop("procpool_timeout", None)
+
+    if use_procpool and callable(to_execute) and settings.PROCPOOL_MAX_WORKERS > 0:
+        global _PPOOL
+        if not _PPOOL:
+            from evennia.utils.procpool import PROCPOOL as _PPOOL
+        deferred = _PPOOL.run(to_execute, *args, timeout=procpool_timeout, **kwargs)
+    elif callable(to_execute):
+        # no process pool requested, fall back to old deferToThread mechanism.
         deferred = threads.deferToThread(to_execute, *args, **kwargs)
     else:
         # no appropriate input for this server setup
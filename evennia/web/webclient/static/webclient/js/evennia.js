@@ -17,6 +17,12 @@ All messages are valid JSON arrays on this single form:
 where args is an JSON array and kwargs is a JSON object. These will be both
 used as arguments emitted to a callback named "cmdname" as cmdname(args, kwargs).
 
+To save round-trips, the library asks the server to batch messages: the
+websocket requests the "evennia.json.batch" subprotocol (or
+"evennia.msgpack.batch" if a MessagePack library is loaded as `window.msgpack`)
+and the ajax client polls with batch=1. Batched messages arrive as a list of
+such arrays.
+
 This library makes the "Evennia" object available. It has the
 following official functions:
 
@@ -227,7 +233,12 @@ An "emitter" object must have a function
                 return;
             }
             // Important - we pass csessid tacked on the url
-            websocket = new WebSocket(wsurl + '?' + csessid);
+            var subprotocols = ["evennia.json.batch"];
+            if (window.msgpack && window.msgpack.decode) {
+                subprotocols.unshift("evennia.msgpack.batch");
+            }
+            websocket = new WebSocket(wsurl + '?' + csessid, subprotocols);
+            websocket.binaryType = "arraybuffer";
 
             // Handle Websocket open event
             websocket.onopen = function (event) {
@@ -266,9 +277,22 @@ An "emitter" object must have a function
                     return;
                 }
                 // Parse the incoming data, send to emitter
-                // Incoming data is on the form [cmdname, args, kwargs]
-                data = JSON.parse(data);
-                Evennia.emit(data[0], data[1], data[2]);
+                // Incoming data is on the form [cmdname, args, kwargs],
+                // or a list of those if batched.
+                if (data instanceof ArrayBuffer) {
+                    data = window.msgpack.decode(new Uint8Array(data));
+                }
+                else {
+                    data = JSON.parse(data);
+                }
+                if (websocket.protocol) {
+                    for (var i = 0; i < data.length; i++) {
+                        Evennia.emit(data[i][0], data[i][1], data[i][2]);
+                    }
+                }
+                else {
+                    Evennia.emit(data[0], data[1], data[2]);
+                }
             };
         }
 
@@ -354,15 +378,18 @@ An "emitter" object must have a function
             $.ajax({type: "POST", url: "/webclientdata",
                     async: true, cache: false, timeout: 60000,
                     dataType: "json",
-                    data: {mode: 'receive', 'csessid': csessid},
+                    data: {mode: 'receive', 'csessid': csessid, batch: 1},
                     success: function(data) {
                         // log("ajax data received:", data);
-                        if (data[0] === "ajax_keepalive") {
-                            // special ajax keepalive check - return immediately
-                            msg("", "keepalive");
-                        } else {
-                            // not a keepalive
-                            Evennia.emit(data[0], data[1], data[2]);
+                        // we get all buffered messages at once
+                        for (var i = 0; i < data.length; i++) {
+                            if (data[i][0] === "ajax_keepalive") {
+                                // special ajax keepalive check - return immediately
+                                msg("", "keepalive");
+                            } else {
+                                // not a keepalive
+                                Evennia.emit(data[i][0], data[i][1], data[i][2]);
+                            }
                         }
                         stop_polling = false;
                         poll(); // immiately start a new request